@@ -0,0 +1,118 @@
+from types import MappingProxyType
+from typing import Iterable, Optional, Tuple
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Achievement
+
+# How often a worker checks whether achievements were added by another worker
+CATALOG_REFRESH_SECONDS = 60
+
+
+class CatalogAchievement:
+    """Immutable view of one Achievement row, detached from any session"""
+    __slots__ = ("id", "name", "description", "icon", "category", "requirement", "created_at")
+
+    def __init__(self, id, name, description, icon, category, requirement, created_at):
+        object.__setattr__(self, "id", id)
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "description", description)
+        object.__setattr__(self, "icon", icon)
+        object.__setattr__(self, "category", category)
+        object.__setattr__(self, "requirement", requirement)
+        object.__setattr__(self, "created_at", created_at)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Catalog achievements are read-only")
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class AchievementCatalog:
+    """
+    Snapshot of the Achievement table, in id order and indexed by id and by category.
+
+    Snapshots are never modified; an invalidation bumps the version and the next
+    read builds a new one.
+    """
+
+    def __init__(self, rows: Iterable[tuple], version: int):
+        self.version = version
+        self.achievements: Tuple[CatalogAchievement, ...] = tuple(CatalogAchievement(*row) for row in rows)
+        self.by_id = MappingProxyType({achievement.id: achievement for achievement in self.achievements})
+        by_category = {}
+        for achievement in self.achievements:
+            by_category.setdefault(achievement.category, []).append(achievement)
+        self.by_category = MappingProxyType({category: tuple(items) for category, items in by_category.items()})
+        self.names = frozenset(achievement.name for achievement in self.achievements)
+        self.signature = (max(self.by_id, default=0), len(self.achievements))
+
+    def __len__(self):
+        return len(self.achievements)
+
+    def __iter__(self):
+        return iter(self.achievements)
+
+    def in_categories(self, categories: Optional[Iterable[str]]) -> Tuple[CatalogAchievement, ...]:
+        """The achievements of the given categories in id order, or all of them for None"""
+        if categories is None:
+            return self.achievements
+        categories = set(categories)
+        return tuple(achievement for achievement in self.achievements if achievement.category in categories)
+
+
+class AchievementCatalogCache:
+    """Process-wide holder of the current AchievementCatalog"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog: Optional[AchievementCatalog] = None
+        self._version = 1
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> AchievementCatalog:
+        catalog = self._catalog
+        if catalog is not None and catalog.version == self._version \
+                and time.monotonic() - self._checked_at < CATALOG_REFRESH_SECONDS:
+            return catalog
+        with self._lock:
+            if self._catalog is None or self._catalog.version != self._version:
+                self._load(db)
+            elif time.monotonic() - self._checked_at >= CATALOG_REFRESH_SECONDS:
+                # Achievements created through another worker show up here
+                max_id, count = db.query(func.max(Achievement.id), func.count(Achievement.id)).one()
+                self._checked_at = time.monotonic()
+                if ((max_id or 0), count) != self._catalog.signature:
+                    self._version += 1
+                    self._load(db)
+            return self._catalog
+
+    def invalidate(self):
+        """Bump the version so the next read reloads, e.g. after this worker created achievements"""
+        with self._lock:
+            self._version += 1
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _load(self, db: Session):
+        rows = db.query(
+            Achievement.id,
+            Achievement.name,
+            Achievement.description,
+            Achievement.icon,
+            Achievement.category,
+            Achievement.requirement,
+            Achievement.created_at
+        ).order_by(Achievement.id).all()
+        self._catalog = AchievementCatalog(rows, self._version)
+        self._checked_at = time.monotonic()
+        print(f"Loaded achievement catalog version {self._version} with {len(self._catalog)} achievements")
+
+
+achievement_catalog_cache = AchievementCatalogCache()
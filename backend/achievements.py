@@ -0,0 +1,445 @@
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, desc, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import User, Workout, Exercise, UserProfile, UserAchievement
+from achievement_catalog import achievement_catalog_cache
+
+# Achievement categories whose progress depends on the user's logged workouts
+WORKOUT_EVENT_CATEGORIES = ("workout", "variety", "streak")
+
+# Workouts read per query while walking back through the current streak
+STREAK_SCAN_PAGE = 64
+
+# Number of users recomputed per round of queries by recompute_all_achievements
+RECOMPUTE_BATCH_SIZE = 500
+
+
+def profile_completion(user: User) -> int:
+    """How many of the optional profile fields the user filled in"""
+    profile_fields = [
+        user.height is not None,
+        user.weight is not None,
+        user.age is not None,
+        user.gender is not None and user.gender.strip() != "",
+        user.fitness_goals is not None and user.fitness_goals.strip() != "",
+        user.bio is not None and user.bio.strip() != ""
+    ]
+    return sum(1 for field in profile_fields if field)
+
+
+def _get_profile(db: Session, user_id: int) -> UserProfile:
+    profile = db.query(UserProfile).filter(UserProfile.user_id == user_id).with_for_update().first()
+    if not profile:
+        profile = UserProfile(user_id=user_id, current_streak=0, best_streak=0)
+        db.add(profile)
+    return profile
+
+
+def _current_run(db: Session, user_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+    The user's streak from their history: the number of consecutive days with a
+    logged workout, ending on the day of the latest one, and that latest workout's date.
+
+    Walks back from the latest workout a page at a time and stops at the first
+    missing day, so only the current run is read.
+    """
+    streak = 0
+    latest = None
+    day = None
+    before = None
+    while True:
+        query = db.query(Workout.date).filter(
+            Workout.user_id == user_id,
+            Workout.is_template == False,
+            Workout.date.isnot(None)
+        )
+        if before is not None:
+            query = query.filter(Workout.date < before)
+        rows = query.order_by(desc(Workout.date)).limit(STREAK_SCAN_PAGE).all()
+
+        for (date,) in rows:
+            if latest is None:
+                latest, day, streak = date, date.date(), 1
+            elif date.date() == day - timedelta(days=1):
+                day = date.date()
+                streak += 1
+            elif date.date() != day:
+                return streak, latest
+        if len(rows) < STREAK_SCAN_PAGE:
+            return streak, latest
+        before = rows[-1][0]
+
+
+def _recount_streak(db: Session, profile: UserProfile):
+    profile.current_streak, profile.last_workout_date = _current_run(db, profile.user_id)
+    profile.best_streak = max(profile.best_streak or 0, profile.current_streak)
+    db.flush()
+
+
+def refresh_streak(db: Session, user_id: int) -> UserProfile:
+    """Recompute the streak counters on the user's profile from their history (does not commit)"""
+    profile = _get_profile(db, user_id)
+    _recount_streak(db, profile)
+    return profile
+
+
+def record_streak_workouts(db: Session, user_id: int, workout_ids: List[int]):
+    """
+    Extend the streak counters on the user's profile with newly logged workouts.
+
+    A workout on the day of the last one keeps the streak, one on the next day
+    extends it and a later one starts a new streak. Backdated workouts, and profiles
+    whose counters were never initialized, are recomputed from the history instead.
+    Runs in the caller's transaction, like the workout stats rollup.
+    """
+    dates = sorted(
+        date for (date,) in db.query(Workout.date).filter(
+            Workout.id.in_(workout_ids),
+            Workout.is_template == False
+        ).all()
+        if date is not None
+    )
+    if not dates:
+        return
+    profile = _get_profile(db, user_id)
+    if profile.last_workout_date is None or dates[0].date() < profile.last_workout_date.date():
+        _recount_streak(db, profile)
+        return
+
+    streak = profile.current_streak or 1
+    last = profile.last_workout_date
+    for date in dates:
+        if date.date() == last.date() + timedelta(days=1):
+            streak += 1
+        elif date.date() != last.date():
+            streak = 1
+        last = max(last, date)
+    profile.current_streak = streak
+    profile.best_streak = max(profile.best_streak or 0, streak)
+    profile.last_workout_date = last
+    db.flush()
+
+
+def active_streak(current_streak: Optional[int], last_workout_date: Optional[datetime]) -> int:
+    """
+    The streak the stored counters stand for today: a run whose last workout was
+    before yesterday has been broken, even though nothing reset the counter.
+    """
+    if last_workout_date is None:
+        return 0
+    if last_workout_date.date() < datetime.now(timezone.utc).date() - timedelta(days=1):
+        return 0
+    return current_streak or 0
+
+
+def _workout_metrics(db: Session, user_ids: List[int]) -> Tuple[Dict[int, int], Dict[int, int]]:
+    """
+    Logged workouts and distinct exercise names per user. Routine templates don't
+    count towards achievements, unlike in the workout stats rollup.
+    """
+    workouts = dict(db.query(Workout.user_id, func.count(Workout.id)).filter(
+        Workout.user_id.in_(user_ids),
+        Workout.is_template == False
+    ).group_by(Workout.user_id).all())
+    variety = dict(db.query(Workout.user_id, func.count(func.distinct(Exercise.name))).join(
+        Exercise, Exercise.workout_id == Workout.id
+    ).filter(
+        Workout.user_id.in_(user_ids),
+        Workout.is_template == False
+    ).group_by(Workout.user_id).all())
+    return workouts, variety
+
+
+def load_achievement_metrics(db: Session, user: User, categories: Iterable[str]) -> Dict[str, int]:
+    """
+    The user's value of each metric the given achievement categories are measured by.
+
+    Every metric is read once: workout count and distinct exercise names with the
+    same grouped queries as the batch recompute, the streak from the profile
+    counters. Categories without a metric are left out.
+    """
+    categories = set(categories)
+    metrics = {}
+    if "profile" in categories:
+        metrics["profile"] = profile_completion(user)
+    if categories & {"workout", "variety"}:
+        workouts, variety = _workout_metrics(db, [user.id])
+        metrics["workout"] = workouts.get(user.id, 0)
+        metrics["variety"] = variety.get(user.id, 0)
+    if "streak" in categories:
+        profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+        metrics["streak"] = active_streak(profile.current_streak, profile.last_workout_date) if profile else 0
+    return metrics
+
+
+def achievement_progress(achievement, metrics: Dict[str, int], is_admin: bool) -> Tuple[int, bool]:
+    """(progress, whether it is reached) of one achievement given the user's metrics"""
+    # For admin users, automatically mark all achievements as completed
+    if is_admin:
+        return achievement.requirement, True
+    if achievement.category in metrics:
+        progress = metrics[achievement.category]
+        return progress, progress >= achievement.requirement
+    # No metric tracks this category (nutrition, social, ...)
+    return 0, False
+
+
+def achieved_fields(achievement, now: datetime) -> dict:
+    """The UserAchievement values set when an achievement is first reached"""
+    return {
+        "achieved_at": now,
+        "earned_at": now,
+        "is_read": False,
+        "title": achievement.name,
+        "description": achievement.description,
+    }
+
+
+def new_user_achievement(user_id: int, achievement, progress: int, is_achieved: bool, now: datetime) -> dict:
+    """Column values of a user_achievements row created for the given progress"""
+    # Every row carries the same columns so a batch of them goes out as one executemany
+    values = {
+        "user_id": user_id, "achievement_id": achievement.id, "progress": progress,
+        "achieved_at": None, "earned_at": None, "title": None, "description": None,
+        "reward_claimed": False, "is_read": False, "achievement_type": "achievement", "level": 1,
+    }
+    if is_achieved:
+        values.update(achieved_fields(achievement, now))
+    return values
+
+
+def upsert_user_achievements(db: Session, rows: List[dict]):
+    """
+    Insert user_achievements rows, or update the progress of the row another
+    request created for the same (user_id, achievement_id) in the meantime.
+
+    A row that is already achieved keeps its achievement date, title and read flag.
+    """
+    if not rows:
+        return
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    # A Core insert on the table, so all rows go out as one executemany; the ORM bulk
+    # path would split them by which columns are NULL
+    table = UserAchievement.__table__
+    stmt = insert(table)
+    newly_achieved = table.c.achieved_at.is_(None) & stmt.excluded.achieved_at.is_not(None)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.achievement_id],
+        set_={
+            "progress": stmt.excluded.progress,
+            "achieved_at": func.coalesce(table.c.achieved_at, stmt.excluded.achieved_at),
+            "earned_at": func.coalesce(table.c.earned_at, stmt.excluded.earned_at),
+            "title": func.coalesce(table.c.title, stmt.excluded.title),
+            "description": func.coalesce(table.c.description, stmt.excluded.description),
+            "is_read": case((newly_achieved, False), else_=table.c.is_read),
+        }
+    )
+    db.execute(stmt, rows)
+
+
+def delete_duplicate_user_achievements(db: Session, *order_by) -> int:
+    """
+    Delete all but the first user_achievements row of every (user_id, achievement_id)
+    pair, ranking each pair's rows by order_by. Does not commit; returns the number
+    of rows deleted.
+    """
+    ranked = db.query(
+        UserAchievement.id,
+        func.row_number().over(
+            partition_by=(UserAchievement.user_id, UserAchievement.achievement_id),
+            order_by=order_by + (UserAchievement.id,)
+        ).label("rank")
+    ).subquery()
+    losers = select(ranked.c.id).where(ranked.c.rank > 1)
+    return db.query(UserAchievement).filter(
+        UserAchievement.id.in_(losers)
+    ).delete(synchronize_session=False)
+
+
+def evaluate_achievements(db: Session, user: User, categories: Optional[Iterable[str]] = None) -> dict:
+    """
+    Update the user's progress on every achievement (or only those in the given
+    categories) and mark newly reached ones unread. Does not commit.
+
+    Reads the user's progress rows and the metrics once and takes the achievements
+    from the catalog; the evaluation itself runs in memory, however many there are.
+    """
+    achievements = achievement_catalog_cache.get(db).in_categories(categories)
+
+    user_achievements = {
+        ua.achievement_id: ua
+        for ua in db.query(UserAchievement).filter(
+            UserAchievement.user_id == user.id,
+            UserAchievement.achievement_id.in_([achievement.id for achievement in achievements])
+        ).all()
+    }
+    metrics = {} if user.is_admin else load_achievement_metrics(
+        db, user, {achievement.category for achievement in achievements}
+    )
+
+    updated_count = 0
+    newly_achieved = 0
+    now = datetime.now(timezone.utc)
+    results = {}
+    inserts = []
+    for achievement in achievements:
+        progress, is_achieved = achievement_progress(achievement, metrics, user.is_admin)
+        user_achievement = user_achievements.get(achievement.id)
+        if not user_achievement:
+            # Created with an upsert, as a concurrent check of this user may create it too
+            values = new_user_achievement(user.id, achievement, progress, is_achieved, now)
+            inserts.append(values)
+            if is_achieved:
+                newly_achieved += 1
+            results[achievement.id] = (progress, values["achieved_at"])
+        else:
+            user_achievement.progress = progress
+            if is_achieved and user_achievement.achieved_at is None:
+                for field, value in achieved_fields(achievement, now).items():
+                    setattr(user_achievement, field, value)
+                newly_achieved += 1
+            results[achievement.id] = (progress, user_achievement.achieved_at)
+        updated_count += 1
+    upsert_user_achievements(db, inserts)
+
+    return {
+        "message": f"Updated {updated_count} achievements, {newly_achieved} newly achieved",
+        "updated": updated_count,
+        "newly_achieved": newly_achieved,
+        "achievements": [
+            {
+                "id": achievement.id,
+                "name": achievement.name,
+                "description": achievement.description,
+                "category": achievement.category,
+                "requirement": achievement.requirement,
+                "icon": achievement.icon,
+                "progress": results[achievement.id][0],
+                "is_achieved": results[achievement.id][1] is not None,
+                "achieved_at": results[achievement.id][1]
+            }
+            for achievement in achievements
+        ]
+    }
+
+
+def _batch_metrics(db: Session, users: list) -> Dict[int, Dict[str, int]]:
+    """
+    Every metric of a batch of users, with one grouped query per metric.
+
+    Workout and variety counts come straight from the workout history. Streaks come
+    from the profile counters; users with workouts whose counters were never set
+    (logged before they were maintained) get them recounted first.
+    """
+    user_ids = [user.id for user in users]
+    workouts, variety = _workout_metrics(db, user_ids)
+    streaks = {
+        user_id: (current_streak, last_workout_date)
+        for user_id, current_streak, last_workout_date in db.query(
+            UserProfile.user_id, UserProfile.current_streak, UserProfile.last_workout_date
+        ).filter(UserProfile.user_id.in_(user_ids)).all()
+    }
+
+    metrics = {}
+    for user in users:
+        current_streak, last_workout_date = streaks.get(user.id, (0, None))
+        if workouts.get(user.id) and last_workout_date is None:
+            profile = refresh_streak(db, user.id)
+            current_streak, last_workout_date = profile.current_streak, profile.last_workout_date
+        metrics[user.id] = {
+            "profile": profile_completion(user),
+            "workout": workouts.get(user.id, 0),
+            "variety": variety.get(user.id, 0),
+            "streak": active_streak(current_streak, last_workout_date),
+        }
+    return metrics
+
+
+def recompute_achievements_batch(db: Session, users: list, catalog, check_only: bool = False) -> dict:
+    """
+    Bring the achievement progress of a batch of users up to date. Does not commit.
+
+    `users` are rows with the User columns profile_completion reads plus id and
+    is_admin. Only rows whose values change are written: changed ones in one bulk
+    update, missing ones in one bulk upsert.
+    """
+    metrics = _batch_metrics(db, users)
+    # One row per pair: user_achievements is unique on (user_id, achievement_id)
+    existing = {
+        (row.user_id, row.achievement_id): row
+        for row in db.query(
+            UserAchievement.id, UserAchievement.user_id, UserAchievement.achievement_id,
+            UserAchievement.progress, UserAchievement.achieved_at
+        ).filter(UserAchievement.user_id.in_(list(metrics))).all()
+    }
+
+    now = datetime.now(timezone.utc)
+    updates, inserts = [], []
+    newly_achieved = 0
+    for user in users:
+        for achievement in catalog:
+            progress, is_achieved = achievement_progress(achievement, metrics[user.id], user.is_admin)
+            row = existing.get((user.id, achievement.id))
+            if row is None:
+                inserts.append(new_user_achievement(user.id, achievement, progress, is_achieved, now))
+                if is_achieved:
+                    newly_achieved += 1
+                continue
+            values = {}
+            if row.progress != progress:
+                values["progress"] = progress
+            if is_achieved and row.achieved_at is None:
+                values.update(achieved_fields(achievement, now))
+                newly_achieved += 1
+            if values:
+                values["id"] = row.id
+                updates.append(values)
+
+    if not check_only:
+        if updates:
+            db.bulk_update_mappings(UserAchievement, updates)
+        upsert_user_achievements(db, inserts)
+    return {"users": len(users), "updated": len(updates), "inserted": len(inserts), "newly_achieved": newly_achieved}
+
+
+def recompute_all_achievements(
+    db: Session,
+    batch_size: int = RECOMPUTE_BATCH_SIZE,
+    after_user_id: int = 0,
+    check_only: bool = False,
+    on_batch: Optional[Callable[[int, dict], None]] = None
+) -> dict:
+    """
+    Recompute every user's achievement progress in batches of users, in id order.
+
+    Starts after after_user_id, commits each batch and then calls
+    on_batch(last user id of the batch, running totals), so a run that stops can be
+    resumed from the last reported user id. With check_only nothing is written and
+    the totals only report what would change.
+    """
+    catalog = achievement_catalog_cache.get(db).achievements
+    totals = {"users": 0, "updated": 0, "inserted": 0, "newly_achieved": 0}
+    last_user_id = after_user_id
+    while True:
+        users = db.query(
+            User.id, User.is_admin, User.height, User.weight, User.age,
+            User.gender, User.fitness_goals, User.bio
+        ).filter(User.id > last_user_id).order_by(User.id).limit(batch_size).all()
+        if not users:
+            return totals
+
+        result = recompute_achievements_batch(db, users, catalog, check_only=check_only)
+        if check_only:
+            db.rollback()
+        else:
+            db.commit()
+        for key in totals:
+            totals[key] += result[key]
+        last_user_id = users[-1].id
+        if on_batch:
+            on_batch(last_user_id, totals)
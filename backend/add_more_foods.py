@@ -1,5 +1,6 @@
 from database import SessionLocal
 from models import CommonFood
+from food_catalog import restriction_flags
 from datetime import datetime, timezone
 import random  # for generating slight variations in nutritional values
 
@@ -131,6 +132,7 @@ for food_group, foods in new_foods.items():
             fat=round(fat_var, 1),
             serving_size=food["serving_size"],
             food_group=food_group,
+            restriction_flags=restriction_flags(food["name"], food_group),
             created_at=datetime.now(timezone.utc)
         )
         db.add(new_food)
@@ -4,13 +4,16 @@ from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from database import get_db
 from dependencies import get_admin_user
+from auth_cache import auth_cache
+from meal_plan_cache import meal_plan_cache
+from chat_context_cache import chat_context_cache
+from inference_client import inference_client
+from ai_workout_cache import cache_stats as ai_workout_cache_stats
+from admin_settings_cache import admin_settings_cache, notify_admin_settings_changed
 from models import User, Workout, Exercise, Set, UserProfile, Routine, SavedWorkoutProgram, AdminSettings
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, EmailStr, Field
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+from security import hash_password, password_hashing_pool
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -43,7 +46,7 @@ def create_user(
         raise HTTPException(status_code=400, detail="Username already taken")
 
     # Create new user
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = hash_password(user_data.password)
 
     new_user = User(
         email=user_data.email,
@@ -344,6 +347,42 @@ def get_workout_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/stats/auth-cache", response_model=Dict[str, Any])
+def get_auth_cache_stats(admin: User = Depends(get_admin_user)):
+    """Hit/miss counters of this worker's authenticated-token cache"""
+    return auth_cache.stats()
+
+
+@router.get("/stats/meal-plan-cache", response_model=Dict[str, Any])
+def get_meal_plan_cache_stats(admin: User = Depends(get_admin_user)):
+    """Hit/miss and eviction counters of this worker's meal plan cache"""
+    return meal_plan_cache.stats()
+
+
+@router.get("/stats/chat-context-cache", response_model=Dict[str, Any])
+def get_chat_context_cache_stats(admin: User = Depends(get_admin_user)):
+    """Hit/miss counters of this worker's nutrition chat context cache"""
+    return chat_context_cache.stats()
+
+
+@router.get("/stats/inference", response_model=Dict[str, Any])
+def get_inference_stats(admin: User = Depends(get_admin_user)):
+    """Request, retry and circuit breaker counters of this worker's Hugging Face client"""
+    return inference_client.stats()
+
+
+@router.get("/stats/ai-workout-cache", response_model=Dict[str, Any])
+def get_ai_workout_cache_stats(db: Session = Depends(get_db), admin: User = Depends(get_admin_user)):
+    """Size and hit count of the shared AI workout plan cache"""
+    return ai_workout_cache_stats(db)
+
+
+@router.get("/stats/password-hashing", response_model=Dict[str, Any])
+def get_password_hashing_stats(admin: User = Depends(get_admin_user)):
+    """Queue depth and load shedding counters of this worker's bcrypt pool"""
+    return password_hashing_pool.stats()
+
+
 @router.get("/users", response_model=List[Dict[str, Any]])
 def get_all_users(
     skip: int = 0,
@@ -453,13 +492,14 @@ def update_user(
     if user_data.email is not None:
         user.email = user_data.email
     if user_data.password is not None and user_data.password.strip():
-        user.hashed_password = pwd_context.hash(user_data.password)
+        user.hashed_password = hash_password(user_data.password)
     if user_data.is_admin is not None:
         user.is_admin = user_data.is_admin
     if user_data.is_verified is not None:
         user.is_verified = user_data.is_verified
 
     db.commit()
+    auth_cache.invalidate_user(user.id)
     db.refresh(user)
     
     return {
@@ -497,15 +537,7 @@ def get_admin_settings(
     admin: User = Depends(get_admin_user)
 ):
     """Get current admin settings"""
-    settings = db.query(AdminSettings).first()
-    if not settings:
-        # Create default settings if none exist
-        settings = AdminSettings()
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
-    
-    return settings
+    return admin_settings_cache.get().as_dict()
 
 
 @router.post("/settings", response_model=AdminSettingsResponse)
@@ -529,9 +561,13 @@ def update_admin_settings(
         # Set update metadata
         existing_settings.last_updated = datetime.now(timezone.utc)
         existing_settings.updated_by = admin.id
+        existing_settings.version = (existing_settings.version or 0) + 1
 
+        # Other workers reload their cached copy when this commits
+        notify_admin_settings_changed(db)
         db.commit()
         db.refresh(existing_settings)
+        admin_settings_cache.refresh()
 
         # Log the settings change
         print(f"Admin settings updated by {admin.username} at {existing_settings.last_updated}")
@@ -590,8 +626,9 @@ def admin_reset_user_password(
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters long")
     
     # Update password
-    user.hashed_password = pwd_context.hash(new_password)
+    user.hashed_password = hash_password(new_password)
     db.commit()
+    auth_cache.invalidate_user(user.id)
     
     return {
         "id": user.id,
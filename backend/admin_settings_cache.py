@@ -0,0 +1,173 @@
+from typing import Optional
+import select
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, engine
+from models import AdminSettings
+
+# Postgres channel used to tell every worker that the settings row changed
+NOTIFY_CHANNEL = "admin_settings_changed"
+
+SETTINGS_FIELDS = [
+    "auto_verify_users",
+    "require_email_verification",
+    "require_2fa_admins",
+    "session_timeout",
+    "backup_frequency",
+    "data_retention_months",
+    "notify_new_users",
+    "notify_system_alerts",
+    "last_updated",
+    "updated_by",
+]
+
+
+class AdminSettingsSnapshot:
+    """Read-only copy of the admin settings row, safe to share between requests"""
+    __slots__ = ("version",) + tuple(SETTINGS_FIELDS)
+
+    def __init__(self, row: AdminSettings):
+        for field in SETTINGS_FIELDS:
+            object.__setattr__(self, field, getattr(row, field))
+        object.__setattr__(self, "version", row.version or 0)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Admin settings snapshots are read-only; update them through the admin API")
+
+    def as_dict(self) -> dict:
+        return {field: getattr(self, field) for field in SETTINGS_FIELDS}
+
+
+class AdminSettingsCache:
+    """
+    In-process cache of the single admin settings row.
+
+    The row is loaded once (creating the defaults if it doesn't exist yet) and then
+    served from memory. Changes made by this worker refresh it directly. Changes made
+    by other workers arrive through Postgres LISTEN/NOTIFY; where that isn't available
+    (SQLite, or if the listener connection drops) the version column is polled at
+    most once every poll_seconds instead.
+    """
+
+    def __init__(self, poll_seconds: int):
+        self.poll_seconds = poll_seconds
+        self._snapshot: Optional[AdminSettingsSnapshot] = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self.listening = False
+        self.reloads = 0
+
+    def get(self) -> AdminSettingsSnapshot:
+        """Return the current settings, reloading only when they may have changed"""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale:
+            if self.listening or time.monotonic() - self._checked_at < self.poll_seconds:
+                return snapshot
+        with self._lock:
+            if self._snapshot is None or self._stale:
+                self._reload()
+            elif not self.listening and time.monotonic() - self._checked_at >= self.poll_seconds:
+                self._poll()
+            return self._snapshot
+
+    def refresh(self):
+        """Reload from the database now, e.g. right after this worker saved new settings"""
+        with self._lock:
+            self._reload()
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _poll(self):
+        db = SessionLocal()
+        try:
+            version = db.query(AdminSettings.version).order_by(AdminSettings.id).limit(1).scalar()
+        finally:
+            db.close()
+        self._checked_at = time.monotonic()
+        if version != self._snapshot.version:
+            self._reload()
+
+    def _reload(self):
+        # Cleared before reading so a notification arriving mid-reload isn't lost
+        self._stale = False
+        db = SessionLocal()
+        try:
+            row = get_or_create_admin_settings(db)
+            self._snapshot = AdminSettingsSnapshot(row)
+        except Exception:
+            self._stale = True
+            raise
+        finally:
+            db.close()
+        self._checked_at = time.monotonic()
+        self.reloads += 1
+
+    def start_listener(self):
+        """Subscribe to settings changes made by other workers (Postgres only)"""
+        if engine.dialect.name != "postgresql" or self._listener is not None:
+            return
+        self._listener = threading.Thread(target=self._listen, name="admin-settings-listener", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        try:
+            connection = engine.raw_connection()
+            try:
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                self.listening = True
+                # Anything written before LISTEN took effect would otherwise be missed
+                self.mark_stale()
+                print(f"Listening for admin settings changes on '{NOTIFY_CHANNEL}'")
+                while True:
+                    if select.select([dbapi_connection], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    if dbapi_connection.notifies:
+                        dbapi_connection.notifies.clear()
+                        self.mark_stale()
+            finally:
+                connection.close()
+        except Exception as e:
+            print(f"Admin settings listener stopped, falling back to polling: {str(e)}")
+        finally:
+            self.listening = False
+            self._listener = None
+            # Notifications may have been missed while the connection was going down
+            self.mark_stale()
+
+
+def get_or_create_admin_settings(db: Session) -> AdminSettings:
+    """Load the admin settings row, creating it with default values if it's missing"""
+    admin_settings = db.query(AdminSettings).order_by(AdminSettings.id).first()
+    if not admin_settings:
+        print("Admin settings not found, creating default settings")
+        admin_settings = AdminSettings()
+        db.add(admin_settings)
+        db.commit()
+        db.refresh(admin_settings)
+    return admin_settings
+
+
+def notify_admin_settings_changed(db: Session):
+    """
+    Queue a change notification for the other workers in the caller's transaction.
+
+    Postgres delivers it when the transaction commits; on other databases the
+    version column bump is picked up by polling instead.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+
+
+admin_settings_cache = AdminSettingsCache(settings.ADMIN_SETTINGS_POLL_SECONDS)
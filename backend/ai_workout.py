@@ -3,9 +3,10 @@ from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from dependencies import get_current_user
+from inference_client import InferenceUnavailable, inference_client
+from ai_workout_cache import get_cached_plan, normalize_request_fields, plan_cache_key, store_plan
 from typing import Dict, Any, List, Optional
 import os
-import requests
 import json
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -49,91 +50,25 @@ class WorkoutPlan(BaseModel):
     description: str
     days: List[WorkoutDay]
 
-# Get Hugging Face API token from environment variables
-HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
 # Default to a good general purpose model if no specific one is set
 AI_MODEL = os.getenv("AI_MODEL", "meta-llama/Llama-2-7b-chat-hf")
+# Smaller model tried with a shorter prompt when the primary one fails
+FALLBACK_MODEL = "google/flan-t5-base"
+# Name of the placeholder plan returned when an AI response can't be parsed
+FALLBACK_PLAN_NAME = "Basic Workout Plan (Fallback)"
 
-def generate_workout_with_huggingface(prompt: str) -> str:
+async def generate_workout_with_huggingface(prompt: str, model: str = AI_MODEL) -> str:
     """
     Generate workout using Hugging Face's API with the specified model.
+
+    Goes through the shared inference client, so the call doesn't block the event
+    loop; raises InferenceError when it fails and InferenceUnavailable while the
+    circuit breaker is open.
     """
-    if not HUGGINGFACE_API_TOKEN:
-        print("ERROR: Hugging Face API token not configured")
-        raise HTTPException(status_code=500, detail="Hugging Face API token not configured")
-    
-    api_url = f"https://api-inference.huggingface.co/models/{AI_MODEL}"
-    
-    headers = {
-        "Authorization": f"Bearer {HUGGINGFACE_API_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "max_new_tokens": 1024,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "do_sample": True
-        }
-    }
-    
-    try:
-        print(f"Calling Hugging Face API for model: {AI_MODEL}")
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        
-        # Check for specific error conditions
-        if response.status_code == 401:
-            print("ERROR: Unauthorized request to Hugging Face API. Check your API token.")
-            raise HTTPException(status_code=500, detail="Authentication error with Hugging Face API")
-        
-        if response.status_code == 503:
-            print("ERROR: Hugging Face model is currently loading or unavailable")
-            # This is often a temporary condition when the model is warming up
-            raise HTTPException(status_code=500, detail="Model is loading or unavailable. Please try again in a few moments.")
-            
-        # Force the response to raise an HTTPError for bad status codes
-        response.raise_for_status()
-        
-        # Parse response based on the format returned by the model
-        result = response.json()
-        print(f"Received response from Hugging Face API: {result}")
-        
-        if isinstance(result, list) and len(result) > 0:
-            if "generated_text" in result[0]:
-                return result[0]["generated_text"]
-            elif "error" in result[0]:
-                print(f"ERROR: API error from Hugging Face: {result[0]['error']}")
-                raise HTTPException(status_code=500, detail=f"Error from Hugging Face API: {result[0]['error']}")
-            else:
-                return str(result[0])
-        elif isinstance(result, dict):
-            if "generated_text" in result:
-                return result["generated_text"]
-            elif "error" in result:
-                print(f"ERROR: API error from Hugging Face: {result['error']}")
-                raise HTTPException(status_code=500, detail=f"Error from Hugging Face API: {result['error']}")
-            else:
-                return str(result)
-        else:
-            return str(result)
-            
-    except requests.exceptions.Timeout:
-        print("ERROR: Timeout when calling Hugging Face API")
-        raise HTTPException(status_code=500, detail="Request to Hugging Face API timed out. The model may be under heavy load.")
-        
-    except requests.exceptions.ConnectionError:
-        print("ERROR: Connection error when calling Hugging Face API")
-        raise HTTPException(status_code=500, detail="Connection error when calling Hugging Face API. Please check your internet connection.")
-        
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: Exception when calling Hugging Face API: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error calling Hugging Face API: {str(e)}")
-        
-    except Exception as e:
-        print(f"ERROR: Unexpected exception: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    print(f"Calling Hugging Face API for model: {model}")
+    result = await inference_client.generate(prompt, model)
+    print(f"Received response from Hugging Face API ({len(result)} characters)")
+    return result
 
 def format_workout_prompt(request: WorkoutGenerationRequest) -> str:
     """
@@ -345,7 +280,7 @@ def create_fallback_workout_plan():
     Create a basic fallback workout plan when parsing fails
     """
     return WorkoutPlan(
-        name="Basic Workout Plan (Fallback)",
+        name=FALLBACK_PLAN_NAME,
         description="A basic workout plan created when the AI-generated plan couldn't be processed.",
         days=[
             WorkoutDay(
@@ -378,6 +313,45 @@ def create_fallback_workout_plan():
         ]
     )
 
+def format_short_workout_prompt(request: WorkoutGenerationRequest) -> str:
+    """
+    Shorter prompt for the smaller fallback model.
+    """
+    return f"""Create a workout plan for:
+Fitness Goal: {request.fitnessGoal}
+Experience: {request.experienceLevel}
+Days per week: {request.daysPerWeek}
+Format as JSON with name, description, and days (array of day objects with focus, exercises array)
+"""
+
+def lookup_cached_plan(db: Session, cache_key: str) -> Optional[WorkoutPlan]:
+    """
+    A previously generated plan for this prompt and model, if there is a fresh one.
+    """
+    try:
+        cached = get_cached_plan(db, [cache_key])
+    except Exception as e:
+        # The cache is an optimization; never fail a generation because of it
+        db.rollback()
+        print(f"Error reading the AI workout plan cache: {str(e)}")
+        return None
+    if cached is None:
+        return None
+    print(f"Serving cached AI workout plan {cache_key[:12]}")
+    return WorkoutPlan(**cached[1])
+
+def save_generated_plan(db: Session, cache_key: str, model: str, request_fields: dict, workout_plan: WorkoutPlan):
+    """
+    Cache a plan the model generated; the placeholder plan used when parsing failed is skipped.
+    """
+    if workout_plan.name == FALLBACK_PLAN_NAME:
+        return
+    try:
+        store_plan(db, cache_key, model, request_fields, workout_plan.dict())
+    except Exception as e:
+        db.rollback()
+        print(f"Error writing the AI workout plan cache: {str(e)}")
+
 @router.post("/generate", response_model=WorkoutPlan)
 async def generate_workout(
     request: WorkoutGenerationRequest,
@@ -388,42 +362,49 @@ async def generate_workout(
     Generate a personalized workout plan using AI.
     """
     try:
+        # The model gets the request as the user typed it; the cache key is built from
+        # the prompt of the normalized request, so requests that only differ in case
+        # or spacing share a cache entry
+        request_fields = normalize_request_fields(request.dict())
+        normalized_request = WorkoutGenerationRequest(**request_fields)
+        
         # Format the prompt for the AI model
         prompt = format_workout_prompt(request)
         
         # Try with the primary model first
         try:
+            cache_key = plan_cache_key(AI_MODEL, format_workout_prompt(normalized_request))
+            cached_plan = lookup_cached_plan(db, cache_key)
+            if cached_plan is not None:
+                return cached_plan
+            
             print(f"Attempting to generate workout with primary model: {AI_MODEL}")
-            ai_response = generate_workout_with_huggingface(prompt)
+            ai_response = await generate_workout_with_huggingface(prompt)
             workout_plan = parse_ai_response(ai_response)
+            save_generated_plan(db, cache_key, AI_MODEL, request_fields, workout_plan)
             return workout_plan
+        except InferenceUnavailable:
+            # The circuit breaker is open; go straight to the rule-based plan
+            raise
         except HTTPException as e:
             # If primary model fails, try with a fallback model
             print(f"Primary model failed with error: {str(e)}")
-            print("Trying fallback model: google/flan-t5-base")
+            print(f"Trying fallback model: {FALLBACK_MODEL}")
             
             # Try with a smaller, more reliable model
             try:
-                fallback_model = "google/flan-t5-base"
-                
                 # Shorten the prompt for the smaller model
-                shorter_prompt = f"""Create a workout plan for:
-Fitness Goal: {request.fitnessGoal}
-Experience: {request.experienceLevel}
-Days per week: {request.daysPerWeek}
-Format as JSON with name, description, and days (array of day objects with focus, exercises array)
-"""
-                
-                # Use overridden model
-                original_model = AI_MODEL
-                os.environ["AI_MODEL"] = fallback_model
+                shorter_prompt = format_short_workout_prompt(request)
                 
-                ai_response = generate_workout_with_huggingface(shorter_prompt)
+                cache_key = plan_cache_key(FALLBACK_MODEL, format_short_workout_prompt(normalized_request))
+                cached_plan = lookup_cached_plan(db, cache_key)
+                if cached_plan is not None:
+                    return cached_plan
                 
-                # Restore original model
-                os.environ["AI_MODEL"] = original_model
+                ai_response = await generate_workout_with_huggingface(shorter_prompt, model=FALLBACK_MODEL)
                 
                 workout_plan = parse_ai_response(ai_response)
+                save_generated_plan(db, cache_key, FALLBACK_MODEL, request_fields, workout_plan)
                 return workout_plan
             except Exception as fallback_error:
                 print(f"Fallback model also failed: {str(fallback_error)}")
@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional, Tuple
+import hashlib
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import AIWorkoutPlanCache
+
+# Request fields that go into the prompt, in prompt order
+REQUEST_FIELDS = ["fitnessGoal", "experienceLevel", "workoutDuration", "daysPerWeek", "equipment",
+                  "injuries", "preferences"]
+
+
+def normalize_request_fields(fields: dict) -> dict:
+    """
+    Canonical form of a workout generation request: trimmed, lowercased, inner
+    whitespace collapsed and missing optional fields as "". Requests that only
+    differ in spelling like "Full Gym " / "full gym" map to the same cache entry.
+    """
+    return {field: " ".join(str(fields.get(field) or "").split()).lower() for field in REQUEST_FIELDS}
+
+
+def plan_cache_key(model: str, prompt: str) -> str:
+    """
+    Content address of a generation: the model name plus the prompt built from the
+    normalized request, so a change to the prompt template starts new entries
+    """
+    return hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()
+
+
+def _fresh_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(hours=settings.AI_WORKOUT_CACHE_TTL_HOURS)
+
+
+def get_cached_plan(db: Session, keys: Iterable[str]) -> Optional[Tuple[str, dict]]:
+    """
+    The first of the given keys with an unexpired plan, as (key, plan), or None.
+
+    Bumps the entry's hit count and last use, which the size limit evicts by.
+    """
+    keys = list(keys)
+    if not settings.AI_WORKOUT_CACHE_ENABLED or not keys:
+        return None
+    rows = {
+        row.key: row
+        for row in db.query(AIWorkoutPlanCache).filter(
+            AIWorkoutPlanCache.key.in_(keys),
+            AIWorkoutPlanCache.created_at >= _fresh_cutoff()
+        ).all()
+    }
+    for key in keys:
+        row = rows.get(key)
+        if row is not None:
+            db.query(AIWorkoutPlanCache).filter(AIWorkoutPlanCache.key == key).update(
+                {"hits": AIWorkoutPlanCache.hits + 1, "last_used_at": datetime.now(timezone.utc)},
+                synchronize_session=False
+            )
+            db.commit()
+            return key, row.plan
+    return None
+
+
+def store_plan(db: Session, key: str, model: str, request_fields: dict, plan: dict):
+    """Save a parsed plan, then drop expired entries and trim the table to its size limit"""
+    if not settings.AI_WORKOUT_CACHE_ENABLED:
+        return
+    now = datetime.now(timezone.utc)
+    row = db.get(AIWorkoutPlanCache, key)
+    if row is None:
+        row = AIWorkoutPlanCache(key=key, model=model, request=request_fields, hits=0)
+        db.add(row)
+    row.plan = plan
+    row.created_at = now
+    row.last_used_at = now
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another request stored the same generation first
+        db.rollback()
+        return
+    prune_cache(db)
+
+
+def prune_cache(db: Session) -> int:
+    """Delete expired entries and the least recently used ones beyond the size limit"""
+    deleted = db.query(AIWorkoutPlanCache).filter(
+        AIWorkoutPlanCache.created_at < _fresh_cutoff()
+    ).delete(synchronize_session=False)
+
+    excess = db.query(func.count(AIWorkoutPlanCache.key)).scalar() - settings.AI_WORKOUT_CACHE_MAX_ENTRIES
+    if excess > 0:
+        oldest = db.query(AIWorkoutPlanCache.key).order_by(
+            AIWorkoutPlanCache.last_used_at
+        ).limit(excess).subquery()
+        deleted += db.query(AIWorkoutPlanCache).filter(
+            AIWorkoutPlanCache.key.in_(oldest.select())
+        ).delete(synchronize_session=False)
+    db.commit()
+    if deleted:
+        print(f"Pruned {deleted} AI workout plan cache entries")
+    return deleted
+
+
+def cache_stats(db: Session) -> dict:
+    total, hits = db.query(func.count(AIWorkoutPlanCache.key), func.coalesce(func.sum(AIWorkoutPlanCache.hits), 0)).one()
+    fresh = db.query(func.count(AIWorkoutPlanCache.key)).filter(
+        AIWorkoutPlanCache.created_at >= _fresh_cutoff()
+    ).scalar()
+    return {
+        "enabled": settings.AI_WORKOUT_CACHE_ENABLED,
+        "entries": total,
+        "fresh_entries": fresh,
+        "max_entries": settings.AI_WORKOUT_CACHE_MAX_ENTRIES,
+        "ttl_hours": settings.AI_WORKOUT_CACHE_TTL_HOURS,
+        "hits": int(hits),
+    }
@@ -0,0 +1,36 @@
+"""add user_workout_stats table
+
+Revision ID: 2f7c1d9e4a10
+Revises: 8efdf99ed532
+Create Date: 2026-10-17 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2f7c1d9e4a10'
+down_revision = '8efdf99ed532'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('user_workout_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('total_workouts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_workout_date', sa.DateTime(), nullable=True),
+        sa.Column('cardio_duration', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('workout_duration', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('exercise_counts', sa.JSON(), nullable=False, server_default='{}'),
+        sa.Column('favorite_exercise', sa.String(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    # Rows are backfilled lazily on first read, or eagerly with rebuild_workout_stats.py
+
+
+def downgrade() -> None:
+    op.drop_table('user_workout_stats')
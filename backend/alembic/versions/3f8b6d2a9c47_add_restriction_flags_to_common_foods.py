@@ -0,0 +1,86 @@
+"""add restriction flags to common foods
+
+Revision ID: 3f8b6d2a9c47
+Revises: b5e9c1d7a248
+Create Date: 2026-10-18 09:12:40.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f8b6d2a9c47'
+down_revision = 'b5e9c1d7a248'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Frozen copy of the rules in food_catalog.py at the time of this migration,
+# so later changes to the app's keyword lists don't change what this backfills
+VEGETARIAN, VEGAN, DAIRY_FREE, GLUTEN_FREE = 1, 2, 4, 8
+NON_VEGETARIAN_GROUPS = ["meat", "poultry", "fish", "seafood"]
+NON_VEGETARIAN_KEYWORDS = ["chicken", "beef", "pork", "turkey", "fish", "salmon", "tuna",
+                           "shrimp", "meat", "sausage", "bacon", "ham", "steak", "cod",
+                           "tilapia", "lamb", "duck", "veal", "anchovy", "sardine"]
+DAIRY_KEYWORDS = ["milk", "cheese", "yogurt", "butter", "cream", "dairy"]
+GLUTEN_KEYWORDS = ["wheat", "bread", "pasta", "cereal", "flour", "bun", "cracker", "gluten",
+                   "barley", "rye", "oats", "malt"]
+
+
+def restriction_flags(name, food_group):
+    name_lower = (name or "").lower()
+    group_lower = (food_group or "").lower()
+    has_meat = any(group in group_lower for group in NON_VEGETARIAN_GROUPS) \
+        or any(keyword in name_lower for keyword in NON_VEGETARIAN_KEYWORDS)
+    has_dairy = any(keyword in name_lower for keyword in DAIRY_KEYWORDS)
+    has_animal_product = "egg" in name_lower or "honey" in name_lower
+    has_gluten = any(keyword in name_lower for keyword in GLUTEN_KEYWORDS)
+
+    flags = 0
+    if not has_meat:
+        flags |= VEGETARIAN
+        if not has_dairy and not has_animal_product:
+            flags |= VEGAN
+    if not has_dairy:
+        flags |= DAIRY_FREE
+    if not has_gluten:
+        flags |= GLUTEN_FREE
+    return flags
+
+
+def upgrade() -> None:
+    op.add_column('common_foods', sa.Column('restriction_flags', sa.Integer(), nullable=True))
+
+    common_foods = sa.table(
+        'common_foods',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('food_group', sa.String),
+        sa.column('restriction_flags', sa.Integer),
+    )
+    update = common_foods.update().where(
+        common_foods.c.id == sa.bindparam('food_id')
+    ).values(restriction_flags=sa.bindparam('flags'))
+
+    conn = op.get_bind()
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(common_foods.c.id, common_foods.c.name, common_foods.c.food_group)
+            .where(common_foods.c.id > last_id)
+            .order_by(common_foods.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(update, [
+            {'food_id': food_id, 'flags': restriction_flags(name, food_group)}
+            for food_id, name, food_group in rows
+        ])
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    op.drop_column('common_foods', 'restriction_flags')
@@ -0,0 +1,49 @@
+"""add nutrition_daily_totals table
+
+Revision ID: 4c8e2a6d9f31
+Revises: 9a4d2c7e8b13
+Create Date: 2026-10-17 14:05:47.218390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2a6d9f31'
+down_revision = '9a4d2c7e8b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('nutrition_daily_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.String(), nullable=False),
+        sa.Column('calories', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('protein', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('carbs', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('fat', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('meal_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+    # Backfill from the existing meals in one grouped statement
+    op.execute("""
+        INSERT INTO nutrition_daily_totals (user_id, date, calories, protein, carbs, fat, meal_count, updated_at)
+        SELECT m.user_id, m.date,
+               SUM(COALESCE(f.calories, 0) * COALESCE(f.quantity, 1.0)),
+               SUM(COALESCE(f.protein, 0) * COALESCE(f.quantity, 1.0)),
+               SUM(COALESCE(f.carbs, 0) * COALESCE(f.quantity, 1.0)),
+               SUM(COALESCE(f.fat, 0) * COALESCE(f.quantity, 1.0)),
+               COUNT(DISTINCT m.id),
+               CURRENT_TIMESTAMP
+        FROM meals m
+        LEFT JOIN meal_foods f ON f.meal_id = m.id
+        GROUP BY m.user_id, m.date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('nutrition_daily_totals')
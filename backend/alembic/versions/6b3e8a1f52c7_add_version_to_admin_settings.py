@@ -0,0 +1,24 @@
+"""add version to admin_settings
+
+Revision ID: 6b3e8a1f52c7
+Revises: 2f7c1d9e4a10
+Create Date: 2026-10-17 11:40:08.218754
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b3e8a1f52c7'
+down_revision = '2f7c1d9e4a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('admin_settings', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    op.drop_column('admin_settings', 'version')
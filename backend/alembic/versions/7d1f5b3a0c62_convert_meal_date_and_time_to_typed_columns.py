@@ -0,0 +1,42 @@
+"""convert meal date and time to typed columns
+
+Revision ID: 7d1f5b3a0c62
+Revises: 4c8e2a6d9f31
+Create Date: 2026-10-17 15:21:09.540817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1f5b3a0c62'
+down_revision = '4c8e2a6d9f31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Casting parses the existing 'YYYY-MM-DD' / 'HH:MM' strings in place
+        op.execute('ALTER TABLE meals ALTER COLUMN date TYPE DATE USING date::date')
+        op.execute('ALTER TABLE meals ALTER COLUMN time TYPE TIME USING time::time')
+        op.execute('ALTER TABLE nutrition_daily_totals ALTER COLUMN date TYPE DATE USING date::date')
+    else:
+        # SQLite stores DATE/TIME as text either way, and rebuilding the table would
+        # CAST the values to numbers, so only the stored format is adjusted here:
+        # SQLAlchemy's TIME expects seconds
+        op.execute(r"UPDATE meals SET time = time || '\:00' WHERE length(time) <= 5")
+
+    op.create_index('ix_meals_user_id_date', 'meals', ['user_id', 'date'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_meals_user_id_date', table_name='meals')
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("ALTER TABLE nutrition_daily_totals ALTER COLUMN date TYPE VARCHAR USING to_char(date, 'YYYY-MM-DD')")
+        op.execute(r"ALTER TABLE meals ALTER COLUMN time TYPE VARCHAR USING to_char(time, 'HH24\:MI')")
+        op.execute("ALTER TABLE meals ALTER COLUMN date TYPE VARCHAR USING to_char(date, 'YYYY-MM-DD')")
+    else:
+        op.execute("UPDATE meals SET time = substr(time, 1, 5)")
@@ -0,0 +1,36 @@
+"""add ai workout plan cache table
+
+Revision ID: 8e2c4f6a1b95
+Revises: 3f8b6d2a9c47
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2c4f6a1b95'
+down_revision = '3f8b6d2a9c47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ai_workout_plan_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('request', sa.JSON(), nullable=False),
+        sa.Column('plan', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_ai_workout_plan_cache_last_used_at', 'ai_workout_plan_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_workout_plan_cache_last_used_at', table_name='ai_workout_plan_cache')
+    op.drop_table('ai_workout_plan_cache')
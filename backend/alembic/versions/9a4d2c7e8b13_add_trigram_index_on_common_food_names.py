@@ -0,0 +1,33 @@
+"""add trigram index on common food names
+
+Revision ID: 9a4d2c7e8b13
+Revises: 6b3e8a1f52c7
+Create Date: 2026-10-17 14:05:52.611930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4d2c7e8b13'
+down_revision = '6b3e8a1f52c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # pg_trgm only exists on Postgres; other databases use the in-memory food index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_common_foods_name_trgm '
+        'ON common_foods USING gin (lower(name) gin_trgm_ops)'
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('DROP INDEX IF EXISTS ix_common_foods_name_trgm')
@@ -0,0 +1,48 @@
+"""add composite indexes for workout hot paths
+
+Revision ID: b5e9c1d7a248
+Revises: 7d1f5b3a0c62
+Create Date: 2026-10-17 16:02:44.187305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e9c1d7a248'
+down_revision = '7d1f5b3a0c62'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_workouts_user_id_is_template_date', 'workouts', ['user_id', 'is_template', sa.text('date DESC')], {}),
+    ('ix_exercises_workout_id_name', 'exercises', ['workout_id', 'name'], {}),
+    ('ix_sets_exercise_id_weight', 'sets', ['exercise_id', sa.text('weight DESC')], {}),
+    ('ix_notifications_user_id_created_at', 'notifications', ['user_id', sa.text('created_at DESC')], {}),
+    ('ix_notifications_user_id_unread', 'notifications', ['user_id'],
+     {'postgresql_where': sa.text('read = false'), 'sqlite_where': sa.text('read = 0')}),
+    ('ix_user_sessions_token_hash', 'user_sessions', ['token'], {'postgresql_using': 'hash'}),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Build without locking writes on the live tables; CONCURRENTLY can't run in a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns, options in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **options)
+            # Equality lookups by token are now served by the hash index
+            op.drop_index('ix_user_sessions_token', table_name='user_sessions',
+                          postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, **options)
+        op.drop_index('ix_user_sessions_token', table_name='user_sessions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_user_sessions_token', 'user_sessions', ['token'], unique=False)
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
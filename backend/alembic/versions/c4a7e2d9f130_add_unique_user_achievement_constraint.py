@@ -0,0 +1,56 @@
+"""add unique user achievement constraint
+
+Revision ID: c4a7e2d9f130
+Revises: 8e2c4f6a1b95
+Create Date: 2026-10-18 14:37:52.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a7e2d9f130'
+down_revision = '8e2c4f6a1b95'
+branch_labels = None
+depends_on = None
+
+
+# Same ranking as /achievements/cleanup-duplicates: keep the earliest achieved row
+# of every pair, or the one with the highest progress if none was achieved
+DELETE_DUPLICATES = sa.text("""
+    DELETE FROM user_achievements
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id, achievement_id
+                ORDER BY achieved_at ASC NULLS LAST, progress DESC, id
+            ) AS rank
+            FROM user_achievements
+        ) ranked
+        WHERE rank > 1
+    )
+""")
+
+
+def upgrade() -> None:
+    op.execute(DELETE_DUPLICATES)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Build the index without locking writes, then promote it to the constraint
+        with op.get_context().autocommit_block():
+            # A failed earlier attempt leaves an INVALID index behind; rebuild it, after
+            # removing duplicates written since the delete above was committed
+            op.execute('DROP INDEX CONCURRENTLY IF EXISTS unique_user_achievement')
+            op.execute(DELETE_DUPLICATES)
+            op.create_index('unique_user_achievement', 'user_achievements', ['user_id', 'achievement_id'],
+                            unique=True, postgresql_concurrently=True)
+        op.execute('ALTER TABLE user_achievements ADD CONSTRAINT unique_user_achievement '
+                   'UNIQUE USING INDEX unique_user_achievement')
+    else:
+        with op.batch_alter_table('user_achievements') as batch_op:
+            batch_op.create_unique_constraint('unique_user_achievement', ['user_id', 'achievement_id'])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_achievements') as batch_op:
+        batch_op.drop_constraint('unique_user_achievement', type_='unique')
@@ -6,7 +6,6 @@ from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, status,
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, inspect, text
-from passlib.context import CryptContext
 from datetime import timedelta, datetime, timezone
 import jwt as pyjwt
 from jwt.exceptions import PyJWTError as JWTError
@@ -14,8 +13,11 @@ from database import get_db, SessionLocal
 from models import User, AdminSettings, Set, Exercise, Workout, WorkoutPreferences, NutritionMeal, NutritionFood, NutritionGoal, CommonFood, UserSession, UserProfile
 from schemas import UserCreate, UserLogin, Token, GoogleTokenVerifyRequest, GoogleAuthResponse, AppleTokenVerifyRequest, AppleAuthResponse, ForgotPasswordRequest, ResetPasswordRequest, TokenVerificationRequest, ConfirmAccountDeletionRequest, ResendVerificationRequest, ChangePasswordRequest, SessionSettingsUpdate, UserSessionResponse
 from config import settings
-from security import generate_verification_token, hash_password, verify_password
+from security import generate_verification_token, hash_password, verify_password, hash_password_async, verify_password_async
 from dependencies import get_current_user as original_get_current_user, oauth2_scheme
+from auth_cache import auth_cache, attach_user
+from admin_settings_cache import admin_settings_cache
+from nutrition_totals import refresh_daily_totals
 from email_service import send_verification_email, notify_admin_new_registration, send_password_reset_email, send_password_changed_email, send_account_deletion_email, notify_admin_account_verified, notify_admin_password_changed, notify_admin_account_deletion
 
 from requests_oauthlib import OAuth2Session
@@ -36,7 +38,6 @@ ALLOWED_EMAIL_DOMAINS = {
     "icloud.com", "live.com", "live.se", "hotmail.se"
 }
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 # Try to connect to Redis for token blacklisting
@@ -106,15 +107,10 @@ def register(user: UserCreate, background_tasks: BackgroundTasks, db: Session =
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = hash_password(user.password)
 
     # Check admin settings for auto-verification
-    admin_settings = db.query(AdminSettings).first()
-    if not admin_settings:
-        admin_settings = AdminSettings()
-        db.add(admin_settings)
-        db.commit()
-        db.refresh(admin_settings)
+    admin_settings = admin_settings_cache.get()
 
     # Generate verification token
     token = generate_verification_token()
@@ -214,6 +210,7 @@ def register(user: UserCreate, background_tasks: BackgroundTasks, db: Session =
         )
         db.add(default_goals)
         
+        refresh_daily_totals(db, new_user.id, [today])
         db.commit()
         print(f"Created default meal and nutrition goals for new user: {new_user.email}")
     except Exception as e:
@@ -250,18 +247,16 @@ def login(user: UserLogin, request: Request, db: Session = Depends(get_db)):
         print(f"Login failed: User with email {user.email} not found")
         raise HTTPException(status_code=401, detail="User does not exist. Please check your email or register a new account.")
         
-    if not pwd_context.verify(user.password, db_user.hashed_password):
+    # End the read transaction so the pooled connection isn't held while bcrypt runs
+    hashed_password = db_user.hashed_password
+    db.commit()
+
+    if not verify_password(user.password, hashed_password):
         print(f"Login failed: Incorrect password for user {user.email}")
         raise HTTPException(status_code=401, detail="Incorrect password. Please try again.")
 
     # Check admin settings for email verification requirement
-    admin_settings = db.query(AdminSettings).first()
-    if not admin_settings:
-        print("Admin settings not found, creating default settings")
-        admin_settings = AdminSettings()
-        db.add(admin_settings)
-        db.commit()
-        db.refresh(admin_settings)
+    admin_settings = admin_settings_cache.get()
 
     print(f"Admin settings - require_email_verification: {admin_settings.require_email_verification}")
     print(f"User {db_user.email} verification status: {db_user.is_verified}")
@@ -458,6 +453,7 @@ async def google_callback(code: str, request: Request, background_tasks: Backgro
                 )
                 db.add(default_goals)
                 
+                refresh_daily_totals(db, new_user.id, [today])
                 db.commit()
                 print(f"Created default meal and nutrition goals for new Google user: {new_user.email}")
             except Exception as e:
@@ -499,10 +495,7 @@ async def google_callback(code: str, request: Request, background_tasks: Backgro
             db.commit()
             print(f"Invalidated existing sessions for user {user.email} on new Google login")
 
-        admin_settings = db.query(AdminSettings).first()
-        session_timeout = settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        if admin_settings:
-            session_timeout = admin_settings.session_timeout
+        session_timeout = admin_settings_cache.get().session_timeout
 
         access_token = create_access_token(
             {"sub": user.username}, timedelta(minutes=session_timeout)
@@ -715,6 +708,7 @@ async def verify_google_token(
                 )
                 db.add(default_goals)
                 
+                refresh_daily_totals(db, user.id, [today])
                 db.commit()
                 print(f"Created default meal and nutrition goals for new Google user: {user.email}")
             except Exception as e:
@@ -987,6 +981,7 @@ async def verify_apple_token(
                         )
                         db.add(meal_food)
                 
+                refresh_daily_totals(db, user.id, [today])
                 db.commit()
                 print(f"Created default meal for new Apple user: {email}")
                 
@@ -1117,13 +1112,14 @@ async def reset_password(request: ResetPasswordRequest, background_tasks: Backgr
             raise HTTPException(status_code=400, detail="Reset token has expired")
         
         # Update password
-        user.hashed_password = pwd_context.hash(request.new_password)
+        user.hashed_password = await hash_password_async(request.new_password)
         
         # Clear the reset token
         user.reset_token = None
         user.reset_token_expires_at = None
         
         db.commit()
+        auth_cache.invalidate_user(user.id)
         
         # Send confirmation email
         background_tasks.add_task(
@@ -1359,6 +1355,7 @@ async def confirm_account_deletion(
                 result = db.execute(text("DELETE FROM users WHERE id = :user_id"), 
                                    {"user_id": user_id})
                 db.commit()
+                auth_cache.invalidate_user(user_id)
                 
                 print(f"User {username} (ID: {user_id}, Email: {email}) deleted successfully via direct SQL")
                 
@@ -1564,6 +1561,7 @@ async def confirm_account_deletion(
                         result = db.execute(text("DELETE FROM users WHERE id = :user_id"), 
                                           {"user_id": user_id})
                         db.commit()
+                        auth_cache.invalidate_user(user_id)
                         
                         print(f"User {username} (ID: {user_id}, Email: {email}) deleted successfully via SQL")
                         
@@ -1651,6 +1649,7 @@ async def logout(token: str = Depends(oauth2_scheme), current_user: User = Depen
             session.is_active = False
             db.commit()
             print(f"Session for user {current_user.username} invalidated")
+        auth_cache.invalidate_token(token)
         
         # Add token to blacklist with expiry time from JWT payload
         try:
@@ -1682,6 +1681,11 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # A cached token whose session was already found active needs no queries
+    cached = auth_cache.get(token)
+    if cached is not None and cached.session_valid:
+        return attach_user(db, cached)
+    
     # Check if this is a valid session in the database
     try:
         # First, decode the token to get the username
@@ -1720,7 +1724,9 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         pass
     
     # If not blacklisted and session is valid, use the original function
-    return original_get_current_user(token, db)
+    user = original_get_current_user(token, db)
+    auth_cache.set_session_valid(token, True)
+    return user
 
 @router.post("/resend-verification")
 async def resend_verification(
@@ -1794,12 +1800,13 @@ async def change_password(
             raise HTTPException(status_code=400, detail="New password must be at least 8 characters long")
         
         # Verify old password
-        if not pwd_context.verify(request.old_password, user.hashed_password):
+        if not await verify_password_async(request.old_password, user.hashed_password):
             raise HTTPException(status_code=400, detail="Incorrect old password")
         
         # Update password
-        user.hashed_password = pwd_context.hash(request.new_password)
+        user.hashed_password = await hash_password_async(request.new_password)
         db.commit()
+        auth_cache.invalidate_user(user.id)
         
         # Send confirmation email
         background_tasks.add_task(
@@ -1858,6 +1865,7 @@ async def revoke_session(
     
     session.is_active = False
     db.commit()
+    auth_cache.invalidate_token(session.token)
     
     # Add token to blacklist
     try:
@@ -1891,6 +1899,7 @@ async def revoke_all_sessions(
     
     for session in sessions:
         session.is_active = False
+        auth_cache.invalidate_token(session.token)
         # Add token to blacklist
         try:
             payload = pyjwt.decode(
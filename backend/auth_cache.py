@@ -0,0 +1,167 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set
+import hashlib
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from config import settings
+from models import User
+
+
+def hash_token(token: str) -> str:
+    """Cache key for a bearer token, so raw tokens are never kept in memory as keys"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def snapshot_user(user: User) -> User:
+    """
+    Copy the column values of a loaded user into a detached instance.
+
+    The copy is never attached to a session itself; attach_user merges it into the
+    request's session, which gives every request its own persistent User object.
+    """
+    snapshot = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+class CachedAuth:
+    """What one validated token resolved to"""
+    __slots__ = ("claims", "user_id", "user", "session_valid", "expires_at")
+
+    def __init__(self, claims: dict, user: User, expires_at: float):
+        self.claims = claims
+        self.user_id = user.id
+        self.user = snapshot_user(user)
+        # None until the UserSession table has been checked for this token
+        self.session_valid: Optional[bool] = None
+        self.expires_at = expires_at
+
+
+class AuthCache:
+    """
+    Per-process TTL/LRU cache of authenticated tokens.
+
+    Entries live for at most ttl_seconds and never beyond the token's own expiry.
+    Other worker processes keep their own copy, so explicit invalidation only
+    reaches this process; the TTL bounds how long the others can lag behind.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedAuth]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> Optional[CachedAuth]:
+        if not self.enabled:
+            return None
+        key = hash_token(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, token: str, claims: dict, user: User) -> Optional[CachedAuth]:
+        if not self.enabled:
+            return None
+        expires_at = time.monotonic() + self.ttl_seconds
+        token_exp = claims.get("exp")
+        if token_exp:
+            # Never serve a token from cache after the token itself has expired
+            remaining = token_exp - datetime.now(timezone.utc).timestamp()
+            expires_at = min(expires_at, time.monotonic() + remaining)
+        entry = CachedAuth(claims, user, expires_at)
+        key = hash_token(token)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._tokens_by_user.setdefault(entry.user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+        return entry
+
+    def set_session_valid(self, token: str, valid: bool):
+        with self._lock:
+            entry = self._entries.get(hash_token(token))
+            if entry is not None:
+                entry.session_valid = valid
+
+    def invalidate_token(self, token: str):
+        with self._lock:
+            if self._remove(hash_token(token)):
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token of a user, e.g. after their row changed"""
+        with self._lock:
+            for key in list(self._tokens_by_user.get(user_id, ())):
+                if self._remove(key):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        user_keys = self._tokens_by_user.get(entry.user_id)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._tokens_by_user[entry.user_id]
+        return True
+
+
+auth_cache = AuthCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def attach_user(db: Session, entry: CachedAuth) -> User:
+    """Attach the cached user to the request's session without querying the database"""
+    return db.merge(entry.user, load=False)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    # Safety net for user changes made outside the explicitly invalidating endpoints
+    auth_cache.invalidate_user(target.id)
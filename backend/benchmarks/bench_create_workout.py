@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark the POST /workouts write path.
+
+Compares the previous ORM path (one flush per exercise so the id is known before
+adding its sets) with the batched bulk_insert_workout pipeline, and prints p50/p99
+latency for workouts with 5, 20 and 50 exercises.
+
+Usage:
+    python benchmarks/bench_create_workout.py [--iterations 200] [--sets 4]
+
+Set BENCH_DB_URL to run against a real database (e.g. a local Postgres, where the
+saved round trips matter most); by default a throwaway SQLite file is used.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Make the backend modules importable when run from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User, Workout, Exercise, Set
+from schemas import WorkoutCreate
+from workout_writes import bulk_insert_workout
+
+EXERCISE_COUNTS = [5, 20, 50]
+
+
+def build_workout(exercise_count: int, sets_per_exercise: int) -> WorkoutCreate:
+    return WorkoutCreate(
+        name=f"Benchmark {exercise_count}",
+        exercises=[
+            {
+                "name": f"Exercise {i}",
+                "category": "Benchmark",
+                "sets": [{"weight": 60 + s, "reps": 8, "order": s} for s in range(sets_per_exercise)],
+            }
+            for i in range(exercise_count)
+        ],
+    )
+
+
+def legacy_insert_workout(db, user_id: int, workout: WorkoutCreate) -> int:
+    """The previous create_workout write path, kept here as the baseline"""
+    db_workout = Workout(name=workout.name, date=workout.date, weight_unit=workout.weight_unit, user_id=user_id)
+    db.add(db_workout)
+    db.flush()
+    for exercise_data in workout.exercises:
+        new_exercise = Exercise(
+            name=exercise_data.name,
+            category=exercise_data.category or "Uncategorized",
+            is_cardio=exercise_data.is_cardio,
+            workout_id=db_workout.id
+        )
+        db.add(new_exercise)
+        db.flush()
+        for i, set_data in enumerate(exercise_data.sets):
+            db.add(Set(weight=set_data.weight, reps=set_data.reps, order=set_data.order, exercise_id=new_exercise.id))
+    return db_workout.id
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(SessionLocal, user_id, insert_fn, workout, iterations):
+    timings = []
+    for _ in range(iterations):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            insert_fn(db, user_id, workout)
+            db.commit()
+            timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--sets", type=int, default=4, help="sets per exercise")
+    args = parser.parse_args()
+
+    db_url = os.getenv("BENCH_DB_URL")
+    if not db_url:
+        db_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(db_url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = SessionLocal()
+    user = User(email=f"bench-{time.time()}@example.com", username=f"bench-{time.time()}", hashed_password="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    print(f"{args.iterations} iterations, {args.sets} sets per exercise\n")
+    print(f"{'exercises':>9}  {'path':<8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+
+    for exercise_count in EXERCISE_COUNTS:
+        workout = build_workout(exercise_count, args.sets)
+        for label, insert_fn in (("legacy", legacy_insert_workout), ("bulk", bulk_insert_workout)):
+            # Warm up connections and statement caches
+            run(SessionLocal, user_id, insert_fn, workout, 3)
+            timings = run(SessionLocal, user_id, insert_fn, workout, args.iterations)
+            print(f"{exercise_count:>9}  {label:<8} {percentile(timings, 50):>8.2f} "
+                  f"{percentile(timings, 99):>8.2f} {statistics.mean(timings):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
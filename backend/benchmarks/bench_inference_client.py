@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Exercise the Hugging Face inference client against a local stub server.
+
+The stub answers POST /models/<model> like the inference API: --latency seconds
+until the first token, then --tokens tokens --token-latency seconds apart, all at
+once or streamed as Server-Sent Events when the request asks for "stream". A share
+of requests (--failure-rate) gets a 503 "model loading" reply, and in the outage
+scenario every request fails. Four scenarios run against it:
+
+  concurrent  --calls generations at once; reports wall time, how many TCP
+              connections the pool opened, and the longest event loop stall
+              (next to the same calls made with blocking requests.post)
+  flaky       the same calls with --failure-rate failures; reports successes,
+              retries and latency
+  outage      every request fails; reports when the circuit breaker opens and
+              how fast calls are refused while it is open
+  stream      one generation at a time, whole versus streamed; reports the time
+              until the first token arrives
+
+Usage:
+    python benchmarks/bench_inference_client.py [--calls 40] [--latency 0.2] [--failure-rate 0.3]
+
+    # Only run the stub, e.g. to point the app at it with
+    # HF_INFERENCE_URL=http://127.0.0.1:8765 HUGGINGFACE_API_TOKEN=stub
+    python benchmarks/bench_inference_client.py --serve --port 8765
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Make the backend modules importable when run from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from inference_client import CircuitBreaker, InferenceClient, InferenceError, InferenceUnavailable
+
+
+class StubState:
+    def __init__(self, latency: float, failure_rate: float, tokens: int = 20, token_latency: float = 0.0):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_latency = token_latency
+        self.failure_rate = failure_rate
+        self.down = False
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = set()
+        self.rng = random.Random(3)
+
+
+def make_handler(state: StubState):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, so pooled connections get reused
+
+        def do_GET(self):
+            # Counters for the benchmark, which runs in another process
+            with state.lock:
+                stats = {"requests": state.requests, "connections": len(state.connections)}
+            self._reply(200, stats)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/_config":
+                with state.lock:
+                    state.failure_rate = payload.get("failure_rate", state.failure_rate)
+                    state.down = payload.get("down", state.down)
+                    state.token_latency = payload.get("token_latency", state.token_latency)
+                    state.requests = 0
+                    state.connections.clear()
+                self._reply(200, {})
+                return
+            with state.lock:
+                state.requests += 1
+                state.connections.add(self.client_address)
+                fail = state.down or state.rng.random() < state.failure_rate
+            tokens = [f"{payload.get('inputs', '')[:40]} ... stub answer"] + [f" token{i}" for i in range(state.tokens)]
+            time.sleep(state.latency)
+            if fail:
+                self._reply(503, {"error": "Model is currently loading"})
+            elif payload.get("stream"):
+                self._stream(tokens)
+            else:
+                time.sleep(state.token_latency * (len(tokens) - 1))
+                self._reply(200, [{"generated_text": "".join(tokens)}])
+
+        def _stream(self, tokens):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(state.token_latency)
+                event = {"token": {"id": i, "text": token, "special": False}, "generated_text": None}
+                self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            self._write_chunk(b"")
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _reply(self, status: int, content):
+            body = json.dumps(content).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub(state: StubState, port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_client(url: str, args, breaker: CircuitBreaker = None) -> InferenceClient:
+    return InferenceClient(
+        base_url=url, token="stub", timeout_seconds=10, max_concurrency=args.concurrency,
+        max_retries=args.retries, backoff_seconds=0.05, backoff_max_seconds=0.5,
+        breaker=breaker or CircuitBreaker(failure_threshold=5, reset_seconds=60)
+    )
+
+
+async def measure_loop_stall(stop: asyncio.Event) -> float:
+    """Longest gap between 10 ms ticks of the event loop while the calls run"""
+    longest = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.01)
+        now = time.perf_counter()
+        longest = max(longest, now - last - 0.01)
+        last = now
+    return longest
+
+
+async def run_calls(client: InferenceClient, calls: int):
+    async def one(i):
+        started = time.perf_counter()
+        try:
+            await client.generate(f"prompt {i}", "stub-model")
+            return True, time.perf_counter() - started
+        except InferenceError:
+            return False, time.perf_counter() - started
+
+    stop = asyncio.Event()
+    stall = asyncio.create_task(measure_loop_stall(stop))
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(one(i) for i in range(calls)))
+    wall = time.perf_counter() - started
+    stop.set()
+    return results, wall, await stall
+
+
+async def run_blocking_calls(url: str, calls: int):
+    """The previous approach: requests.post straight from the event loop"""
+    stop = asyncio.Event()
+    stall = asyncio.create_task(measure_loop_stall(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    for i in range(calls):
+        requests.post(f"{url}/models/stub-model", json={"inputs": f"prompt {i}"}, timeout=30)
+        await asyncio.sleep(0)
+    wall = time.perf_counter() - started
+    stop.set()
+    return wall, await stall
+
+
+def configure_stub(url: str, **config):
+    requests.post(f"{url}/_config", json=config, timeout=5)
+
+
+def stub_stats(url: str) -> dict:
+    return requests.get(f"{url}/_stats", timeout=5).json()
+
+
+async def main_async(args, url: str):
+    print(f"Stub server on {url}, latency {args.latency}s, client concurrency {args.concurrency}\n")
+
+    # 1. Concurrent calls through the pooled client versus blocking requests
+    configure_stub(url, failure_rate=0.0, down=False)
+    client = make_client(url, args)
+    results, wall, stall = await run_calls(client, args.calls)
+    stats = stub_stats(url)
+    print(f"concurrent: {sum(ok for ok, _ in results)}/{args.calls} ok in {wall:.2f}s, "
+          f"{stats['connections']} connections for {stats['requests']} requests, "
+          f"longest loop stall {stall * 1000:.0f} ms")
+    await client.aclose()
+    wall, stall = await run_blocking_calls(url, args.calls)
+    print(f"blocking:   {args.calls} calls with requests.post in {wall:.2f}s, "
+          f"longest loop stall {stall * 1000:.0f} ms")
+
+    # 2. Flaky upstream: retries with jittered backoff
+    configure_stub(url, failure_rate=args.failure_rate)
+    client = make_client(url, args, CircuitBreaker(failure_threshold=args.calls, reset_seconds=60))
+    results, wall, _ = await run_calls(client, args.calls)
+    latencies = sorted(latency for _, latency in results)
+    print(f"\nflaky ({args.failure_rate:.0%} of requests fail): {sum(ok for ok, _ in results)}/{args.calls} ok, "
+          f"{client.retries} retries over {stub_stats(url)['requests']} requests, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms")
+    await client.aclose()
+
+    # 3. Outage: the breaker opens and calls are refused without touching the network
+    configure_stub(url, down=True)
+    client = make_client(url, args, CircuitBreaker(failure_threshold=5, reset_seconds=60))
+    timings = []
+    opened_after = None
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.calls):
+            started = time.perf_counter()
+            try:
+                await client.generate(f"prompt {i}", "stub-model")
+            except InferenceUnavailable:
+                timings.append(time.perf_counter() - started)
+            except InferenceError:
+                if client.breaker.state == "open" and opened_after is None:
+                    opened_after = i + 1
+    print(f"\noutage: breaker opened after {opened_after} failed calls ({stub_stats(url)['requests']} requests); "
+          f"{len(timings)} calls refused while open, "
+          f"{(sum(timings) / max(len(timings), 1)) * 1e6:.0f} us each")
+    await client.aclose()
+
+    # 4. Streaming: how long until the first token is there to show
+    configure_stub(url, failure_rate=0.0, down=False, token_latency=args.token_latency)
+    client = make_client(url, args)
+    whole, first, streamed = [], [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(5):
+            started = time.perf_counter()
+            await client.generate(f"prompt {i}", "stub-model")
+            whole.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            async for _ in client.stream(f"prompt {i}", "stub-model"):
+                if len(first) == i:
+                    first.append(time.perf_counter() - started)
+            streamed.append(time.perf_counter() - started)
+    median = lambda values: sorted(values)[len(values) // 2] * 1000
+    print(f"\nstream ({args.tokens} tokens, {args.token_latency * 1000:.0f} ms apart): whole answer after "
+          f"{median(whole):.0f} ms; streamed, first token after {median(first):.0f} ms, "
+          f"last after {median(streamed):.0f} ms")
+    await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="stub response time in seconds")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens per stub answer")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="stub time between tokens in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.3, help="share of 503s in the flaky scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="client concurrency limit")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765, help="stub server port")
+    parser.add_argument("--serve", action="store_true", help="only run the stub server")
+    args = parser.parse_args()
+
+    if args.serve:
+        server = start_stub(StubState(args.latency, args.failure_rate, args.tokens), args.port)
+        print(f"Stub inference server on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)", flush=True)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
+    # The stub runs in its own process so it doesn't compete with the client for the GIL
+    port = args.port
+    stub = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port),
+                             "--latency", str(args.latency), "--tokens", str(args.tokens)],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        stub.stdout.readline()
+        asyncio.run(main_async(args, f"http://127.0.0.1:{port}"))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark meal lookups before and after the typed date/time migration.
+
+Seeds two copies of a meals table with the same rows: the previous layout
+(date and time as strings, no index beyond the primary key) and the migrated
+one (DATE/TIME columns plus the (user_id, date) index). Then times the query
+shapes the nutrition endpoints run for random users: a single day (diary), a
+week range (weekly diary, chat context) and a year range (history).
+
+Usage:
+    python benchmarks/bench_meal_dates.py [--meals 1000000] [--users 2000] [--queries 300]
+
+Set BENCH_DB_URL to run against a real database (e.g. a local Postgres, which is
+where the DATE type itself matters); by default a throwaway SQLite file is used.
+Seeding 1M meals takes a little while; use --meals for a quicker run.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta, time as time_of_day
+
+# Make the backend modules importable when run from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import (create_engine, MetaData, Table, Column, Integer, String, Date, Time, Index,
+                        select, func, insert)
+
+SEED_BATCH_SIZE = 50000
+FIRST_DAY = date(2023, 1, 1)
+DAYS = 3 * 365
+MEAL_TIMES = ["08:00", "12:30", "15:30", "19:00"]
+
+
+def define_tables(metadata: MetaData):
+    legacy = Table(
+        "bench_meals_legacy", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String, nullable=False),
+        Column("date", String, nullable=False),
+        Column("time", String, nullable=False),
+        Column("user_id", Integer, nullable=False),
+    )
+    typed = Table(
+        "bench_meals_typed", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("name", String, nullable=False),
+        Column("date", Date, nullable=False),
+        Column("time", Time, nullable=False),
+        Column("user_id", Integer, nullable=False),
+        Index("ix_bench_meals_typed_user_id_date", "user_id", "date"),
+    )
+    return legacy, typed
+
+
+def seed(engine, legacy, typed, meals: int, users: int):
+    rng = random.Random(42)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, meals, SEED_BATCH_SIZE):
+            legacy_rows, typed_rows = [], []
+            for _ in range(min(SEED_BATCH_SIZE, meals - start)):
+                day = FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+                meal_time = rng.choice(MEAL_TIMES)
+                user_id = rng.randint(1, users)
+                legacy_rows.append({"name": "Meal", "date": day.strftime("%Y-%m-%d"), "time": meal_time, "user_id": user_id})
+                hour, minute = map(int, meal_time.split(":"))
+                typed_rows.append({"name": "Meal", "date": day, "time": time_of_day(hour, minute), "user_id": user_id})
+            conn.execute(insert(legacy), legacy_rows)
+            conn.execute(insert(typed), typed_rows)
+    print(f"Seeded {meals} meals for {users} users into both tables in {time.perf_counter() - started:.1f}s")
+
+
+def time_queries(engine, table, typed: bool, users: int, queries: int) -> dict:
+    rng = random.Random(7)
+    last_day = FIRST_DAY + timedelta(days=DAYS - 1)
+
+    def as_param(day: date):
+        return day if typed else day.strftime("%Y-%m-%d")
+
+    shapes = {
+        "single day": lambda day: (table.c.date == as_param(day),),
+        "week range": lambda day: (table.c.date >= as_param(day - timedelta(days=7)), table.c.date <= as_param(day)),
+        "year range": lambda day: (table.c.date >= as_param(day - timedelta(days=365)), table.c.date <= as_param(day)),
+    }
+    results = {}
+    with engine.connect() as conn:
+        for shape, criteria in shapes.items():
+            timings = []
+            for _ in range(queries):
+                user_id = rng.randint(1, users)
+                day = last_day - timedelta(days=rng.randrange(365))
+                statement = select(table.c.date, func.count()).where(
+                    table.c.user_id == user_id, *criteria(day)
+                ).group_by(table.c.date)
+                started = time.perf_counter()
+                conn.execute(statement).all()
+                timings.append((time.perf_counter() - started) * 1000)
+            results[shape] = timings
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--meals", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300, help="queries timed per shape")
+    args = parser.parse_args()
+
+    db_url = os.getenv("BENCH_DB_URL")
+    temp_dir = None
+    if not db_url:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(temp_dir.name, 'bench.db')}"
+    engine = create_engine(db_url)
+
+    metadata = MetaData()
+    legacy, typed = define_tables(metadata)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    try:
+        seed(engine, legacy, typed, args.meals, args.users)
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"ANALYZE {legacy.name}")
+                conn.exec_driver_sql(f"ANALYZE {typed.name}")
+
+        before = time_queries(engine, legacy, False, args.users, args.queries)
+        after = time_queries(engine, typed, True, args.users, args.queries)
+
+        print(f"\n{'query':<12} {'before p50':>11} {'after p50':>10} {'before mean':>12} {'after mean':>11} {'speedup':>8}")
+        for shape in before:
+            before_p50, after_p50 = statistics.median(before[shape]), statistics.median(after[shape])
+            print(f"{shape:<12} {before_p50:>9.2f}ms {after_p50:>8.2f}ms "
+                  f"{statistics.mean(before[shape]):>10.2f}ms {statistics.mean(after[shape]):>9.2f}ms "
+                  f"{before_p50 / max(after_p50, 1e-6):>7.1f}x")
+    finally:
+        metadata.drop_all(engine)
+        engine.dispose()
+        if temp_dir:
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark the meal plan planners: greedy versus the "lp" optimizer.
+
+Builds a food catalog (synthetic by default, or from the configured database with
+--from-db) and generates plans for random daily targets at 3, 4, 5 and 6 meals per
+day. For each planner it reports how far the plan's totals land from the targets
+(mean absolute error in percent, per macro) and the p50/p99 planning time.
+
+Usage:
+    python benchmarks/bench_meal_plan.py [--plans 50] [--foods 600] [--from-db]
+
+The optimizer's time budget comes from MEAL_PLAN_TIME_BUDGET_SECONDS like in the app.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+# Make the backend modules importable when run from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from config import settings
+from food_catalog import FoodCatalog
+from meal_planner import build_greedy_meal_plan, build_optimized_meal_plan
+
+MEAL_COUNTS = [3, 4, 5, 6]
+MACROS = ["calories", "protein", "carbs", "fat"]
+FOOD_GROUPS = ["grain", "fruit", "vegetable", "dairy", "meat", "legume", "nuts", "snack"]
+
+
+def synthetic_catalog(count: int) -> FoodCatalog:
+    rng = random.Random(1)
+    rows = []
+    for food_id in range(1, count + 1):
+        protein, carbs, fat = rng.uniform(0, 35), rng.uniform(0, 70), rng.uniform(0, 30)
+        calories = round(protein * 4 + carbs * 4 + fat * 9 + rng.uniform(-10, 10), 1)
+        rows.append((food_id, f"Food {food_id}", max(calories, 5), round(protein, 1), round(carbs, 1),
+                     round(fat, 1), "100g", rng.choice(FOOD_GROUPS)))
+    return FoodCatalog(rows, 1)
+
+
+def database_catalog() -> FoodCatalog:
+    from database import SessionLocal
+    from food_catalog import food_catalog_cache
+
+    db = SessionLocal()
+    try:
+        return food_catalog_cache.get(db)
+    finally:
+        db.close()
+
+
+def random_targets(rng: random.Random) -> SimpleNamespace:
+    calories = rng.randrange(1600, 3400, 50)
+    protein = rng.randrange(90, 220, 5)
+    fat = rng.randrange(45, 110, 5)
+    carbs = max(50, round((calories - protein * 4 - fat * 9) / 4))
+    return SimpleNamespace(calories=calories, protein=protein, carbs=carbs, fat=fat)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plans", type=int, default=50, help="plans per planner and meal count")
+    parser.add_argument("--foods", type=int, default=600, help="size of the synthetic catalog")
+    parser.add_argument("--from-db", action="store_true", help="use the foods in the configured database")
+    args = parser.parse_args()
+
+    catalog = database_catalog() if args.from_db else synthetic_catalog(args.foods)
+    allowed = np.ones(len(catalog), dtype=bool)
+    print(f"Catalog: {len(catalog)} foods, optimizer time budget {settings.MEAL_PLAN_TIME_BUDGET_SECONDS}s\n")
+    print(f"{'meals':>5} {'planner':>8} {'cal err%':>9} {'prot err%':>10} {'carb err%':>10} "
+          f"{'fat err%':>9} {'p50 ms':>8} {'p99 ms':>8} {'fallbacks':>9}")
+
+    for meal_count in MEAL_COUNTS:
+        targets = [random_targets(random.Random(meal_count * 1000 + i)) for i in range(args.plans)]
+        for planner in ("greedy", "lp"):
+            errors = {macro: [] for macro in MACROS}
+            timings = []
+            fallbacks = 0
+            for i, target in enumerate(targets):
+                started = time.perf_counter()
+                # The planners log every step; keep the table readable
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if planner == "greedy":
+                        random.seed(i)
+                        plan = build_greedy_meal_plan(catalog, allowed, target, meal_count)
+                    else:
+                        plan = build_optimized_meal_plan(catalog, allowed, target, meal_count, i,
+                                                         settings.MEAL_PLAN_TIME_BUDGET_SECONDS)
+                        if plan is None:
+                            fallbacks += 1
+                            random.seed(i)
+                            plan = build_greedy_meal_plan(catalog, allowed, target, meal_count)
+                timings.append((time.perf_counter() - started) * 1000)
+                _, totals = plan
+                for macro in MACROS:
+                    goal = getattr(target, macro)
+                    errors[macro].append(abs(totals[macro] - goal) / goal * 100)
+
+            print(f"{meal_count:>5} {planner:>8} "
+                  + " ".join(f"{statistics.mean(errors[macro]):>{width}.1f}"
+                             for macro, width in zip(MACROS, (9, 10, 10, 9)))
+                  + f" {percentile(timings, 50):>8.1f} {percentile(timings, 99):>8.1f} {fallbacks:>9}")
+
+
+if __name__ == "__main__":
+    main()
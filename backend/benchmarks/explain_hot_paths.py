@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Show the query plans of the workout hot paths with and without the composite indexes.
+
+Seeds a scratch database with users, workouts, exercises, sets, notifications and
+sessions, then runs the queries behind the main endpoints twice: once with the
+hot path indexes dropped and once with them in place. On Postgres every query goes
+through EXPLAIN (ANALYZE, BUFFERS) and the plan plus execution time is printed; on
+SQLite the EXPLAIN QUERY PLAN output is printed along with the measured run time.
+
+Usage:
+    python benchmarks/explain_hot_paths.py [--users 100] [--workouts 200]
+
+Set BENCH_DB_URL to run against a scratch Postgres database (the indexes get
+dropped and recreated there, so never point it at real data); by default a
+throwaway SQLite file is used.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Make the backend modules importable when run from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text
+
+from models import Base, User, Workout, Exercise, Set, Notification, UserSession
+
+HOT_PATH_INDEXES = [
+    "ix_workouts_user_id_is_template_date",
+    "ix_exercises_workout_id_name",
+    "ix_sets_exercise_id_weight",
+    "ix_notifications_user_id_created_at",
+    "ix_notifications_user_id_unread",
+    "ix_user_sessions_token_hash",
+]
+
+EXERCISE_NAMES = ["Bench Press", "Squat", "Deadlift", "Overhead Press", "Barbell Row", "Pull Up", "Curl"]
+
+# (label, SQL) pairs mirroring what the endpoints run; :user_id and :token are bound per run
+QUERIES = [
+    ("GET /workouts (latest page)",
+     "SELECT id, name, date FROM workouts WHERE user_id = :user_id AND is_template = false "
+     "ORDER BY date DESC LIMIT 50"),
+    ("GET /workouts (exercises of a page)",
+     "SELECT id, name, workout_id FROM exercises WHERE workout_id IN ("
+     "SELECT id FROM workouts WHERE user_id = :user_id AND is_template = false ORDER BY date DESC LIMIT 50)"),
+    ("GET /workouts (sets of a page)",
+     "SELECT s.id, s.weight, s.reps FROM sets s WHERE s.exercise_id IN ("
+     "SELECT e.id FROM exercises e JOIN workouts w ON w.id = e.workout_id "
+     "WHERE w.user_id = :user_id AND w.is_template = false)"),
+    ("Progress: heaviest set per exercise",
+     "SELECT w.id, e.name, MAX(s.weight) FROM workouts w "
+     "JOIN exercises e ON e.workout_id = w.id "
+     "LEFT JOIN sets s ON s.exercise_id = e.id AND s.weight IS NOT NULL "
+     "WHERE w.user_id = :user_id AND w.is_template = false AND e.name = 'Bench Press' "
+     "GROUP BY w.id, e.name"),
+    ("GET /notifications",
+     "SELECT id, message, created_at FROM notifications WHERE user_id = :user_id ORDER BY created_at DESC"),
+    ("Unread notification count",
+     "SELECT COUNT(*) FROM notifications WHERE user_id = :user_id AND read = false"),
+    ("Session lookup by token",
+     "SELECT id, user_id, is_active FROM user_sessions WHERE token = :token"),
+]
+
+
+def seed(engine, users: int, workouts_per_user: int):
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": u, "email": f"explain{u}@example.com", "username": f"explain{u}", "hashed_password": "x"}
+            for u in range(1, users + 1)
+        ])
+        workout_id = exercise_id = 0
+        for user_id in range(1, users + 1):
+            workouts, exercises, sets = [], [], []
+            for _ in range(workouts_per_user):
+                workout_id += 1
+                workouts.append({
+                    "id": workout_id, "name": "Workout", "user_id": user_id,
+                    "date": now - timedelta(days=rng.randrange(1000), minutes=rng.randrange(1440)),
+                    "is_template": rng.random() < 0.05,
+                })
+                for name in rng.sample(EXERCISE_NAMES, 5):
+                    exercise_id += 1
+                    exercises.append({"id": exercise_id, "name": name, "workout_id": workout_id, "category": "Strength"})
+                    for order in range(4):
+                        sets.append({"exercise_id": exercise_id, "order": order, "reps": 8,
+                                     "weight": None if rng.random() < 0.1 else float(rng.randint(20, 200))})
+            conn.execute(insert(Workout), workouts)
+            conn.execute(insert(Exercise), exercises)
+            conn.execute(insert(Set), sets)
+            conn.execute(insert(Notification), [
+                {"user_id": user_id, "message": "Hello", "type": "info", "read": rng.random() < 0.9,
+                 "created_at": now - timedelta(hours=rng.randrange(5000))}
+                for _ in range(100)
+            ])
+            conn.execute(insert(UserSession), [
+                {"user_id": user_id, "token": f"token-{user_id}-{n}", "expires_at": now + timedelta(days=7),
+                 "is_active": True}
+                for n in range(5)
+            ])
+    print(f"Seeded {users} users with {workouts_per_user} workouts each in {time.perf_counter() - started:.1f}s")
+
+
+def set_hot_path_indexes(engine, present: bool):
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    with engine.begin() as conn:
+        for name in HOT_PATH_INDEXES:
+            if present:
+                indexes[name].create(conn, checkfirst=True)
+            else:
+                indexes[name].drop(conn, checkfirst=True)
+        conn.execute(text("ANALYZE"))
+
+
+def explain(engine, sql: str, params: dict, repeat: int):
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            plan = [row[0] for row in conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)]
+            return plan, None
+        plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params)]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(text(sql), params).all()
+            timings.append((time.perf_counter() - started) * 1000)
+        return plan, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workouts", type=int, default=200, help="workouts per user")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query (SQLite)")
+    args = parser.parse_args()
+
+    db_url = os.getenv("BENCH_DB_URL")
+    temp_dir = None
+    if not db_url:
+        temp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(temp_dir.name, 'explain.db')}"
+    engine = create_engine(db_url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    try:
+        seed(engine, args.users, args.workouts)
+        params = {"user_id": args.users // 2 or 1, "token": f"token-{args.users // 2 or 1}-3"}
+        for present in (False, True):
+            set_hot_path_indexes(engine, present)
+            print(f"\n==== {'WITH' if present else 'WITHOUT'} HOT PATH INDEXES ====")
+            for label, sql in QUERIES:
+                plan, median_ms = explain(engine, sql, params, args.repeat)
+                print(f"\n-- {label}" + (f" (median {median_ms:.2f} ms)" if median_ms is not None else ""))
+                for line in plan:
+                    print(f"   {line}")
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+        if temp_dir:
+            temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
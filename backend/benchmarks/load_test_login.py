@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Load-test POST /auth/token under concurrency.
+
+Fires --requests logins at each concurrency level and reports throughput,
+p50/p99 latency and how many requests were shed with 503 by the password
+hashing pool.
+
+Usage:
+    # Against a running server, with an existing verified account
+    python benchmarks/load_test_login.py --url http://localhost:8000 --email me@example.com --password secret
+
+    # In-process against the database configured through DB_URL / DB_URL_LOCAL;
+    # a verified benchmark account is created if it doesn't exist yet
+    python benchmarks/load_test_login.py --concurrency 1 8 32 64
+
+Tune the pool with PASSWORD_HASH_WORKERS and PASSWORD_HASH_QUEUE_LIMIT.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+import httpx
+
+# Make the backend modules importable when run from the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_EMAIL = "login-bench@example.com"
+BENCH_PASSWORD = "login-bench-password"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def in_process_client():
+    """Build a client bound to the app itself, creating the benchmark account if needed"""
+    # The login path prints a lot; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main
+        from database import SessionLocal, engine
+        from models import Base, User
+        from security import hash_password
+
+        # Only creates missing tables, so a scratch SQLite database works out of the box
+        Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.email == BENCH_EMAIL).first()
+            if not user:
+                db.add(User(
+                    email=BENCH_EMAIL,
+                    username="login-bench",
+                    hashed_password=hash_password(BENCH_PASSWORD),
+                    is_verified=True,
+                    allow_multiple_sessions=True
+                ))
+                db.commit()
+        finally:
+            db.close()
+
+    transport = httpx.ASGITransport(app=main.app)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+
+async def run_level(client, concurrency, total, email, password):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one_login():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/auth/token", json={"email": email, "password": password})
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await asyncio.gather(*(one_login() for _ in range(total)))
+    elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+async def main_async(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+        email, password = args.email, args.password
+    else:
+        client = in_process_client()
+        email, password = BENCH_EMAIL, BENCH_PASSWORD
+
+    from security import password_hashing_pool
+
+    print(f"{'concurrency':>11} {'ok/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'503s':>6} {'other':>6}")
+    async with client:
+        for concurrency in args.concurrency:
+            latencies, statuses, elapsed = await run_level(client, concurrency, args.requests, email, password)
+            ok = statuses.get(200, 0)
+            shed = statuses.get(503, 0)
+            other = sum(statuses.values()) - ok - shed
+            print(f"{concurrency:>11} {ok / elapsed:>8.1f} {percentile(latencies, 50):>8.1f} "
+                  f"{percentile(latencies, 99):>8.1f} {shed:>6} {other:>6}")
+
+    if not args.url:
+        print(f"\nPassword hashing pool: {password_hashing_pool.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: in-process)")
+    parser.add_argument("--email", default=BENCH_EMAIL)
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--requests", type=int, default=100, help="logins per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
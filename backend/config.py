@@ -55,6 +55,53 @@ class Settings:
     DELETION_TOKEN_EXPIRE_HOURS: int = int(
         os.getenv("DELETION_TOKEN_EXPIRE_HOURS", 1))
 
+    # Per-process cache of authenticated tokens (0 disables it)
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", 10000))
+
+    # How often workers without LISTEN/NOTIFY check the admin settings version
+    ADMIN_SETTINGS_POLL_SECONDS: int = int(os.getenv("ADMIN_SETTINGS_POLL_SECONDS", 30))
+
+    # Threads dedicated to bcrypt, and how many jobs may wait for one before
+    # new logins are turned away with a 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE_LIMIT: int = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", 32))
+
+    # Keep per-day nutrition totals in nutrition_daily_totals and serve the history
+    # from there. After running with it off, rebuild_nutrition_totals.py catches up.
+    NUTRITION_DAILY_ROLLUP: bool = os.getenv("NUTRITION_DAILY_ROLLUP", "true").lower() == "true"
+
+    # Longest the "lp" meal plan optimizer may run before falling back to the greedy planner
+    MEAL_PLAN_TIME_BUDGET_SECONDS: float = float(os.getenv("MEAL_PLAN_TIME_BUDGET_SECONDS", 2.0))
+
+    # Per-process cache of generated meal plans (0 disables it). Users are spread over
+    # MEAL_PLAN_CACHE_VARIANTS plans per set of preferences so they don't all get the same one.
+    MEAL_PLAN_CACHE_TTL_SECONDS: int = int(os.getenv("MEAL_PLAN_CACHE_TTL_SECONDS", 3600))
+    MEAL_PLAN_CACHE_MAX_ENTRIES: int = int(os.getenv("MEAL_PLAN_CACHE_MAX_ENTRIES", 2000))
+    MEAL_PLAN_CACHE_VARIANTS: int = int(os.getenv("MEAL_PLAN_CACHE_VARIANTS", 8))
+
+    # Hugging Face inference client: base URL (point it at a stub server for testing),
+    # per-request timeout, calls in flight per worker, retries with jittered backoff,
+    # and how many failures in a row open the circuit breaker and for how long
+    HF_INFERENCE_URL: str = os.getenv("HF_INFERENCE_URL", "https://api-inference.huggingface.co")
+    HF_TIMEOUT_SECONDS: float = float(os.getenv("HF_TIMEOUT_SECONDS", 30))
+    HF_MAX_CONCURRENCY: int = int(os.getenv("HF_MAX_CONCURRENCY", 8))
+    HF_MAX_RETRIES: int = int(os.getenv("HF_MAX_RETRIES", 2))
+    HF_RETRY_BACKOFF_SECONDS: float = float(os.getenv("HF_RETRY_BACKOFF_SECONDS", 0.5))
+    HF_RETRY_BACKOFF_MAX_SECONDS: float = float(os.getenv("HF_RETRY_BACKOFF_MAX_SECONDS", 8))
+    HF_BREAKER_FAILURES: int = int(os.getenv("HF_BREAKER_FAILURES", 5))
+    HF_BREAKER_RESET_SECONDS: float = float(os.getenv("HF_BREAKER_RESET_SECONDS", 30))
+
+    # Persistent cache of parsed AI workout plans (ai_workout_plan_cache table)
+    AI_WORKOUT_CACHE_ENABLED: bool = os.getenv("AI_WORKOUT_CACHE_ENABLED", "true").lower() == "true"
+    AI_WORKOUT_CACHE_TTL_HOURS: float = float(os.getenv("AI_WORKOUT_CACHE_TTL_HOURS", 7 * 24))
+    AI_WORKOUT_CACHE_MAX_ENTRIES: int = int(os.getenv("AI_WORKOUT_CACHE_MAX_ENTRIES", 5000))
+
+    # Per-process cache of each user's nutrition chat context (0 disables it), so the
+    # follow-up questions of a conversation don't query it again
+    CHAT_CONTEXT_CACHE_TTL_SECONDS: int = int(os.getenv("CHAT_CONTEXT_CACHE_TTL_SECONDS", 300))
+    CHAT_CONTEXT_CACHE_MAX_ENTRIES: int = int(os.getenv("CHAT_CONTEXT_CACHE_MAX_ENTRIES", 5000))
+
 
 settings = Settings()
 
@@ -80,3 +127,26 @@ DEFAULT_ADMIN_EMAIL = settings.DEFAULT_ADMIN_EMAIL
 VERIFICATION_TOKEN_EXPIRE_HOURS = settings.VERIFICATION_TOKEN_EXPIRE_HOURS
 RESET_TOKEN_EXPIRE_HOURS = settings.RESET_TOKEN_EXPIRE_HOURS
 DELETION_TOKEN_EXPIRE_HOURS = settings.DELETION_TOKEN_EXPIRE_HOURS
+AUTH_CACHE_TTL_SECONDS = settings.AUTH_CACHE_TTL_SECONDS
+AUTH_CACHE_MAX_ENTRIES = settings.AUTH_CACHE_MAX_ENTRIES
+ADMIN_SETTINGS_POLL_SECONDS = settings.ADMIN_SETTINGS_POLL_SECONDS
+PASSWORD_HASH_WORKERS = settings.PASSWORD_HASH_WORKERS
+PASSWORD_HASH_QUEUE_LIMIT = settings.PASSWORD_HASH_QUEUE_LIMIT
+NUTRITION_DAILY_ROLLUP = settings.NUTRITION_DAILY_ROLLUP
+MEAL_PLAN_TIME_BUDGET_SECONDS = settings.MEAL_PLAN_TIME_BUDGET_SECONDS
+MEAL_PLAN_CACHE_TTL_SECONDS = settings.MEAL_PLAN_CACHE_TTL_SECONDS
+MEAL_PLAN_CACHE_MAX_ENTRIES = settings.MEAL_PLAN_CACHE_MAX_ENTRIES
+MEAL_PLAN_CACHE_VARIANTS = settings.MEAL_PLAN_CACHE_VARIANTS
+HF_INFERENCE_URL = settings.HF_INFERENCE_URL
+HF_TIMEOUT_SECONDS = settings.HF_TIMEOUT_SECONDS
+HF_MAX_CONCURRENCY = settings.HF_MAX_CONCURRENCY
+HF_MAX_RETRIES = settings.HF_MAX_RETRIES
+HF_RETRY_BACKOFF_SECONDS = settings.HF_RETRY_BACKOFF_SECONDS
+HF_RETRY_BACKOFF_MAX_SECONDS = settings.HF_RETRY_BACKOFF_MAX_SECONDS
+HF_BREAKER_FAILURES = settings.HF_BREAKER_FAILURES
+HF_BREAKER_RESET_SECONDS = settings.HF_BREAKER_RESET_SECONDS
+AI_WORKOUT_CACHE_ENABLED = settings.AI_WORKOUT_CACHE_ENABLED
+AI_WORKOUT_CACHE_TTL_HOURS = settings.AI_WORKOUT_CACHE_TTL_HOURS
+AI_WORKOUT_CACHE_MAX_ENTRIES = settings.AI_WORKOUT_CACHE_MAX_ENTRIES
+CHAT_CONTEXT_CACHE_TTL_SECONDS = settings.CHAT_CONTEXT_CACHE_TTL_SECONDS
+CHAT_CONTEXT_CACHE_MAX_ENTRIES = settings.CHAT_CONTEXT_CACHE_MAX_ENTRIES
@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from models import CommonFood
+from food_catalog import restriction_flags
 
 # Load environment variables
 load_dotenv()
@@ -138,6 +139,7 @@ def add_common_foods():
                 fat=food_data["fat"],
                 serving_size=food_data["serving_size"],
                 food_group=food_data.get("food_group"),
+                restriction_flags=restriction_flags(food_data["name"], food_data.get("food_group")),
                 created_at=datetime.now()
             )
             db.add(food)
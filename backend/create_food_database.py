@@ -5,6 +5,7 @@ import csv
 import os
 from dotenv import load_dotenv
 from models import Base, CommonFood  # Import the model we'll create
+from food_catalog import restriction_flags
 
 # Load environment variables
 load_dotenv()
@@ -81,7 +82,8 @@ def populate_foods():
                 protein=food["protein"],
                 carbs=food["carbs"],
                 fat=food["fat"],
-                serving_size=food["serving_size"]
+                serving_size=food["serving_size"],
+                restriction_flags=restriction_flags(food["name"], None)
             )
             db.add(db_food)
         
@@ -107,7 +109,8 @@ def import_from_csv(csv_file):
                     protein=float(row["protein"]),
                     carbs=float(row["carbs"]),
                     fat=float(row["fat"]),
-                    serving_size=row["serving_size"]
+                    serving_size=row["serving_size"],
+                    restriction_flags=restriction_flags(row["name"], None)
                 )
                 db.add(db_food)
                 count += 1
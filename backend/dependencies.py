@@ -5,11 +5,17 @@ import jwt as pyjwt
 from database import get_db
 from models import User
 from config import settings
+from auth_cache import auth_cache, attach_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # Tokens validated recently by this process skip decoding and the user lookup
+    cached = auth_cache.get(token)
+    if cached is not None:
+        return attach_user(db, cached)
+
     try:
         print(f"Received token: {token[:10]}...")  # Print first 10 chars of token for debugging
         payload = pyjwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
@@ -30,6 +36,7 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             )
 
         print(f"User authenticated: {user.username}")
+        auth_cache.put(token, payload, user)
         return user
 
     except pyjwt.ExpiredSignatureError as e:
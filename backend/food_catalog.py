@@ -0,0 +1,222 @@
+from typing import Iterable, List, Optional, Tuple
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import CommonFood
+
+# How often a worker checks whether foods were added by other workers or the seed scripts
+CATALOG_REFRESH_SECONDS = 60
+
+# Define non-vegetarian food groups and keywords for better filtering
+NON_VEGETARIAN_GROUPS = ["meat", "poultry", "fish", "seafood"]
+NON_VEGETARIAN_KEYWORDS = ["chicken", "beef", "pork", "turkey", "fish", "salmon", "tuna",
+                           "shrimp", "meat", "sausage", "bacon", "ham", "steak", "cod",
+                           "tilapia", "lamb", "duck", "veal", "anchovy", "sardine"]
+DAIRY_KEYWORDS = ["milk", "cheese", "yogurt", "butter", "cream", "dairy"]
+GLUTEN_KEYWORDS = ["wheat", "bread", "pasta", "cereal", "flour", "bun", "cracker", "gluten",
+                   "barley", "rye", "oats", "malt"]
+
+# Bit per dietary restriction in CommonFood.restriction_flags; a set bit means the food satisfies it
+RESTRICTION_FLAGS = {"vegetarian": 1, "vegan": 2, "dairy-free": 4, "gluten-free": 8}
+SUPPORTED_RESTRICTIONS = list(RESTRICTION_FLAGS)
+
+
+class CatalogFood:
+    """Immutable view of one CommonFood row, detached from any session"""
+    __slots__ = ("id", "name", "calories", "protein", "carbs", "fat", "serving_size", "food_group", "restriction_flags")
+
+    def __init__(self, id, name, calories, protein, carbs, fat, serving_size, food_group, restriction_flags=None):
+        self.id = id
+        self.name = name
+        self.calories = calories
+        self.protein = protein
+        self.carbs = carbs
+        self.fat = fat
+        self.serving_size = serving_size
+        self.food_group = food_group
+        self.restriction_flags = restriction_flags
+
+
+def restriction_excludes(restriction: str, name: str, food_group: Optional[str]) -> bool:
+    """Whether a food violates one dietary restriction, judged by its name and group"""
+    name_lower = (name or "").lower()
+    group_lower = (food_group or "").lower()
+    if restriction in ["vegetarian", "vegan"]:
+        if any(group in group_lower for group in NON_VEGETARIAN_GROUPS):
+            return True
+        if any(keyword in name_lower for keyword in NON_VEGETARIAN_KEYWORDS):
+            return True
+    if restriction == "vegan":
+        # Additional vegan filtering (no dairy, eggs, honey)
+        if "egg" in name_lower or "honey" in name_lower:
+            return True
+        if any(keyword in name_lower for keyword in DAIRY_KEYWORDS):
+            return True
+    if restriction == "dairy-free":
+        if any(keyword in name_lower for keyword in DAIRY_KEYWORDS):
+            return True
+    if restriction == "gluten-free":
+        if any(keyword in name_lower for keyword in GLUTEN_KEYWORDS):
+            return True
+    return False
+
+
+def restriction_flags(name: str, food_group: Optional[str]) -> int:
+    """
+    Bitmask of the restrictions a food satisfies, stored in CommonFood.restriction_flags.
+
+    Set it whenever a food is inserted or renamed so meal planning never has to
+    scan the keyword lists again.
+    """
+    flags = 0
+    for restriction, bit in RESTRICTION_FLAGS.items():
+        if not restriction_excludes(restriction, name, food_group):
+            flags |= bit
+    return flags
+
+
+def restriction_bits(restrictions: Iterable[str]) -> int:
+    """Combined bits of the given restrictions; unknown restrictions are ignored"""
+    bits = 0
+    for restriction in restrictions:
+        bits |= RESTRICTION_FLAGS.get(restriction, 0)
+    return bits
+
+
+class FoodCatalog:
+    """
+    Snapshot of the CommonFood table prepared for meal planning.
+
+    Macros and restriction flags are kept as NumPy arrays in id order, so filtering
+    by dietary restrictions is a single mask operation. Foods stored without flags
+    (inserted outside the seed scripts and the API) get them computed on load.
+    Snapshots are never modified; a reload builds a new one with a higher version.
+    """
+
+    def __init__(self, rows: Iterable[tuple], version: int):
+        self.version = version
+        self.foods: List[CatalogFood] = [CatalogFood(*row) for row in rows]
+        self.ids = np.array([food.id for food in self.foods], dtype=np.int64)
+        self.calories = np.array([food.calories or 0 for food in self.foods], dtype=np.float64)
+        self.protein = np.array([food.protein or 0 for food in self.foods], dtype=np.float64)
+        self.carbs = np.array([food.carbs or 0 for food in self.foods], dtype=np.float64)
+        self.fat = np.array([food.fat or 0 for food in self.foods], dtype=np.float64)
+        self.flags = np.array(
+            [food.restriction_flags if food.restriction_flags is not None
+             else restriction_flags(food.name, food.food_group) for food in self.foods],
+            dtype=np.int64
+        )
+        for array in (self.ids, self.calories, self.protein, self.carbs, self.fat, self.flags):
+            array.setflags(write=False)
+        self.signature = (int(self.ids.max()) if len(self.ids) else 0, len(self.ids))
+
+    def __len__(self):
+        return len(self.foods)
+
+    def allowed_mask(self, restrictions: List[str]) -> np.ndarray:
+        """Foods satisfying every given restriction; unknown restrictions are ignored"""
+        bits = restriction_bits(restrictions)
+        return (self.flags & bits) == bits
+
+    def score_foods(
+        self,
+        target_calories: float,
+        target_protein: float,
+        target_carbs: float,
+        target_fat: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score how well every food matches the remaining nutritional needs (lower is better).
+
+        Returns the scores and the serving quantities they were computed for. The
+        quantity is based on calories and kept between half a serving and three.
+        """
+        quantity = np.clip(target_calories / np.maximum(self.calories, 1), 0.5, 3.0)
+
+        actual_calories = self.calories * quantity
+        cal_score = np.abs(actual_calories - target_calories) / max(target_calories, 1)
+        protein_score = np.abs(self.protein * quantity - target_protein) / max(target_protein, 1)
+        carbs_score = np.abs(self.carbs * quantity - target_carbs) / max(target_carbs, 1)
+        fat_score = np.abs(self.fat * quantity - target_fat) / max(target_fat, 1)
+
+        # Heavily penalize going more than 10% over the calorie target
+        cal_score = np.where(actual_calories > target_calories * 1.1, cal_score * 3, cal_score)
+
+        scores = (cal_score * 0.4) + (protein_score * 0.3) + (carbs_score * 0.15) + (fat_score * 0.15)
+        return scores, quantity
+
+    def best_match(
+        self,
+        candidates: np.ndarray,
+        target_calories: float,
+        target_protein: float,
+        target_carbs: float,
+        target_fat: float
+    ) -> Tuple[Optional[int], float]:
+        """Index and quantity of the best scoring candidate, or (None, 1.0) if there is none"""
+        if not candidates.any():
+            return None, 1.0
+        scores, quantity = self.score_foods(target_calories, target_protein, target_carbs, target_fat)
+        scores = np.where(candidates, scores, np.inf)
+        index = int(np.argmin(scores))
+        return index, float(quantity[index])
+
+
+class FoodCatalogCache:
+    """Process-wide holder of the current FoodCatalog, reloaded when the table changes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalog: Optional[FoodCatalog] = None
+        self._version = 0
+        self._stale = False
+        self._checked_at = 0.0
+
+    def get(self, db: Session) -> FoodCatalog:
+        catalog = self._catalog
+        if catalog is not None and not self._stale \
+                and time.monotonic() - self._checked_at < CATALOG_REFRESH_SECONDS:
+            return catalog
+        with self._lock:
+            if self._catalog is None or self._stale:
+                self._load(db)
+            elif time.monotonic() - self._checked_at >= CATALOG_REFRESH_SECONDS:
+                # Foods added by other workers or by the seed scripts show up here
+                max_id, count = db.query(func.max(CommonFood.id), func.count(CommonFood.id)).one()
+                self._checked_at = time.monotonic()
+                if ((max_id or 0), count) != self._catalog.signature:
+                    self._load(db)
+            return self._catalog
+
+    def invalidate(self):
+        """Reload on next use, e.g. after this worker added foods"""
+        self._stale = True
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _load(self, db: Session):
+        self._stale = False
+        rows = db.query(
+            CommonFood.id,
+            CommonFood.name,
+            CommonFood.calories,
+            CommonFood.protein,
+            CommonFood.carbs,
+            CommonFood.fat,
+            CommonFood.serving_size,
+            CommonFood.food_group,
+            CommonFood.restriction_flags
+        ).order_by(CommonFood.id).all()
+        self._version += 1
+        self._catalog = FoodCatalog(rows, self._version)
+        self._checked_at = time.monotonic()
+        print(f"Loaded food catalog version {self._version} with {len(self._catalog)} foods")
+
+
+food_catalog_cache = FoodCatalogCache()
@@ -0,0 +1,319 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Tuple
+import heapq
+import re
+import threading
+import time
+
+from sqlalchemy import func, case, or_, text, literal
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import CommonFood
+
+# Minimum trigram similarity for fuzzy (typo tolerant) matches, same as pg_trgm's default
+SIMILARITY_THRESHOLD = 0.3
+
+# Only the rarest query trigrams are used to collect fuzzy candidates, which keeps
+# very common trigrams from touching a large part of the table
+CANDIDATE_TRIGRAMS = 6
+
+# How often a worker checks whether other workers added foods to the table
+INDEX_REFRESH_SECONDS = 60
+
+# Relevance tiers, best first
+EXACT, NAME_PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+_WORD_SPLIT = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> set:
+    """Trigrams of every word padded like pg_trgm does ('  w', ' wo', 'wor', 'ord', 'rd ')"""
+    grams = set()
+    for word in _WORD_SPLIT.split(text.lower()):
+        if not word:
+            continue
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def similarity(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def fuzzy_score(query_grams: set, name: str) -> float:
+    """
+    Similarity of the query to the whole name or to its best matching word.
+
+    Comparing against single words keeps a typo like 'chiken' matching
+    'Chicken Breast', whose extra words would otherwise dilute the score.
+    """
+    best = similarity(query_grams, trigrams(name))
+    for word in _WORD_SPLIT.split(name):
+        if word:
+            best = max(best, similarity(query_grams, trigrams(word)))
+    return best
+
+
+def inner_trigrams(text: str) -> set:
+    """Unpadded trigrams inside each word; a name containing text contains all of them"""
+    grams = set()
+    for word in _WORD_SPLIT.split(text.lower()):
+        for i in range(len(word) - 2):
+            grams.add(word[i:i + 3])
+    return grams
+
+
+class FoodSearchIndex:
+    """
+    In-memory search index over CommonFood names, used where pg_trgm isn't available.
+
+    Holds a trigram inverted index (compact id arrays per trigram) for substring and
+    fuzzy matches, and a sorted vocabulary with id arrays for prefix matches on one
+    or two letter queries. Only ids and names are kept; matched rows are loaded by
+    primary key.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: Dict[int, str] = {}
+        self._postings: Dict[str, array] = {}
+        # Sorted vocabulary and the id array of each word
+        self._words: Tuple[List[str], List[array]] = ([], [])
+        self._max_id = 0
+        self._size = 0
+        self._built = False
+        self._checked_at = 0.0
+
+    def _build(self, db: Session):
+        names = {}
+        postings: Dict[str, array] = {}
+        words: Dict[str, array] = {}
+        for food_id, name in db.query(CommonFood.id, CommonFood.name).order_by(CommonFood.id).yield_per(5000):
+            lowered = normalize(name or "")
+            names[food_id] = lowered
+            for gram in trigrams(lowered):
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(food_id)
+            for word in set(_WORD_SPLIT.split(lowered)):
+                if word:
+                    posting = words.get(word)
+                    if posting is None:
+                        posting = words[word] = array("I")
+                    posting.append(food_id)
+        vocabulary = sorted(words)
+
+        self._names, self._postings = names, postings
+        self._words = (vocabulary, [words[word] for word in vocabulary])
+        self._max_id = max(names) if names else 0
+        self._size = len(names)
+        self._built = True
+        self._checked_at = time.monotonic()
+
+    def ensure_current(self, db: Session):
+        """Build on first use and rebuild when other workers changed the table"""
+        if self._built and time.monotonic() - self._checked_at < INDEX_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if not self._built:
+                self._build(db)
+                return
+            if time.monotonic() - self._checked_at < INDEX_REFRESH_SECONDS:
+                return
+            max_id, size = db.query(func.max(CommonFood.id), func.count(CommonFood.id)).one()
+            self._checked_at = time.monotonic()
+            if (max_id or 0) != self._max_id or size != self._size:
+                self._build(db)
+
+    def add(self, food_id: int, name: str):
+        """Index a food this worker just created, without rebuilding everything"""
+        with self._lock:
+            if not self._built or food_id in self._names:
+                return
+            lowered = normalize(name or "")
+            self._names[food_id] = lowered
+            for gram in trigrams(lowered):
+                self._postings.setdefault(gram, array("I")).append(food_id)
+            for word in set(_WORD_SPLIT.split(lowered)):
+                if not word:
+                    continue
+                vocabulary, word_postings = self._words
+                i = bisect_left(vocabulary, word)
+                if i == len(vocabulary) or vocabulary[i] != word:
+                    vocabulary.insert(i, word)
+                    word_postings.insert(i, array("I"))
+                word_postings[i].append(food_id)
+            self._max_id = max(self._max_id, food_id)
+            self._size += 1
+
+    def invalidate(self):
+        """Force a rebuild on the next search, e.g. after foods were removed or renamed"""
+        self._built = False
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def search(self, query: str, limit: int, offset: int = 0) -> List[int]:
+        """Return the ids of the best matches for query, most relevant first"""
+        q = normalize(query)
+        if not q:
+            return []
+        # Searches are short and CPU bound, so serializing them with add/rebuild costs nothing
+        with self._lock:
+            return self._search(q, limit, offset)
+
+    def _search(self, q: str, limit: int, offset: int) -> List[int]:
+        query_grams = trigrams(q)
+        scored = {}
+
+        if len(q) < 3:
+            # Too short for trigrams: match words starting with the query
+            vocabulary, word_postings = self._words
+            for i in range(bisect_left(vocabulary, q), len(vocabulary)):
+                if not vocabulary[i].startswith(q):
+                    break
+                for food_id in word_postings[i]:
+                    # Similarity means little for one or two letters; prefer shorter names
+                    name = self._names[food_id]
+                    scored[food_id] = (self._tier(name, q), len(name), name, food_id)
+        else:
+            # Substring matches: the rarest inner trigram bounds the candidates
+            inner = [self._postings.get(gram, array("I")) for gram in inner_trigrams(q)]
+            candidates = min(inner, key=len) if inner else self._names
+            for food_id in candidates:
+                if q in self._names[food_id]:
+                    scored[food_id] = self._rank(food_id, q, query_grams)
+
+            # Fuzzy matches rank below every substring match, so they're only needed
+            # when the substring matches don't fill the requested page
+            if len(scored) >= offset + limit:
+                return self._page(scored, limit, offset)
+
+            # Typo tolerant matches, collected from the rarest padded trigrams
+            gram_lists = sorted((self._postings.get(gram, array("I")) for gram in query_grams), key=len)
+            considered = gram_lists[:CANDIDATE_TRIGRAMS]
+            unseen = len(gram_lists) - len(considered)
+            overlap = Counter()
+            for posting in considered:
+                overlap.update(posting)
+            for food_id, shared in overlap.items():
+                # Skip names that can't reach the threshold even if they had every unseen trigram
+                if food_id in scored or shared + unseen < SIMILARITY_THRESHOLD * len(query_grams):
+                    continue
+                score = fuzzy_score(query_grams, self._names[food_id])
+                if score >= SIMILARITY_THRESHOLD:
+                    scored[food_id] = (FUZZY, -score, self._names[food_id], food_id)
+
+        return self._page(scored, limit, offset)
+
+    @staticmethod
+    def _page(scored: dict, limit: int, offset: int) -> List[int]:
+        ranked = heapq.nsmallest(offset + limit, scored.values())
+        return [key[-1] for key in ranked[offset:]]
+
+    @staticmethod
+    def _tier(name: str, q: str) -> int:
+        if name == q:
+            return EXACT
+        if name.startswith(q):
+            return NAME_PREFIX
+        if f" {q}" in f" {name}":
+            return WORD_PREFIX
+        return SUBSTRING
+
+    def _rank(self, food_id: int, q: str, query_grams: set) -> tuple:
+        name = self._names[food_id]
+        return (self._tier(name, q), -similarity(query_grams, trigrams(name)), name, food_id)
+
+
+food_search_index = FoodSearchIndex()
+
+
+def warm_up_food_search():
+    """Build the in-memory index ahead of the first search when it will be needed"""
+    db = SessionLocal()
+    try:
+        if not has_trigram_support(db):
+            food_search_index.ensure_current(db)
+            print(f"Food search index built with {food_search_index.size} foods")
+    except Exception as e:
+        print(f"Error building food search index: {str(e)}")
+    finally:
+        db.close()
+
+_trigram_support: Dict[str, bool] = {}
+
+
+def has_trigram_support(db: Session) -> bool:
+    """Whether the database can rank with pg_trgm (checked once per process)"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in _trigram_support:
+        supported = False
+        if dialect == "postgresql":
+            try:
+                supported = db.execute(
+                    text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                ).scalar() is not None
+            except Exception as e:
+                print(f"Could not check for pg_trgm, using the in-memory food index: {str(e)}")
+        _trigram_support[dialect] = supported
+    return _trigram_support[dialect]
+
+
+def search_common_foods(db: Session, query: str, limit: int = 10, offset: int = 0) -> List[CommonFood]:
+    """
+    Search the common foods table, best matches first.
+
+    Ranking: exact name, name prefix, word prefix, substring, then typo tolerant
+    trigram similarity. Postgres with pg_trgm ranks in SQL using the GIN trigram
+    index; everywhere else the in-memory FoodSearchIndex is used.
+    """
+    if has_trigram_support(db):
+        return _search_postgres(db, query, limit, offset)
+
+    food_search_index.ensure_current(db)
+    ids = food_search_index.search(query, limit, offset)
+    if not ids:
+        return []
+    foods = {food.id: food for food in db.query(CommonFood).filter(CommonFood.id.in_(ids)).all()}
+    return [foods[food_id] for food_id in ids if food_id in foods]
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+def _search_postgres(db: Session, query: str, limit: int, offset: int) -> List[CommonFood]:
+    q = normalize(query)
+    pattern = _escape_like(q)
+    name = func.lower(CommonFood.name)
+    score = func.greatest(func.similarity(name, q), func.word_similarity(q, name))
+    contains = name.like(f"%{pattern}%", escape="/")
+    tier = case(
+        (name == q, EXACT),
+        (name.like(f"{pattern}%", escape="/"), NAME_PREFIX),
+        (name.like(f"% {pattern}%", escape="/"), WORD_PREFIX),
+        (contains, SUBSTRING),
+        else_=FUZZY
+    )
+    return db.query(CommonFood).filter(
+        # All three operators are served by the GIN trigram index on lower(name);
+        # <% matches the query against single words, like fuzzy_score does
+        or_(contains, name.op("%")(q), literal(q).op("<%")(name))
+    ).order_by(
+        tier, score.desc(), name, CommonFood.id
+    ).offset(offset).limit(limit).all()
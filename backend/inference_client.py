@@ -0,0 +1,364 @@
+from typing import Any, AsyncIterator, Optional
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import httpx
+from fastapi import HTTPException
+
+from config import settings
+
+# Responses worth retrying: rate limited, or the model is loading / the backend is overloaded
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+DEFAULT_PARAMETERS = {
+    "max_new_tokens": 1024,
+    "temperature": 0.7,
+    "top_p": 0.9,
+    "do_sample": True
+}
+
+
+class InferenceError(HTTPException):
+    """A Hugging Face call that failed after all retries"""
+
+    def __init__(self, detail: str, status_code: int = 500):
+        super().__init__(status_code=status_code, detail=detail)
+
+
+class InferenceUnavailable(InferenceError):
+    """The circuit breaker is open; the call wasn't attempted"""
+
+    def __init__(self):
+        super().__init__("AI service is temporarily unavailable. Please try again later.", status_code=503)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After failure_threshold failures in a row the circuit opens and calls are
+    refused for reset_seconds. Then one trial call is let through (half open): if
+    it succeeds the circuit closes, if it fails it opens again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+                print(f"Circuit breaker opened after {self._failures} consecutive failures")
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Let another call try when the half-open trial ended without an outcome"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+
+def extract_generated_text(result: Any) -> str:
+    """Text out of the shapes the inference API answers with"""
+    if isinstance(result, list) and len(result) > 0:
+        result = result[0]
+    if isinstance(result, dict):
+        if "generated_text" in result:
+            return result["generated_text"]
+        if "error" in result:
+            print(f"ERROR: API error from Hugging Face: {result['error']}")
+            raise InferenceError(f"Error from Hugging Face API: {result['error']}")
+    return str(result)
+
+
+def parse_stream_event(line: str) -> str:
+    """Text of one token event of a streamed generation ("data: {...}" lines); "" for anything else"""
+    if not line.startswith("data:"):
+        return ""
+    event = json.loads(line[5:])
+    if "error" in event:
+        print(f"ERROR: API error from Hugging Face: {event['error']}")
+        raise InferenceError(f"Error from Hugging Face API: {event['error']}")
+    token = event.get("token") or {}
+    if token.get("special"):
+        return ""
+    return token.get("text", "")
+
+
+class InferenceClient:
+    """
+    Shared async client for the Hugging Face inference API.
+
+    One httpx.AsyncClient keeps a pool of keep-alive connections for the whole
+    worker; a semaphore caps how many calls are in flight at once. Timeouts,
+    connection errors and retryable status codes are retried with full-jitter
+    exponential backoff, and a circuit breaker stops calling the API after repeated
+    failures so callers can go straight to their fallback.
+
+    base_url can point at a local stub server (see benchmarks/bench_inference_client.py).
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: Optional[str],
+        timeout_seconds: float,
+        max_concurrency: int,
+        max_retries: int,
+        backoff_seconds: float,
+        backoff_max_seconds: float,
+        breaker: CircuitBreaker
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.breaker = breaker
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.requests = 0
+        self.streams = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.token}", "Content-Type": "application/json"},
+                timeout=httpx.Timeout(self.timeout_seconds, connect=min(self.timeout_seconds, 5.0)),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        delay = random.uniform(0, min(self.backoff_max_seconds, self.backoff_seconds * 2 ** attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.backoff_max_seconds))
+        return delay
+
+    async def generate(self, prompt: str, model: str, parameters: Optional[dict] = None) -> str:
+        """Generated text for a prompt; raises InferenceError or InferenceUnavailable"""
+        if not self.token:
+            print("ERROR: Hugging Face API token not configured")
+            raise InferenceError("Hugging Face API token not configured")
+        if not self.breaker.allow():
+            self.rejected += 1
+            print("Hugging Face API circuit is open, skipping the call")
+            raise InferenceUnavailable()
+
+        client = self._get_client()
+        payload = {"inputs": prompt, "parameters": parameters or DEFAULT_PARAMETERS}
+        try:
+            async with self._semaphore:
+                result = await self._post_with_retries(client, f"/models/{model}", payload)
+            text = extract_generated_text(result)
+        except InferenceError:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            # The request went away; that says nothing about the API's health
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            print(f"ERROR: Unexpected exception: {str(e)}")
+            self.failures += 1
+            self.breaker.record_failure()
+            raise InferenceError(f"Unexpected error: {str(e)}")
+        self.breaker.record_success()
+        return text
+
+    def _response_error(self, response: httpx.Response) -> InferenceError:
+        """The error for a failed response; raises it right away when it isn't worth retrying"""
+        if response.status_code == 401:
+            print("ERROR: Unauthorized request to Hugging Face API. Check your API token.")
+            raise InferenceError("Authentication error with Hugging Face API")
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            print(f"ERROR: Hugging Face API returned {response.status_code}: {response.text[:200]}")
+            raise InferenceError(f"Error calling Hugging Face API: HTTP {response.status_code}")
+        if response.status_code == 503:
+            # Often a temporary condition when the model is warming up
+            print("ERROR: Hugging Face model is currently loading or unavailable")
+            return InferenceError("Model is loading or unavailable. Please try again in a few moments.")
+        print(f"ERROR: Hugging Face API returned {response.status_code}")
+        return InferenceError(f"Error calling Hugging Face API: HTTP {response.status_code}")
+
+    async def _wait_before_retry(self, attempt: int, retry_after: Optional[str]):
+        self.retries += 1
+        delay = self._backoff(attempt, retry_after)
+        print(f"Retrying Hugging Face API call in {delay:.2f}s (attempt {attempt + 2}/{self.max_retries + 1})")
+        await asyncio.sleep(delay)
+
+    async def _post_with_retries(self, client: httpx.AsyncClient, path: str, payload: dict) -> Any:
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            self.requests += 1
+            try:
+                response = await client.post(path, json=payload)
+            except httpx.TimeoutException:
+                print("ERROR: Timeout when calling Hugging Face API")
+                error = InferenceError("Request to Hugging Face API timed out. The model may be under heavy load.")
+            except httpx.TransportError as e:
+                print(f"ERROR: Connection error when calling Hugging Face API: {str(e)}")
+                error = InferenceError("Connection error when calling Hugging Face API. Please check your internet connection.")
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                error = self._response_error(response)
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise error
+            await self._wait_before_retry(attempt, retry_after)
+
+    async def stream(self, prompt: str, model: str, parameters: Optional[dict] = None) -> AsyncIterator[str]:
+        """
+        Generated text for a prompt, yielded token by token as the model produces it.
+
+        Raises like generate(). Failures before the first token are retried; once
+        text has been yielded, an error ends the stream with InferenceError. The
+        call holds its concurrency slot until the stream is exhausted or closed.
+        """
+        if not self.token:
+            print("ERROR: Hugging Face API token not configured")
+            raise InferenceError("Hugging Face API token not configured")
+        if not self.breaker.allow():
+            self.rejected += 1
+            print("Hugging Face API circuit is open, skipping the call")
+            raise InferenceUnavailable()
+
+        client = self._get_client()
+        payload = {"inputs": prompt, "parameters": parameters or DEFAULT_PARAMETERS, "stream": True}
+        self.streams += 1
+        try:
+            async with self._semaphore:
+                async for text in self._stream_with_retries(client, f"/models/{model}", payload):
+                    yield text
+        except InferenceError:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            # The client disconnected mid-stream; that says nothing about the API's health
+            self.breaker.release_trial()
+            raise
+        except Exception as e:
+            print(f"ERROR: Unexpected exception: {str(e)}")
+            self.failures += 1
+            self.breaker.record_failure()
+            raise InferenceError(f"Unexpected error: {str(e)}")
+        self.breaker.record_success()
+
+    async def _stream_with_retries(self, client: httpx.AsyncClient, path: str, payload: dict) -> AsyncIterator[str]:
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            started = False
+            self.requests += 1
+            try:
+                async with client.stream("POST", path, json=payload) as response:
+                    if response.status_code < 400:
+                        if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                            # Backends that can't stream answer with the whole generation at once
+                            await response.aread()
+                            yield extract_generated_text(response.json())
+                            return
+                        async for line in response.aiter_lines():
+                            text = parse_stream_event(line)
+                            if text:
+                                started = True
+                                yield text
+                        return
+                    await response.aread()
+                    error = self._response_error(response)
+                    retry_after = response.headers.get("Retry-After")
+            except httpx.TimeoutException:
+                print("ERROR: Timeout when calling Hugging Face API")
+                error = InferenceError("Request to Hugging Face API timed out. The model may be under heavy load.")
+            except httpx.TransportError as e:
+                print(f"ERROR: Connection error when calling Hugging Face API: {str(e)}")
+                error = InferenceError("Connection error when calling Hugging Face API. Please check your internet connection.")
+
+            # Part of the answer has already been sent on; starting over would repeat it
+            if started or attempt == self.max_retries:
+                raise error
+            await self._wait_before_retry(attempt, retry_after)
+
+    def stats(self) -> dict:
+        return {
+            "base_url": self.base_url,
+            "max_concurrency": self.max_concurrency,
+            "requests": self.requests,
+            "streams": self.streams,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected_by_breaker": self.rejected,
+            "breaker_state": self.breaker.state,
+            "breaker_opened": self.breaker.times_opened,
+        }
+
+
+inference_client = InferenceClient(
+    base_url=settings.HF_INFERENCE_URL,
+    token=os.getenv("HUGGINGFACE_API_TOKEN"),
+    timeout_seconds=settings.HF_TIMEOUT_SECONDS,
+    max_concurrency=settings.HF_MAX_CONCURRENCY,
+    max_retries=settings.HF_MAX_RETRIES,
+    backoff_seconds=settings.HF_RETRY_BACKOFF_SECONDS,
+    backoff_max_seconds=settings.HF_RETRY_BACKOFF_MAX_SECONDS,
+    breaker=CircuitBreaker(settings.HF_BREAKER_FAILURES, settings.HF_BREAKER_RESET_SECONDS)
+)
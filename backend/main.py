@@ -46,14 +46,15 @@ print("Auth router initialized with session validation endpoints")
 from datetime import datetime, timezone, timedelta, date
 from database import engine, Base, get_db, SessionLocal
 from sqlalchemy import func, desc, extract, asc, text, distinct, or_, and_, inspect
-from sqlalchemy.orm import Session, joinedload, contains_eager, aliased
+from sqlalchemy.orm import Session, joinedload, selectinload, contains_eager, aliased
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 import uuid
 import os
+import threading
 from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, BackgroundTasks, Body, Query, Request, status, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from background_task import send_summary_emails
 from email_service import (send_summary_email, send_security_alert, send_verification_email, send_password_reset_email,
                            send_password_changed_email, send_account_deletion_email, notify_admin_new_registration,
@@ -64,6 +65,18 @@ from passlib.context import CryptContext
 from nutrition import router as nutrition_router
 from ai_workout import router as ai_workout_router
 from routers.custom_exercises import router as custom_exercises_router
+from progress import get_strength_progress_data, get_cardio_progress_data, parse_lifts, set_next_cursor
+from workout_stats import (get_user_workout_stats, record_workouts_created, collect_workout_contribution,
+                           apply_workout_stats_delta, rebuild_user_workout_stats)
+from workout_writes import bulk_insert_workout
+from achievement_catalog import achievement_catalog_cache
+from achievements import (WORKOUT_EVENT_CATEGORIES, active_streak, delete_duplicate_user_achievements,
+                          evaluate_achievements, record_streak_workouts, refresh_streak)
+from auth_cache import auth_cache
+from admin_settings_cache import admin_settings_cache
+from food_search import warm_up_food_search
+from inference_client import inference_client
+from workout_history import get_workouts_page, serialize_workouts, stream_workouts_ndjson
 from sqlalchemy.sql import text as sql_text
 from sqlalchemy.exc import IntegrityError
 
@@ -134,6 +147,7 @@ async def startup_event():
                 achievement = Achievement(**achievement_data)
                 db.add(achievement)
             db.commit()
+            achievement_catalog_cache.invalidate()
             print(f"Created {len(default_achievements)} default achievements")
         else:
             print(f"Found {existing_count} existing achievements")
@@ -144,6 +158,16 @@ async def startup_event():
     finally:
         db.close()
 
+    # Load the admin settings once and follow changes made by other workers
+    try:
+        admin_settings_cache.get()
+        admin_settings_cache.start_listener()
+    except Exception as e:
+        print(f"Error loading admin settings: {str(e)}")
+
+    # Build the fallback food search index off the request path
+    threading.Thread(target=warm_up_food_search, name="food-search-warm-up", daemon=True).start()
+
     print("Starting background task for email summaries")
     background_tasks = BackgroundTasks()
     background_tasks.add_task(send_summary_emails)
@@ -390,14 +414,12 @@ def initialize_achievements(db: Session):
         }
     ]
     
-    # Check for existing achievements and add new ones
+    # Check for existing achievements and add new ones; reload the catalog first, so
+    # achievements removed since it was loaded get created again
+    achievement_catalog_cache.invalidate()
+    existing_names = achievement_catalog_cache.get(db).names
     for achievement_data in new_achievements:
-        # Check if achievement already exists
-        existing = db.query(Achievement).filter(
-            Achievement.name == achievement_data["name"]
-        ).first()
-        
-        if not existing:
+        if achievement_data["name"] not in existing_names:
             print(f"Adding new achievement: {achievement_data['name']}")
             new_achievement = Achievement(
                 name=achievement_data["name"],
@@ -411,6 +433,7 @@ def initialize_achievements(db: Session):
     
     # Commit changes
     db.commit()
+    achievement_catalog_cache.invalidate()
     
     # Return the count of created achievements
     return created_count
@@ -419,6 +442,7 @@ def initialize_achievements(db: Session):
 @app.on_event("shutdown")
 async def shutdown_event():
     print("Shutting down")
+    await inference_client.aclose()
 
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
@@ -461,93 +485,71 @@ async def send_summaries(background_tasks: BackgroundTasks, db: Session = Depend
     return {"message": "Scheduled summary emails"}
 
 
-@app.get("/workouts", response_model=list[WorkoutResponse])
-def get_workouts(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    workouts = db.query(Workout)\
-        .options(joinedload(Workout.exercises).joinedload(Exercise.sets))\
-        .filter(Workout.user_id == user.id, Workout.is_template == False)\
-        .all()
+@app.get("/workouts", response_model=None)
+def get_workouts(
+    response: Response,
+    since: Optional[date] = Query(None, description="Only workouts on or after this day"),
+    until: Optional[date] = Query(None, description="Only workouts on or before this day"),
+    fields: Optional[str] = Query(None, pattern="^(full|summary)$", description="'summary' leaves out the sets"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    stream: bool = Query(False, description="Stream the whole history as NDJSON"),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the user's logged workouts, newest first.
+
+    Without a limit the full (filtered) history is returned as before; clients that
+    need all of it should prefer stream=true, which sends one workout per line
+    (workouts without a date come last).
+    """
+    summary = fields == "summary"
+    if stream:
+        return StreamingResponse(
+            stream_workouts_ndjson(user.id, since=since, until=until, summary=summary),
+            media_type="application/x-ndjson"
+        )
 
-    return workouts
+    workouts, next_cursor = get_workouts_page(
+        db,
+        user.id,
+        since=since,
+        until=until,
+        summary=summary,
+        limit=limit,
+        cursor=cursor
+    )
+    set_next_cursor(response, next_cursor)
+    return serialize_workouts(workouts, summary)
 
 
 @app.post("/workouts", response_model=WorkoutResponse)
 def create_workout(
     workout: WorkoutCreate,
+    background_tasks: BackgroundTasks,
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     try:
-        # Create workout
-        db_workout = Workout(
-            name=workout.name,
-            date=workout.date,
-            start_time=workout.start_time,
-            end_time=workout.end_time,
-            bodyweight=workout.bodyweight,
-            weight_unit=workout.weight_unit,
-            notes=workout.notes,
-            user_id=user.id
-        )
-        db.add(db_workout)
-        db.flush()  # Assign ID but don't commit yet
+        # Insert the workout, its exercises and its sets in batched statements
+        workout_id = bulk_insert_workout(db, user.id, workout)
         
-        for exercise_data in workout.exercises:
-            new_exercise = Exercise(
-                name=exercise_data.name,
-                category=exercise_data.category or "Uncategorized",
-                is_cardio=exercise_data.is_cardio,
-                workout_id=db_workout.id
-            )
-            db.add(new_exercise)
-            db.flush()  # Assign ID but don't commit yet
-            
-            # Validate sets exist
-            if not exercise_data.sets or len(exercise_data.sets) == 0:
-                raise ValueError(f"Exercise '{exercise_data.name}' must contain at least one set")
-            
-            # Add sets
-            for i, set_data in enumerate(exercise_data.sets):
-                new_set = Set(
-                    weight=set_data.weight,
-                    reps=set_data.reps,
-                    distance=set_data.distance,
-                    duration=set_data.duration,
-                    intensity=set_data.intensity,
-                    notes=set_data.notes,
-                    exercise_id=new_exercise.id,
-                    order=getattr(set_data, 'order', i),  # Use provided order or index as default
-                    # Add support for set types
-                    is_warmup=getattr(set_data, 'is_warmup', False),
-                    is_drop_set=getattr(set_data, 'is_drop_set', False),
-                    is_superset=getattr(set_data, 'is_superset', False),
-                    is_amrap=getattr(set_data, 'is_amrap', False),
-                    is_restpause=getattr(set_data, 'is_restpause', False),
-                    is_pyramid=getattr(set_data, 'is_pyramid', False),
-                    is_giant=getattr(set_data, 'is_giant', False),
-                    # Additional set properties
-                    drop_number=getattr(set_data, 'drop_number', None),
-                    original_weight=getattr(set_data, 'original_weight', None),
-                    superset_with=str(getattr(set_data, 'superset_with', None)) if getattr(set_data, 'superset_with', None) is not None else None,
-                    rest_pauses=getattr(set_data, 'rest_pauses', None),
-                    pyramid_type=getattr(set_data, 'pyramid_type', None),
-                    pyramid_step=getattr(set_data, 'pyramid_step', None),
-                    giant_with=getattr(set_data, 'giant_with', None)
-                )
-                db.add(new_set)
+        # Keep the dashboard stats rollup and the streak in the same transaction
+        record_workouts_created(db, user.id, [workout_id])
+        record_streak_workouts(db, user.id, [workout_id])
         
         # Commit all changes at once when we're sure everything is valid
         db.commit()
-        db.refresh(db_workout)
         
-        # Check achievements after workout creation
-        try:
-            check_achievements(user, db)
-        except Exception as achievement_error:
-            print(f"Error checking achievements: {str(achievement_error)}")
-            # Don't fail the whole workout save if achievements checking fails
-            
-        return db_workout
+        # Update the workout achievements from those counters after the response is sent
+        background_tasks.add_task(run_deferred_achievement_check, user.id)
+        
+        # Load the saved workout with its exercises and sets for the response
+        return db.query(Workout)\
+            .options(selectinload(Workout.exercises).selectinload(Exercise.sets))\
+            .filter(Workout.id == workout_id)\
+            .one()
     except ValueError as ve:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(ve))
@@ -572,6 +574,7 @@ def _determine_exercise_category(exercise_name):
 @app.delete("/workouts/{workout_id}")
 def delete_workout(
     workout_id: int,
+    background_tasks: BackgroundTasks,
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -588,6 +591,8 @@ def delete_workout(
         )
 
     try:
+        stats_delta = collect_workout_contribution(db, user.id, [workout_id])
+
         # Delete all related sets first
         db.query(Set).filter(
             Set.exercise_id.in_(
@@ -602,7 +607,10 @@ def delete_workout(
 
         # Finally delete the workout
         db.query(Workout).filter(Workout.id == workout_id).delete()
+        apply_workout_stats_delta(db, user.id, stats_delta, removed=True)
+        refresh_streak(db, user.id)
         db.commit()
+        background_tasks.add_task(run_deferred_achievement_check, user.id)
         return {"message": "Workout deleted successfully"}
 
     except Exception as e:
@@ -615,6 +623,7 @@ def delete_workout(
 
 @app.delete("/api/workouts-delete-all")
 async def delete_all_workouts(
+    background_tasks: BackgroundTasks,
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -642,7 +651,10 @@ async def delete_all_workouts(
 
         # Finally delete all workouts
         db.query(Workout).filter(Workout.user_id == user.id).delete(synchronize_session=False)
+        rebuild_user_workout_stats(db, user.id)
+        refresh_streak(db, user.id)
         db.commit()
+        background_tasks.add_task(run_deferred_achievement_check, user.id)
         return {"message": f"All workouts deleted successfully. {workout_count} workout(s) removed."}
 
     except Exception as e:
@@ -654,6 +666,7 @@ async def delete_all_workouts(
 
 @app.delete("/api/workouts-delete-selected")
 async def delete_selected_workouts(
+    background_tasks: BackgroundTasks,
     workout_ids: List[int] = Body(...),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -671,6 +684,8 @@ async def delete_selected_workouts(
                     detail=f"Workout with id {workout_id} not found or does not belong to you"
                 )
         
+        stats_delta = collect_workout_contribution(db, user.id, workout_ids)
+
         # Delete all related sets first
         db.query(Set).filter(
             Set.exercise_id.in_(
@@ -689,7 +704,10 @@ async def delete_selected_workouts(
         deleted_count = db.query(Workout).filter(
             Workout.id.in_(workout_ids), Workout.user_id == user.id
         ).delete(synchronize_session=False)
+        apply_workout_stats_delta(db, user.id, stats_delta, removed=True)
+        refresh_streak(db, user.id)
         db.commit()
+        background_tasks.add_task(run_deferred_achievement_check, user.id)
         return {"message": f"Successfully deleted {deleted_count} workout(s)"}
 
     except Exception as e:
@@ -912,6 +930,7 @@ def change_password(
 
     user.hashed_password = hash_password(request.new_password)
     db.commit()
+    auth_cache.invalidate_user(user.id)
 
     background_tasks.add_task(send_security_alert, user.email)
     
@@ -975,50 +994,11 @@ def get_workout_stats(
     db: Session = Depends(get_db)
 ):
     try:
-        total_workouts = db.query(Workout).filter(
-            Workout.user_id == user.id).count()
-
-        favorite_exercise_query = db.query(Exercise.name, func.count(Exercise.id))\
-            .join(Workout)\
-            .filter(Workout.user_id == user.id)\
-            .group_by(Exercise.name)\
-            .order_by(func.count(Exercise.id).desc())\
-            .first()
+        # Count, favorite exercise, last workout and durations come from the rollup row
+        stats = get_user_workout_stats(db, user.id)
 
-        favorite_exercise = favorite_exercise_query[0] if favorite_exercise_query else None
-
-        last_workout = db.query(Workout)\
-            .filter(Workout.user_id == user.id)\
-            .order_by(desc(Workout.date))\
-            .first()
-
-        # Calculate total duration from cardio exercises
-        cardio_duration = db.query(func.sum(func.coalesce(Set.duration, 0)))\
-            .join(Exercise)\
-            .join(Workout)\
-            .filter(Workout.user_id == user.id, Exercise.is_cardio == True)\
-            .scalar() or 0
-            
-        # Convert to float if it's a Decimal
-        cardio_duration = float(cardio_duration) if cardio_duration else 0
-
-        # Calculate total duration from workout start/end times
-        workout_duration = db.query(
-            func.sum(
-                func.extract('epoch', Workout.end_time) - 
-                func.extract('epoch', Workout.start_time)
-            ) / 60  # Convert seconds to minutes
-        ).filter(
-            Workout.user_id == user.id,
-            Workout.start_time.isnot(None),
-            Workout.end_time.isnot(None)
-        ).scalar() or 0
-        
-        # Convert to float if it's a Decimal
-        workout_duration = float(workout_duration) if workout_duration else 0
-
-        # Total duration is the sum of both (now both are floats)
-        total_duration = cardio_duration + workout_duration
+        # Total duration is the sum of cardio set durations and workout start/end times
+        total_duration = (stats.cardio_duration or 0) + (stats.workout_duration or 0)
 
         weight_progression = db.query(Workout.date, Workout.bodyweight)\
             .filter(Workout.user_id == user.id, Workout.bodyweight.isnot(None))\
@@ -1034,9 +1014,9 @@ def get_workout_stats(
         ]
 
         return WorkoutStatsResponse(
-            total_workouts=total_workouts,
-            favorite_exercise=favorite_exercise,
-            last_workout=last_workout.date if last_workout else None,
+            total_workouts=stats.total_workouts,
+            favorite_exercise=stats.favorite_exercise,
+            last_workout=stats.last_workout_date,
             total_cardio_duration=round(total_duration, 2),  # Use total_duration instead of just cardio_duration
             weight_progression=weight_progression_data
         )
@@ -1049,62 +1029,23 @@ def get_workout_stats(
 
 @app.get("/progress/strength")
 def get_strength_progress(
+    lifts: Optional[str] = Query(None, description="Comma separated lift names, defaults to Bench Press, Squat, Deadlift"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    fill: bool = Query(True, description="Carry the last known value forward for lifts missing from a workout"),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get strength progress data for the main lifts"""
     try:
-        # Define the main lifts we want to track
-        main_lifts = ['Bench Press', 'Squat', 'Deadlift']
-        
-        # Query to find max weight for each main lift across time
-        strength_data = []
-        
-        # For each workout, get the maximum weight lifted for each main lift
-        workouts = db.query(Workout).filter(
-            Workout.user_id == user.id,
-            Workout.is_template == False  # Exclude templates
-        ).order_by(Workout.date).all()
-        
-        for workout in workouts:
-            # Find exercises matching main lifts
-            exercise_data = {}
-            exercise_data['date'] = workout.date.isoformat() if workout.date else None
-            
-            # For each main lift, find max weight
-            for lift in main_lifts:
-                exercise = db.query(Exercise).filter(
-                    Exercise.workout_id == workout.id,
-                    Exercise.name.ilike(f"%{lift}%")  # Case-insensitive partial match
-                ).first()
-                
-                if exercise:
-                    # Find max weight for this exercise
-                    max_weight_set = db.query(Set).filter(
-                        Set.exercise_id == exercise.id,
-                        Set.weight.isnot(None)
-                    ).order_by(Set.weight.desc()).first()
-                    
-                    if max_weight_set:
-                        # Convert lift name to camelCase for frontend
-                        lift_key = 'benchPress' if lift == 'Bench Press' else lift.lower()
-                        exercise_data[lift_key] = max_weight_set.weight
-            
-            # Only add to results if at least one lift was recorded
-            if len(exercise_data) > 1:  # More than just the date
-                for lift in main_lifts:
-                    lift_key = 'benchPress' if lift == 'Bench Press' else lift.lower()
-                    if lift_key not in exercise_data:
-                        # Find the most recent value for this lift
-                        recent_entries = [entry for entry in strength_data if lift_key in entry]
-                        if recent_entries:
-                            exercise_data[lift_key] = recent_entries[-1][lift_key]
-                        else:
-                            exercise_data[lift_key] = 0
-                            
-                strength_data.append(exercise_data)
-        
-        return strength_data
+        return get_strength_progress_data(
+            db,
+            user.id,
+            lifts=parse_lifts(lifts),
+            date_from=date_from,
+            date_to=date_to,
+            forward_fill=fill
+        )
     except Exception as e:
         print(f"Error fetching strength progress: {str(e)}")
         import traceback
@@ -1114,52 +1055,30 @@ def get_strength_progress(
 
 @app.get("/progress/cardio")
 def get_cardio_progress(
+    response: Response,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    exercise: Optional[str] = Query(None, description="Only return sets of this cardio exercise"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get cardio progress data"""
     try:
-        # Query to find cardio workouts over time
-        cardio_data = []
-        
-        # Get all workouts
-        workouts = db.query(Workout).filter(
-            Workout.user_id == user.id,
-            Workout.is_template == False  # Exclude templates
-        ).order_by(Workout.date).all()
-        
-        for workout in workouts:
-            # Find cardio exercises
-            cardio_exercises = db.query(Exercise).filter(
-                Exercise.workout_id == workout.id,
-                Exercise.is_cardio == True
-            ).all()
-            
-            if cardio_exercises:
-                for exercise in cardio_exercises:
-                    # Get all sets for this cardio exercise
-                    sets = db.query(Set).filter(Set.exercise_id == exercise.id).all()
-                    
-                    for set_item in sets:
-                        if set_item.duration or set_item.distance:
-                            entry = {
-                                'date': workout.date.isoformat() if workout.date else None,
-                                'exercise': exercise.name,
-                                'duration': set_item.duration or 0,
-                                'distance': set_item.distance or 0,
-                                'intensity': set_item.intensity or 'Medium'
-                            }
-                            
-                            # Calculate pace if both distance and duration are present
-                            if set_item.duration and set_item.distance and set_item.distance > 0:
-                                # Pace in minutes per km
-                                entry['pace'] = (set_item.duration / 60) / (set_item.distance / 1000)
-                            else:
-                                entry['pace'] = 0
-                                
-                            cardio_data.append(entry)
-        
+        cardio_data, next_cursor = get_cardio_progress_data(
+            db,
+            user.id,
+            date_from=date_from,
+            date_to=date_to,
+            exercise=exercise,
+            limit=limit,
+            cursor=cursor
+        )
+        set_next_cursor(response, next_cursor)
         return cardio_data
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error fetching cardio progress: {str(e)}")
         import traceback
@@ -1333,6 +1252,8 @@ def create_routine(
                             is_giant=False
                         )
                     db.add(new_set)
+        # The routine's template workout counts towards /workout-stats
+        record_workouts_created(db, user.id, [new_workout.id])
         db.commit()
         db.refresh(new_routine)
 
@@ -1579,6 +1500,11 @@ def update_routine(
                     )
                 db.add(new_set)
         db.commit()
+
+    # The template's exercises were replaced; recount them in the workout stats rollup
+    db.flush()
+    rebuild_user_workout_stats(db, user.id)
+    db.commit()
     db.refresh(routine)
 
     return routine
@@ -1998,8 +1924,7 @@ def get_user_achievements(
 ):
     """Get all achievements"""
     try:
-        achievements = db.query(Achievement).all()
-        return achievements
+        return [achievement.to_dict() for achievement in achievement_catalog_cache.get(db)]
     except Exception as e:
         if not isinstance(e, HTTPException):
             import traceback
@@ -2015,7 +1940,7 @@ def get_user_achievements_with_progress(
     """Get all achievements with user's progress"""
     try:
         # Get all achievements
-        achievements = db.query(Achievement).all()
+        achievements = achievement_catalog_cache.get(db).achievements
         
         # Get user's current achievements
         user_achievements = {
@@ -2079,147 +2004,32 @@ async def check_achievements(
     db: Session = Depends(get_db)
 ):
     """Check and update user's achievement progress"""
+    return evaluate_user_achievements(user, db)
+
+
+def run_deferred_achievement_check(user_id: int):
+    """
+    Background task after a workout was logged or deleted: re-evaluate the user's
+    workout, variety and streak achievements with a session of its own
+    """
+    db = SessionLocal()
     try:
-        updated_count = 0
-        newly_achieved = 0
-        
-        # Get all achievements
-        achievements = db.query(Achievement).all()
-        
-        # Get user's current achievements
-        user_achievements = {
-            ua.achievement_id: ua 
-            for ua in db.query(UserAchievement)
-            .filter(UserAchievement.user_id == user.id)
-            .all()
-        }
-        
-        for achievement in achievements:
-            was_achieved = False
-            is_achieved = False
-            progress = 0
-            
-            # Get or create user achievement
-            user_achievement = user_achievements.get(achievement.id)
-            if not user_achievement:
-                user_achievement = UserAchievement(
-                    user_id=user.id,
-                    achievement_id=achievement.id,
-                    progress=0,
-                    achieved_at=None
-                )
-                db.add(user_achievement)
-                db.flush()  # Ensure the object gets an ID
-            else:
-                was_achieved = user_achievement.achieved_at is not None
-            
-            # For admin users, automatically mark all achievements as completed
-            if user.is_admin:
-                progress = achievement.requirement
-                is_achieved = True
-            else:
-                # Check different achievement types
-                if achievement.category == "profile":
-                    # Profile completion achievements
-                    profile_fields = [
-                        user.height is not None,
-                        user.weight is not None,
-                        user.age is not None,
-                        user.gender is not None and user.gender.strip() != "",
-                        user.fitness_goals is not None and user.fitness_goals.strip() != "",
-                        user.bio is not None and user.bio.strip() != ""
-                    ]
-                    progress = sum(1 for field in profile_fields if field)
-                    is_achieved = progress >= achievement.requirement
-                
-                elif achievement.category == "workout":
-                    # Workout related achievements
-                    total_workouts = db.query(Workout).filter(
-                        Workout.user_id == user.id,
-                        Workout.is_template.is_(False)
-                    ).count()
-                    progress = total_workouts
-                    is_achieved = progress >= achievement.requirement
-                
-                elif achievement.category == "variety":
-                    # Exercise variety achievements
-                    unique_exercises = db.query(Exercise.name).distinct().join(
-                        Workout, Exercise.workout_id == Workout.id
-                    ).filter(
-                        Workout.user_id == user.id,
-                        Workout.is_template.is_(False)
-                    ).count()
-                    progress = unique_exercises
-                    is_achieved = progress >= achievement.requirement
-                
-                elif achievement.category == "streak":
-                    # Get the user's current streak from the streak endpoint
-                    current_streak = 0
-                    try:
-                        streak_data = db.query(UserProfile).filter(
-                            UserProfile.user_id == user.id
-                    ).first()
-                        if streak_data and streak_data.current_streak:
-                            current_streak = streak_data.current_streak
-                    except Exception:
-                        # Suppress error logging for streak data
-                        pass
-                    
-                    progress = current_streak
-                    is_achieved = progress >= achievement.requirement
-            
-            # Update user achievement
-            user_achievement.progress = progress
-            
-            if is_achieved and not was_achieved:
-                user_achievement.achieved_at = datetime.now(timezone.utc)
-                user_achievement.earned_at = datetime.now(timezone.utc)
-                user_achievement.is_read = False
-                user_achievement.title = achievement.name
-                user_achievement.description = achievement.description
-                newly_achieved += 1
-                
-                # Create notification for new achievement
-                try:
-                    notification = Notification(
-                        user_id=user.id,
-                        type="achievement",
-                        title=f"Achievement Unlocked: {achievement.name}",
-                        message=achievement.description,
-                        icon=achievement.icon or "trophy",
-                        is_read=False,
-                        created_at=datetime.now(timezone.utc)
-                    )
-                    db.add(notification)
-                except Exception:
-                    # Suppress error logging for notification creation
-                    pass
-            
-            updated_count += 1
-        
-        # Commit all changes
+        user = db.query(User).filter(User.id == user_id).first()
+        if user:
+            evaluate_user_achievements(user, db, list(WORKOUT_EVENT_CATEGORIES))
+    except Exception as e:
+        # Don't let a failed achievement check surface anywhere else
+        print(f"Error checking achievements: {str(e)}")
+    finally:
+        db.close()
+
+
+def evaluate_user_achievements(user: User, db: Session, categories: Optional[List[str]] = None):
+    """Update the user's achievement progress (all of it, or the given categories) and commit it"""
+    try:
+        result = evaluate_achievements(db, user, categories)
         db.commit()
-        
-        # Return updated achievements
-        return {
-            "message": f"Updated {updated_count} achievements, {newly_achieved} newly achieved",
-            "updated": updated_count,
-            "newly_achieved": newly_achieved,
-            "achievements": [
-                {
-                    "id": achievement.id,
-                    "name": achievement.name,
-                    "description": achievement.description,
-                    "category": achievement.category,
-                    "requirement": achievement.requirement,
-                    "icon": achievement.icon,
-                    "progress": user_achievements[achievement.id].progress if achievement.id in user_achievements else 0,
-                    "is_achieved": user_achievements[achievement.id].achieved_at is not None if achievement.id in user_achievements else False,
-                    "achieved_at": user_achievements[achievement.id].achieved_at if achievement.id in user_achievements else None
-                }
-                for achievement in achievements
-            ]
-        }
+        return result
     except Exception as e:
         db.rollback()
         if not isinstance(e, HTTPException):
@@ -2459,7 +2269,7 @@ def get_workout_streak(
         
         # Return streak info
         return {
-            "streak": profile.current_streak or 0,
+            "streak": active_streak(profile.current_streak, profile.last_workout_date),
             "best_streak": profile.best_streak or 0,
             "last_workout_date": profile.last_workout_date,
             "frequency_goal": frequency_goal
@@ -2893,46 +2703,15 @@ def cleanup_duplicate_achievements(
         if not user.is_admin and user.id != user.id:
             raise HTTPException(status_code=403, detail="Not authorized to perform this action")
         
-        # Find duplicate user achievements (same user_id and achievement_id)
-        # This query finds all duplicates
-        duplicates = db.query(
-            UserAchievement.user_id, 
-            UserAchievement.achievement_id, 
-            func.count(UserAchievement.id).label("count")
-        ).group_by(
-            UserAchievement.user_id, 
-            UserAchievement.achievement_id
-        ).having(
-            func.count(UserAchievement.id) > 1
-        ).all()
-        
-        removed_count = 0
-        
-        # Process each set of duplicates
-        for user_id, achievement_id, count in duplicates:
-            # Find all duplicates for this user-achievement pair
-            user_duplicates = db.query(UserAchievement).filter(
-                UserAchievement.user_id == user_id,
-                UserAchievement.achievement_id == achievement_id
-            ).order_by(
-                UserAchievement.achieved_at.asc() if UserAchievement.achieved_at is not None else text("id") 
-            ).all()
-            
-            # Keep the one with the highest progress or earliest achievement date
-            kept = None
-            for duplicate in user_duplicates:
-                if kept is None or (
-                    (duplicate.achieved_at is not None and (kept.achieved_at is None or duplicate.achieved_at < kept.achieved_at)) or
-                    (duplicate.progress > kept.progress)
-                ):
-                    kept = duplicate
-            
-            # Delete all except the one we're keeping
-            for duplicate in user_duplicates:
-                if duplicate.id != kept.id:
-                    db.delete(duplicate)
-                    removed_count += 1
+        # Keep the earliest achieved row of every (user_id, achievement_id) pair, or
+        # the one with the highest progress if none was achieved
+        removed_count = delete_duplicate_user_achievements(
+            db,
+            UserAchievement.achieved_at.asc().nulls_last(),
+            UserAchievement.progress.desc()
+        )
         db.commit()
+        achievement_catalog_cache.invalidate()
         
         return {"message": f"Removed {removed_count} duplicate achievements", "removed": removed_count}
     except HTTPException:
@@ -2956,35 +2735,15 @@ def force_cleanup_duplicate_achievements(
         if not user.is_admin:
             raise HTTPException(status_code=403, detail="Only administrators can force cleanup duplicates")
         
-        # More aggressive approach - delete all but the most recently created duplicates
-        removed_count = 0
-        
-        # Get all achievements
-        all_achievements = db.query(Achievement).all()
-        
-        for achievement in all_achievements:
-            # For each user that has this achievement
-            users_with_achievement = db.query(UserAchievement.user_id).filter(
-                UserAchievement.achievement_id == achievement.id
-            ).distinct().all()
-            
-            for (user_id,) in users_with_achievement:
-                # Get all user's records for this achievement
-                user_entries = db.query(UserAchievement).filter(
-                    UserAchievement.user_id == user_id,
-                    UserAchievement.achievement_id == achievement.id
-                ).order_by(
-                    # Sort by progress DESC, then by achievement date ASC if achieved
-                    UserAchievement.progress.desc(),
-                    UserAchievement.achieved_at.asc() if UserAchievement.achieved_at is not None else text("id")
-                ).all()
-                
-                # If more than one record exists, delete all except the first (best) one
-                if len(user_entries) > 1:
-                    for entry in user_entries[1:]:
-                        db.delete(entry)
-                        removed_count += 1
+        # Keep the row with the highest progress of every (user_id, achievement_id)
+        # pair, then the earliest achieved one
+        removed_count = delete_duplicate_user_achievements(
+            db,
+            UserAchievement.progress.desc(),
+            UserAchievement.achieved_at.asc().nulls_last()
+        )
         db.commit()
+        achievement_catalog_cache.invalidate()
         
         return {"message": f"Force removed {removed_count} duplicate achievements", "removed": removed_count}
     except HTTPException:
@@ -3016,12 +2775,10 @@ def get_new_achievements(
             return []
         
         # Get the actual achievement data
+        catalog = achievement_catalog_cache.get(db)
         result = []
         for user_achievement in new_achievements:
-            # Get the achievement data
-            achievement = db.query(Achievement).filter(
-                Achievement.id == user_achievement.achievement_id
-            ).first()
+            achievement = catalog.by_id.get(user_achievement.achievement_id)
             
             if achievement:
                 result.append({
@@ -0,0 +1,136 @@
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+import copy
+import random
+import threading
+import time
+
+from config import settings
+
+
+def plan_variant(user_id: int, variants: int) -> int:
+    """
+    Which of the cached plans for a set of preferences a user gets.
+
+    A stable per-user offset: the same user keeps getting the same variant, while
+    users with identical preferences are spread over up to `variants` plans.
+    """
+    return random.Random(user_id).randrange(max(variants, 1))
+
+
+def meal_plan_key(
+    calories: float,
+    protein: float,
+    carbs: float,
+    fat: float,
+    meal_count: int,
+    restrictions: Iterable[str],
+    optimizer: str,
+    seed: Optional[int],
+    variant: int,
+    day: str,
+    catalog_version: int
+) -> tuple:
+    """
+    Cache key of a meal plan: the targets the planner ran with, normalized.
+
+    Macros are rounded to whole numbers and restrictions deduplicated and sorted, so
+    "vegan, gluten-free" and "gluten-free,vegan" share an entry. The food catalog
+    version is part of the key, so plans built from an older catalog are never served.
+    """
+    return (
+        round(calories), round(protein), round(carbs), round(fat), meal_count,
+        tuple(sorted(set(restrictions))), optimizer, seed, variant, day, catalog_version
+    )
+
+
+class CachedMealPlan:
+    __slots__ = ("meals", "total_nutrition", "optimizer", "expires_at")
+
+    def __init__(self, meals: list, total_nutrition: dict, optimizer: str, expires_at: float):
+        self.meals = meals
+        self.total_nutrition = total_nutrition
+        self.optimizer = optimizer
+        self.expires_at = expires_at
+
+
+class MealPlanCache:
+    """
+    Per-process TTL/LRU cache of generated meal plans.
+
+    Entries live for at most ttl_seconds and the least recently used one is evicted
+    once there are more than max_entries. Plans are copied on the way in and out, so
+    callers can modify what they get back.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, CachedMealPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, key: tuple) -> Optional[Tuple[list, dict, str]]:
+        """(meals, total nutrition, optimizer) of a cached plan, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry.meals), dict(entry.total_nutrition), entry.optimizer
+
+    def put(self, key: tuple, meals: list, total_nutrition: dict, optimizer: str):
+        if not self.enabled:
+            return
+        entry = CachedMealPlan(
+            copy.deepcopy(meals), dict(total_nutrition), optimizer, time.monotonic() + self.ttl_seconds
+        )
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_bypass(self):
+        """Count a request that asked for a fresh plan"""
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bypasses": self.bypasses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+meal_plan_cache = MealPlanCache(settings.MEAL_PLAN_CACHE_TTL_SECONDS, settings.MEAL_PLAN_CACHE_MAX_ENTRIES)
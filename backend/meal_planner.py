@@ -0,0 +1,478 @@
+from typing import List, Optional, Tuple
+import random
+import time
+
+import numpy as np
+
+from food_catalog import FoodCatalog
+
+# Default meal names, times and calorie shares by number of meals per day
+MEAL_TEMPLATES = {
+    3: [
+        {"name": "Breakfast", "time": "08:00", "calorie_percent": 0.25},
+        {"name": "Lunch", "time": "13:00", "calorie_percent": 0.40},
+        {"name": "Dinner", "time": "19:00", "calorie_percent": 0.35},
+    ],
+    4: [
+        {"name": "Breakfast", "time": "08:00", "calorie_percent": 0.25},
+        {"name": "Morning Snack", "time": "11:00", "calorie_percent": 0.10},
+        {"name": "Lunch", "time": "13:00", "calorie_percent": 0.35},
+        {"name": "Dinner", "time": "19:00", "calorie_percent": 0.30},
+    ],
+    5: [
+        {"name": "Breakfast", "time": "07:30", "calorie_percent": 0.20},
+        {"name": "Morning Snack", "time": "10:30", "calorie_percent": 0.10},
+        {"name": "Lunch", "time": "13:00", "calorie_percent": 0.30},
+        {"name": "Afternoon Snack", "time": "16:00", "calorie_percent": 0.10},
+        {"name": "Dinner", "time": "19:00", "calorie_percent": 0.30},
+    ],
+    6: [
+        {"name": "Breakfast", "time": "07:00", "calorie_percent": 0.20},
+        {"name": "Morning Snack", "time": "10:00", "calorie_percent": 0.10},
+        {"name": "Lunch", "time": "13:00", "calorie_percent": 0.25},
+        {"name": "Afternoon Snack", "time": "16:00", "calorie_percent": 0.10},
+        {"name": "Dinner", "time": "19:00", "calorie_percent": 0.25},
+        {"name": "Evening Snack", "time": "21:30", "calorie_percent": 0.10},
+    ]
+}
+
+
+def build_greedy_meal_plan(catalog: FoodCatalog, allowed: np.ndarray, preferences, meal_count: int) -> Tuple[List[dict], dict]:
+    """
+    Build the day's meals by picking foods one at a time, best scoring first.
+
+    Three passes are made; each picks every food with one vectorized scoring pass
+    over the catalog. Uses the module level random generator, so results follow
+    random.seed. Returns the meals and the rounded nutrition totals.
+    """
+    allowed_indices = np.flatnonzero(allowed)
+
+    meals = []
+
+    # Track the actual nutrition totals
+    actual_total = {
+        "calories": 0,
+        "protein": 0,
+        "carbs": 0,
+        "fat": 0
+    }
+
+    # Number of iterations to try improving the meal plan
+    max_iterations = 3  # Increased from 2 for better optimization
+
+    # Generate a meal plan iteratively, improving it each time
+    for iteration in range(max_iterations):
+        print(f"Meal plan generation iteration {iteration+1}/{max_iterations}")
+
+        # Reset the meals and actual totals for each iteration
+        if iteration > 0:
+            meals = []
+            actual_total = {
+                "calories": 0,
+                "protein": 0,
+                "carbs": 0,
+                "fat": 0
+            }
+
+        # Calculate targets for each meal
+        for meal_template in MEAL_TEMPLATES[meal_count]:
+            meal_name = meal_template["name"]
+            meal_time = meal_template["time"]
+            calorie_percent = meal_template["calorie_percent"]
+
+            # Calculate this meal's target based on the overall preferences
+            # For the first meal(s), just use the percentage
+            # For the last meal, adjust to exactly hit the remaining target
+            is_last_meal = meal_name == MEAL_TEMPLATES[meal_count][-1]["name"]
+
+            if is_last_meal:
+                # For the last meal, use the remaining nutrition needed to hit the target
+                meal_calories = max(0, preferences.calories - actual_total["calories"])
+                meal_protein = max(0, preferences.protein - actual_total["protein"])
+                meal_carbs = max(0, preferences.carbs - actual_total["carbs"])
+                meal_fat = max(0, preferences.fat - actual_total["fat"])
+            else:
+                # For earlier meals, use the specified percentage
+                meal_calories = preferences.calories * calorie_percent
+                meal_protein = preferences.protein * calorie_percent
+                meal_carbs = preferences.carbs * calorie_percent
+                meal_fat = preferences.fat * calorie_percent
+
+            print(f"Generating {meal_name} with targets: {meal_calories:.1f} cal, {meal_protein:.1f}g protein, "
+                  f"{meal_carbs:.1f}g carbs, {meal_fat:.1f}g fat")
+
+            meal = {
+                "name": meal_name,
+                "time": meal_time,
+                "foods": []
+            }
+
+            # Determine how many food items to include in this meal
+            food_count = 2  # Default
+            if "snack" in meal_name.lower():
+                food_count = random.randint(1, 2)
+            elif "breakfast" in meal_name.lower():
+                food_count = random.randint(2, 3)
+            elif "lunch" in meal_name.lower() or "dinner" in meal_name.lower():
+                food_count = random.randint(2, 4)
+
+            # Check if this is the last meal and we're already over calorie budget
+            if is_last_meal and actual_total["calories"] >= preferences.calories * 0.95:
+                # We're already at or above target calories, so reduce the number of foods
+                food_count = max(1, food_count - 2)
+                print(f"Reducing food count for {meal_name} to {food_count} to avoid exceeding calorie target")
+
+            # Track nutrition for this meal
+            meal_total = {
+                "calories": 0,
+                "protein": 0,
+                "carbs": 0,
+                "fat": 0
+            }
+
+            # Foods still available for this meal (each food at most once per meal)
+            remaining_foods = allowed.copy()
+
+            # Check if we're approaching calorie limit
+            exceeding_calories = actual_total["calories"] >= preferences.calories * 0.9
+
+            for i in range(food_count):
+                # Stop adding foods if we're already over calorie target
+                if actual_total["calories"] >= preferences.calories:
+                    print(f"Stopping food addition for {meal_name} - already reached calorie target")
+                    break
+
+                # Calculate what's still needed for this meal
+                remaining_calories = meal_calories - meal_total["calories"]
+                remaining_protein = meal_protein - meal_total["protein"]
+                remaining_carbs = meal_carbs - meal_total["carbs"]
+                remaining_fat = meal_fat - meal_total["fat"]
+
+                # Adjust calorie target down further if we're close to daily target
+                if exceeding_calories:
+                    remaining_calories = min(remaining_calories, preferences.calories - actual_total["calories"])
+
+                # Adjust targets based on number of foods left to add
+                foods_left = food_count - i
+                target_calories = remaining_calories / foods_left
+                target_protein = remaining_protein / foods_left
+                target_carbs = remaining_carbs / foods_left
+                target_fat = remaining_fat / foods_left
+
+                # Find the best matching food with one vectorized scoring pass
+                candidates = remaining_foods
+                if exceeding_calories:
+                    # Skip high-calorie foods when we're close to our target
+                    candidates = candidates & (catalog.calories <= target_calories * 1.5)
+                best_index, best_quantity = catalog.best_match(
+                    candidates, target_calories, target_protein, target_carbs, target_fat
+                )
+
+                # If we couldn't find a good match, use any available food
+                if best_index is None:
+                    # Pick lower calorie options if we're close to target
+                    if exceeding_calories:
+                        # Sort by calories and pick from the lowest third
+                        sorted_indices = allowed_indices[np.argsort(catalog.calories[allowed_indices], kind="stable")]
+                        best_index = int(sorted_indices[min(len(sorted_indices) // 3, random.randint(0, len(sorted_indices) - 1))])
+                    else:
+                        best_index = int(random.choice(allowed_indices))
+
+                    best_quantity = min(3.0, max(0.5, target_calories / max(catalog.foods[best_index].calories, 1)))
+                best_food = catalog.foods[best_index]
+
+                # Add the selected food to the meal
+                if best_food:
+                    # Remove from available foods to avoid duplicates in the same meal
+                    remaining_foods[best_index] = False
+
+                    # For the last food in the meal, try to exactly hit the remaining targets
+                    if i == food_count - 1:
+                        # Fine-tune the quantity to better hit the target
+                        # but keep it within reasonable bounds
+                        best_quantity = min(3.0, max(0.5, remaining_calories / max(best_food.calories, 1)))
+
+                    # Additional check to avoid going way over daily calories
+                    estimated_calories = best_food.calories * best_quantity
+                    if actual_total["calories"] + estimated_calories > preferences.calories * 1.1:
+                        # Reduce quantity to stay within calorie target
+                        max_allowed_calories = max(0, preferences.calories - actual_total["calories"])
+                        best_quantity = min(best_quantity, max_allowed_calories / max(best_food.calories, 1))
+                        best_quantity = max(0.5, best_quantity)  # Don't go below 0.5 serving
+
+                    # Round the quantity to a reasonable number
+                    best_quantity = round(best_quantity * 2) / 2  # Round to nearest 0.5
+
+                    # Calculate the food's actual nutrition
+                    food_calories = round(best_food.calories * best_quantity, 1)
+                    food_protein = round(best_food.protein * best_quantity, 1)
+                    food_carbs = round(best_food.carbs * best_quantity, 1)
+                    food_fat = round(best_food.fat * best_quantity, 1)
+
+                    # Add to meal totals
+                    meal_total["calories"] += food_calories
+                    meal_total["protein"] += food_protein
+                    meal_total["carbs"] += food_carbs
+                    meal_total["fat"] += food_fat
+
+                    # Add to overall totals
+                    actual_total["calories"] += food_calories
+                    actual_total["protein"] += food_protein
+                    actual_total["carbs"] += food_carbs
+                    actual_total["fat"] += food_fat
+
+                    # Add food to the meal
+                    meal["foods"].append({
+                        "name": best_food.name,
+                        "calories": food_calories,
+                        "protein": food_protein,
+                        "carbs": food_carbs,
+                        "fat": food_fat,
+                        "serving_size": best_food.serving_size,
+                        "quantity": best_quantity
+                    })
+
+            meals.append(meal)
+            print(f"Added {meal_name} with {len(meal['foods'])} foods: {meal_total['calories']:.1f} cal, "
+                  f"{meal_total['protein']:.1f}g protein, {meal_total['carbs']:.1f}g carbs, {meal_total['fat']:.1f}g fat")
+
+            # Check if we've already hit our calorie target
+            if actual_total["calories"] >= preferences.calories:
+                print(f"Reached calorie target after adding {meal_name}. Stopping meal generation.")
+                break
+
+    # Round values in the actual total
+    for key in actual_total:
+        actual_total[key] = round(actual_total[key])
+
+    return meals, actual_total
+
+
+# How many foods each kind of meal may contain (min, max)
+FOOD_COUNT_BOUNDS = {"snack": (1, 2), "breakfast": (2, 3), "lunch": (2, 4), "dinner": (2, 4)}
+
+# Candidate foods per meal: the best scoring ones plus a seeded random sample for variety
+TOP_CANDIDATES = 25
+RANDOM_CANDIDATES = 15
+
+# Servings per food: between half a serving and three, in half serving steps
+MIN_SERVINGS = 0.5
+MAX_SERVINGS = 3.0
+
+# Relative weight of missing each daily macro target, as in FoodCatalog.score_foods;
+# going over the calorie target costs three times as much as staying under it
+MACRO_WEIGHTS = np.array([0.4, 0.3, 0.15, 0.15])
+CALORIE_OVERSHOOT_PENALTY = 3
+
+# Relative weight of a meal's calories straying from its share of the day
+MEAL_SHARE_WEIGHT = 0.01
+
+# Passes of the rounding search before settling for what it has
+MAX_ROUNDING_PASSES = 20
+
+MACROS = ("calories", "protein", "carbs", "fat")
+
+
+def food_count_bounds(meal_name: str) -> Tuple[int, int]:
+    name = meal_name.lower()
+    for kind, bounds in FOOD_COUNT_BOUNDS.items():
+        if kind in name:
+            return bounds
+    return (2, 2)
+
+
+def _pick_candidates(catalog: FoodCatalog, pool: np.ndarray, targets: np.ndarray, max_foods: int,
+                     rng: np.random.Generator) -> np.ndarray:
+    """Indices of the foods the solver may use for one meal, best scoring first"""
+    pool_indices = np.flatnonzero(pool)
+    scores, _ = catalog.score_foods(*(targets / max_foods))
+    # Seeded jitter decides between foods that score about the same
+    scores = scores[pool_indices] * rng.uniform(0.9, 1.1, len(pool_indices))
+    order = pool_indices[np.argsort(scores, kind="stable")]
+    if len(order) <= TOP_CANDIDATES + RANDOM_CANDIDATES:
+        return order
+    sampled = rng.choice(order[TOP_CANDIDATES:], size=RANDOM_CANDIDATES, replace=False)
+    return np.concatenate([order[:TOP_CANDIDATES], sampled])
+
+
+class _DayProblem:
+    """
+    The day's plan as a linear program over the servings of every (meal, food) pair.
+
+    The objective is the weighted relative miss of the daily macro targets plus a
+    small cost for each meal's calories straying from its share of the day. Misses
+    are modelled with over/under variables: macros @ servings - over + under = target.
+    """
+
+    def __init__(self, catalog: FoodCatalog, meal_foods: List[np.ndarray], daily: np.ndarray, shares: np.ndarray):
+        self.meal_foods = meal_foods
+        self.foods = np.concatenate(meal_foods)
+        self.meal_of = np.repeat(np.arange(len(meal_foods)), [len(foods) for foods in meal_foods])
+        self.macros = np.vstack([catalog.calories[self.foods], catalog.protein[self.foods],
+                                 catalog.carbs[self.foods], catalog.fat[self.foods]])
+        self.targets = np.concatenate([daily, daily[0] * shares])
+
+        meal_calories = np.zeros((len(meal_foods), len(self.foods)))
+        meal_calories[self.meal_of, np.arange(len(self.foods))] = self.macros[0]
+        self.rows = np.vstack([self.macros, meal_calories])
+
+        under = np.concatenate([MACRO_WEIGHTS, np.full(len(meal_foods), MEAL_SHARE_WEIGHT)])
+        self.under_cost = under / np.maximum(self.targets, 1)
+        self.over_cost = self.under_cost.copy()
+        self.over_cost[0] *= CALORIE_OVERSHOOT_PENALTY
+
+    def solve(self, lower: float, time_limit: float) -> Optional[np.ndarray]:
+        """Optimal (fractional) servings with every food between lower and MAX_SERVINGS"""
+        from scipy.optimize import linprog
+
+        count, misses = len(self.foods), len(self.targets)
+        result = linprog(
+            np.concatenate([np.zeros(count), self.over_cost, self.under_cost]),
+            A_eq=np.hstack([self.rows, -np.eye(misses), np.eye(misses)]),
+            b_eq=self.targets,
+            bounds=[(lower, MAX_SERVINGS)] * count + [(0, None)] * (2 * misses),
+            method="highs",
+            options={"time_limit": max(time_limit, 0.01)}
+        )
+        if result.status != 0:
+            return None
+        return result.x[:count]
+
+    def cost(self, servings: np.ndarray) -> np.ndarray:
+        """Objective of one servings vector, or of every column of a matrix of them"""
+        totals = self.rows @ servings
+        targets = self.targets if totals.ndim == 1 else self.targets[:, None]
+        over_cost = self.over_cost if totals.ndim == 1 else self.over_cost[:, None]
+        under_cost = self.under_cost if totals.ndim == 1 else self.under_cost[:, None]
+        return (over_cost * np.maximum(totals - targets, 0) + under_cost * np.maximum(targets - totals, 0)).sum(axis=0)
+
+    def restrict(self, catalog: FoodCatalog, keep: np.ndarray) -> "_DayProblem":
+        """The same problem with only the foods at the given positions"""
+        meal_foods = [self.foods[keep[self.meal_of[keep] == meal]] for meal in range(len(self.meal_foods))]
+        shares = self.targets[4:] / max(self.targets[0], 1)
+        return _DayProblem(catalog, meal_foods, self.targets[:4], shares)
+
+
+def _choose_foods(problem: _DayProblem, servings: np.ndarray, bounds: List[Tuple[int, int]]) -> np.ndarray:
+    """
+    Positions of the foods each meal keeps: the ones the relaxed solution uses most
+    (by calories), cut to the meal's maximum and topped up to its minimum with the
+    best scoring candidates.
+    """
+    keep = []
+    for meal, (min_foods, max_foods) in enumerate(bounds):
+        positions = np.flatnonzero(problem.meal_of == meal)
+        contribution = servings[positions] * problem.macros[0, positions]
+        used = positions[contribution > 1e-6]
+        used = list(used[np.argsort(-contribution[contribution > 1e-6], kind="stable")][:max_foods])
+        # Candidates are ordered best scoring first
+        for position in positions:
+            if len(used) >= min_foods:
+                break
+            if position not in used:
+                used.append(position)
+        keep.extend(used)
+    return np.array(sorted(keep), dtype=np.int64)
+
+
+def _round_servings(problem: _DayProblem, servings: np.ndarray) -> np.ndarray:
+    """
+    Round servings to half servings: start at the nearest ones, then keep applying
+    the move that lowers the objective most until none does. A move is a half
+    serving more or less of one food, or a half serving of one food swapped for
+    another (which single steps alone often can't get past).
+    """
+    count = len(servings)
+    identity = np.eye(count) * 0.5
+    swaps = (identity[:, None, :] - identity[None, :, :]).reshape(-1, count)
+    moves = np.vstack([identity, -identity, swaps[swaps.any(axis=1)]])
+
+    current = np.clip(np.round(servings * 2) / 2, MIN_SERVINGS, MAX_SERVINGS)
+    best_cost = problem.cost(current)
+    for _ in range(MAX_ROUNDING_PASSES):
+        neighbours = current + moves
+        valid = ((neighbours >= MIN_SERVINGS) & (neighbours <= MAX_SERVINGS)).all(axis=1)
+        costs = np.where(valid, problem.cost(neighbours.T), np.inf)
+        best = int(np.argmin(costs))
+        if costs[best] >= best_cost - 1e-12:
+            break
+        current, best_cost = neighbours[best], costs[best]
+    return current
+
+
+def build_optimized_meal_plan(catalog: FoodCatalog, allowed: np.ndarray, preferences, meal_count: int,
+                              seed: int, time_budget: float) -> Optional[Tuple[List[dict], dict]]:
+    """
+    Build the day's meals by optimizing food choice and quantities for the whole day.
+
+    Every meal gets a pool of candidate foods (foods aren't repeated across meals
+    while enough others are available) and one linear program sets the servings of
+    all of them against the daily targets. Each meal then keeps the foods the
+    solution leans on most, within its food count, the servings are re-solved with
+    at least half a serving each and rounded to half servings by a local search.
+
+    The seed fixes the candidate sampling, so the same inputs give the same plan.
+    Returns None when scipy isn't available or the solver fails or runs out of the
+    time budget, so the caller can fall back to the greedy planner.
+    """
+    try:
+        import scipy.optimize  # noqa: F401
+    except ImportError:
+        print("scipy is not installed, meal plan optimizer unavailable")
+        return None
+
+    deadline = time.monotonic() + time_budget
+    rng = np.random.default_rng(seed)
+    daily = np.array([preferences.calories, preferences.protein, preferences.carbs, preferences.fat], dtype=float)
+    templates = MEAL_TEMPLATES[meal_count]
+    shares = np.array([meal_template["calorie_percent"] for meal_template in templates])
+    bounds = [food_count_bounds(meal_template["name"]) for meal_template in templates]
+
+    meal_foods = []
+    taken = np.zeros(len(catalog), dtype=bool)
+    for share, (_, max_foods) in zip(shares, bounds):
+        pool = allowed & ~taken
+        if pool.sum() < max_foods:
+            pool = allowed
+        candidates = _pick_candidates(catalog, pool, daily * share, max_foods, rng)
+        if len(candidates) == 0:
+            print("Meal plan optimizer has no foods to choose from")
+            return None
+        taken[candidates] = True
+        meal_foods.append(candidates)
+
+    problem = _DayProblem(catalog, meal_foods, daily, shares)
+    servings = problem.solve(0.0, deadline - time.monotonic())
+    if servings is None or time.monotonic() > deadline:
+        print("Meal plan optimizer found no solution within the time budget")
+        return None
+
+    problem = problem.restrict(catalog, _choose_foods(problem, servings, bounds))
+    servings = problem.solve(MIN_SERVINGS, deadline - time.monotonic())
+    if servings is None or time.monotonic() > deadline:
+        print("Meal plan optimizer found no solution within the time budget")
+        return None
+    servings = _round_servings(problem, servings)
+
+    meals = []
+    achieved = np.zeros(4)
+    for meal, meal_template in enumerate(templates):
+        meal_entry = {"name": meal_template["name"], "time": meal_template["time"], "foods": []}
+        for position in np.flatnonzero(problem.meal_of == meal):
+            food = catalog.foods[problem.foods[position]]
+            quantity = float(servings[position])
+            food_macros = [round((value or 0) * quantity, 1) for value in (food.calories, food.protein, food.carbs, food.fat)]
+            achieved += food_macros
+            meal_entry["foods"].append({
+                "name": food.name,
+                "calories": food_macros[0],
+                "protein": food_macros[1],
+                "carbs": food_macros[2],
+                "fat": food_macros[3],
+                "serving_size": food.serving_size,
+                "quantity": quantity
+            })
+        meals.append(meal_entry)
+
+    actual_total = {key: round(value) for key, value in zip(MACROS, achieved)}
+    return meals, actual_total
@@ -1,14 +1,46 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Float, Boolean, JSON, UniqueConstraint, Date, Time, Index
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSON as PGJSON
 from sqlalchemy.ext.declarative import declarative_base
 from database import Base
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date as date_type, time as time_type
 import uuid
 
 Base = declarative_base()
 
 
+class DateString(TypeDecorator):
+    """DATE column that the application reads and writes as YYYY-MM-DD strings"""
+    impl = Date
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, date_type):
+            return value
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+    def process_result_value(self, value, dialect):
+        return value.strftime("%Y-%m-%d") if value is not None else None
+
+
+class TimeString(TypeDecorator):
+    """TIME column that the application reads and writes as HH:MM strings"""
+    impl = Time
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, time_type):
+            return value
+        try:
+            return datetime.strptime(value, "%H:%M").time()
+        except ValueError:
+            return datetime.strptime(value, "%H:%M:%S").time()
+
+    def process_result_value(self, value, dialect):
+        return value.strftime("%H:%M") if value is not None else None
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -69,6 +101,8 @@ class User(Base):
     rewards = relationship("UserReward", back_populates="user", cascade="all, delete-orphan", lazy="noload", overlaps="rewards")
     sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
     exercise_memories = relationship("ExerciseMemory", back_populates="user", cascade="all, delete-orphan")
+    workout_stats = relationship("UserWorkoutStats", back_populates="user", uselist=False, cascade="all, delete-orphan")
+    nutrition_daily_totals = relationship("NutritionDailyTotals", back_populates="user", cascade="all, delete-orphan")
 
 
 class UserProfile(Base):
@@ -120,10 +154,16 @@ class Workout(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
 
     user = relationship("User", back_populates="workouts")
-    exercises = relationship("Exercise", back_populates="workout", cascade="all, delete-orphan")
+    # Ordered explicitly: without it the order depends on the index the planner picks
+    exercises = relationship("Exercise", back_populates="workout", cascade="all, delete-orphan",
+                             order_by="Exercise.id")
     routines = relationship("Routine", back_populates="workout", cascade="all, delete-orphan")
 
 
+# Workout lists, history and stats filter by user and template flag, newest first
+Index("ix_workouts_user_id_is_template_date", Workout.user_id, Workout.is_template, Workout.date.desc())
+
+
 class Exercise(Base):
     __tablename__ = "exercises"
 
@@ -135,8 +175,13 @@ class Exercise(Base):
         "workouts.id", ondelete="CASCADE"), nullable=False)
 
     workout = relationship("Workout", back_populates="exercises")
+    # In logged order; sets created without an order all have order 0
     sets = relationship("Set", back_populates="exercise",
-                        cascade="all, delete-orphan")
+                        cascade="all, delete-orphan", order_by="(Set.order, Set.id)")
+
+
+# Exercises are loaded per workout, often matched by name (progress, records)
+Index("ix_exercises_workout_id_name", Exercise.workout_id, Exercise.name)
 
 
 class Set(Base):
@@ -174,6 +219,27 @@ class Set(Base):
     exercise = relationship("Exercise", back_populates="sets")
 
 
+# Sets are loaded per exercise; the weight order serves heaviest-set lookups
+Index("ix_sets_exercise_id_weight", Set.exercise_id, Set.weight.desc())
+
+
+class UserWorkoutStats(Base):
+    __tablename__ = "user_workout_stats"
+
+    # Rollup of a user's logged (non-template) workouts, maintained incrementally
+    # by workout create/delete and rebuilt from scratch by rebuild_workout_stats.py
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_workouts = Column(Integer, nullable=False, default=0)
+    last_workout_date = Column(DateTime, nullable=True)
+    cardio_duration = Column(Float, nullable=False, default=0)  # Sum of cardio set durations
+    workout_duration = Column(Float, nullable=False, default=0)  # Minutes between start and end times
+    exercise_counts = Column(JSON, nullable=False, default=lambda: {})  # Exercise name -> times logged
+    favorite_exercise = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    user = relationship("User", back_populates="workout_stats")
+
+
 class CustomExercise(Base):
     __tablename__ = "custom_exercises"
 
@@ -260,6 +326,12 @@ class Notification(Base):
     user = relationship("User", back_populates="notifications")
 
 
+Index("ix_notifications_user_id_created_at", Notification.user_id, Notification.created_at.desc())
+# Partial index for the unread badge and mark-all-read, which only touch unread rows
+Index("ix_notifications_user_id_unread", Notification.user_id,
+      postgresql_where=(Notification.read == False), sqlite_where=(Notification.read == False))
+
+
 class WorkoutPreferences(Base):
     __tablename__ = "workout_preferences"
 
@@ -316,6 +388,8 @@ class AdminSettings(Base):
     notify_system_alerts = Column(Boolean, default=True)
     last_updated = Column(DateTime, default=datetime.now(timezone.utc))
     updated_by = Column(Integer, ForeignKey("users.id"))
+    # Bumped on every change so other workers can tell their cached copy is stale
+    version = Column(Integer, nullable=False, default=1, server_default='1')
     updated_by_user = relationship("User", back_populates="admin_settings_updates")
 
 
@@ -350,6 +424,11 @@ class UserAchievement(Base):
     icon = Column(String, nullable=True)  # Custom icon override
     level = Column(Integer, default=1)  # Achievement level
 
+    # One progress row per achievement per user; rows are created with ON CONFLICT upserts
+    __table_args__ = (
+        UniqueConstraint('user_id', 'achievement_id', name='unique_user_achievement'),
+    )
+
     user = relationship("User", back_populates="achievements")
     achievement = relationship("Achievement", back_populates="users")
 
@@ -359,14 +438,18 @@ class NutritionMeal(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    date = Column(String, nullable=False)  # YYYY-MM-DD format
-    time = Column(String, nullable=False)  # HH:MM format
+    date = Column(DateString, nullable=False)  # Stored as DATE, read and written as YYYY-MM-DD
+    time = Column(TimeString, nullable=False)  # Stored as TIME, read and written as HH:MM
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="nutrition_meals")
     foods = relationship("NutritionFood", back_populates="meal", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_meals_user_id_date", "user_id", "date"),
+    )
+
 
 class NutritionFood(Base):
     __tablename__ = "meal_foods"
@@ -385,6 +468,23 @@ class NutritionFood(Base):
     meal = relationship("NutritionMeal", back_populates="foods")
 
 
+class NutritionDailyTotals(Base):
+    __tablename__ = "nutrition_daily_totals"
+
+    # Rollup of one user's logged meals per day, maintained by the meal endpoints
+    # when NUTRITION_DAILY_ROLLUP is on and rebuilt by rebuild_nutrition_totals.py
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(DateString, primary_key=True)  # Same type as meals.date
+    calories = Column(Float, nullable=False, default=0)
+    protein = Column(Float, nullable=False, default=0)
+    carbs = Column(Float, nullable=False, default=0)
+    fat = Column(Float, nullable=False, default=0)
+    meal_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    user = relationship("User", back_populates="nutrition_daily_totals")
+
+
 class NutritionGoal(Base):
     __tablename__ = "nutrition_goals"
     
@@ -417,6 +517,22 @@ class CommonFood(Base):
     sodium = Column(Float, nullable=True)
     food_group = Column(String, nullable=True)  # e.g., "Fruits", "Vegetables", "Proteins", etc.
     brand = Column(String, nullable=True)  # For branded products
+    # Bitmask of the dietary restrictions the food satisfies (food_catalog.RESTRICTION_FLAGS)
+    restriction_flags = Column(Integer, nullable=True)
+
+
+class AIWorkoutPlanCache(Base):
+    __tablename__ = "ai_workout_plan_cache"
+
+    # Parsed AI workout plans, content addressed: the key is a SHA-256 of the model
+    # name and the prompt built from the normalized request (see ai_workout_cache.py)
+    key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    request = Column(JSON, nullable=False)  # The normalized request fields
+    plan = Column(JSON, nullable=False)  # WorkoutPlan as a dict
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_used_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+    hits = Column(Integer, nullable=False, default=0)
 
 
 class WorkoutTemplate(Base):
@@ -461,7 +577,7 @@ class UserSession(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    token = Column(String, nullable=False, index=True)
+    token = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), default=datetime.now(timezone.utc))
     expires_at = Column(DateTime(timezone=True), nullable=False)
     ip_address = Column(String, nullable=True)
@@ -470,3 +586,7 @@ class UserSession(Base):
     is_active = Column(Boolean, default=True)
 
     user = relationship("User", back_populates="sessions")
+
+
+# Sessions are only ever looked up by exact token, which a hash index serves best
+Index("ix_user_sessions_token_hash", UserSession.token, postgresql_using="hash")
@@ -1,22 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
 from database import get_db
 from dependencies import get_current_user
+from config import settings
+from inference_client import InferenceError, InferenceUnavailable, inference_client
+from chat_context_cache import chat_context_cache
+from food_search import search_common_foods, food_search_index
+from food_catalog import SUPPORTED_RESTRICTIONS, food_catalog_cache, restriction_flags
+from meal_planner import MEAL_TEMPLATES, build_greedy_meal_plan, build_optimized_meal_plan
+from meal_plan_cache import meal_plan_cache, meal_plan_key, plan_variant
+from nutrition_totals import get_daily_totals, refresh_daily_totals
+from progress import date_range_filters
 from models import User, NutritionMeal, NutritionFood, NutritionGoal, CommonFood, Workout, Exercise, SavedWorkoutProgram
 from pydantic import BaseModel
-import requests
 import os
 from dotenv import load_dotenv
-from sqlalchemy import or_, desc, func, String
-import random
+from sqlalchemy import or_, desc, func
 import json
+import time
+import numpy as np
 
 load_dotenv()
 
-# Get Hugging Face API token and model name from environment variables
-HUGGINGFACE_API_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
+# Get the Hugging Face model name from environment variables
 AI_MODEL = os.getenv("AI_MODEL", "meta-llama/Llama-2-7b-chat-hf")
 
 router = APIRouter(prefix="/nutrition", tags=["nutrition"])
@@ -66,11 +75,15 @@ class MealPlanPreferences(BaseModel):
     restrictions: Optional[str] = ""
     preferences: Optional[str] = ""
     adjust_for_workouts: bool = False  # Flag to enable workout-based adjustments
+    optimizer: str = "greedy"  # "greedy", or "lp" to optimize the whole day with a linear program
+    seed: Optional[int] = None  # Fixes the "lp" optimizer's food sampling
 
 class MealPlanResponse(BaseModel):
     date: str
     totalNutrition: dict
     meals: List[dict]
+    optimizer: Optional[str] = None
+    cached: bool = False
 
 class NutritionChatRequest(BaseModel):
     question: str
@@ -78,67 +91,158 @@ class NutritionChatRequest(BaseModel):
 class NutritionChatResponse(BaseModel):
     answer: str
 
+# Longest span the multi-day meals endpoint serves in one request
+MAX_MEAL_RANGE_DAYS = 62
+
+MACRO_FIELDS = ("calories", "protein", "carbs", "fat")
+
+
+def parse_meal_date(value: str, parameter: str):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {parameter} date '{value}', expected YYYY-MM-DD")
+
+
+def parse_meal_time(value: str):
+    for time_format in ("%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value, time_format).time()
+        except ValueError:
+            continue
+    raise HTTPException(status_code=400, detail=f"Invalid time '{value}', expected HH:MM")
+
+
+def sum_macros(items: List[dict]) -> dict:
+    return {field: round(sum(item[field] for item in items), 1) for field in MACRO_FIELDS}
+
+
+def serialize_meal(meal: NutritionMeal) -> dict:
+    """A meal with its foods and its macro totals (each food counted by its quantity)"""
+    food_list = []
+    scaled = []
+    for food in meal.foods:
+        food_list.append({
+            "name": food.name,
+            "calories": food.calories,
+            "protein": food.protein,
+            "carbs": food.carbs,
+            "fat": food.fat,
+            "serving_size": food.serving_size,
+            "quantity": food.quantity
+        })
+        quantity = food.quantity if food.quantity is not None else 1.0
+        scaled.append({field: (getattr(food, field) or 0) * quantity for field in MACRO_FIELDS})
+    return {
+        "id": meal.id,
+        "name": meal.name,
+        "date": meal.date,
+        "time": meal.time,
+        "foods": food_list,
+        "totals": sum_macros(scaled)
+    }
+
+
+def load_meal_days(db: Session, user_id: int, start_date: str, end_date: str) -> List[dict]:
+    """
+    Meals with their foods for every day from start_date to end_date (inclusive).
+
+    Meals and foods are fetched in two queries in total (selectinload), however many
+    meals there are. Every day in the range is returned, empty days included, each
+    with its meals and the day's macro totals.
+    """
+    meals = db.query(NutritionMeal).options(
+        selectinload(NutritionMeal.foods)
+    ).filter(
+        NutritionMeal.user_id == user_id,
+        NutritionMeal.date >= start_date,
+        NutritionMeal.date <= end_date
+    ).order_by(NutritionMeal.date, NutritionMeal.id).all()
+
+    meals_by_date = {}
+    for meal in meals:
+        meals_by_date.setdefault(meal.date, []).append(serialize_meal(meal))
+
+    days = []
+    day = datetime.strptime(start_date, "%Y-%m-%d").date()
+    last_day = datetime.strptime(end_date, "%Y-%m-%d").date()
+    while day <= last_day:
+        day_str = day.strftime("%Y-%m-%d")
+        day_meals = meals_by_date.get(day_str, [])
+        days.append({
+            "date": day_str,
+            "meals": day_meals,
+            "totals": sum_macros([meal["totals"] for meal in day_meals])
+        })
+        day += timedelta(days=1)
+    return days
+
+
+def recent_activity_cutoff(days: int) -> datetime:
+    """Start of the UTC day `days` days ago, the lower bound of a recent activity window"""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).date()
+    return datetime.combine(since, datetime.min.time())
+
+
+def get_recent_workouts(db: Session, user_id: int, days: int, load_details: bool = False) -> List[Workout]:
+    """
+    Logged workouts of the recent activity window, newest first.
+
+    Filters with a plain range on Workout.date so the (user_id, is_template, date)
+    index can be used. With load_details, exercises and their sets are preloaded
+    with selectinload (two extra queries in total instead of one per workout).
+    """
+    query = db.query(Workout).filter(
+        Workout.user_id == user_id,
+        Workout.is_template == False,
+        *date_range_filters(Workout.date, recent_activity_cutoff(days).date())
+    )
+    if load_details:
+        query = query.options(selectinload(Workout.exercises).selectinload(Exercise.sets))
+    return query.order_by(desc(Workout.date)).all()
+
+
 # Routes
 @router.get("/meals")
 def get_meals(
-    date: str,
+    date: Optional[str] = Query(None, description="Single day (YYYY-MM-DD); returns that day's meals"),
+    from_date: Optional[str] = Query(None, alias="from", description="First day of a range (YYYY-MM-DD)"),
+    to_date: Optional[str] = Query(None, alias="to", description="Last day of a range (YYYY-MM-DD)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's meals for a specific date"""
+    """
+    Get user's meals for a specific date, or for every day of a date range.
+
+    With date, returns the list of that day's meals, each with its foods and totals.
+    With from and to, returns one entry per day: its date, meals and day totals.
+    """
+    if date:
+        parse_meal_date(date, "date")
+        start_date, end_date = date, date
+    elif from_date and to_date:
+        first_day = parse_meal_date(from_date, "from")
+        last_day = parse_meal_date(to_date, "to")
+        if last_day < first_day:
+            raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+        if (last_day - first_day).days >= MAX_MEAL_RANGE_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_MEAL_RANGE_DAYS} days")
+        start_date, end_date = from_date, to_date
+    else:
+        raise HTTPException(status_code=400, detail="Provide either date or both from and to")
+
     try:
-        print(f"\n==== GET MEALS DEBUG ====")
-        print(f"Getting meals for date: {date}, user_id: {current_user.id} ({current_user.username})")
-        
-        # Get meals for the specified date and user
-        meals = db.query(NutritionMeal).filter(
-            NutritionMeal.user_id == current_user.id,
-            NutritionMeal.date == date
-        ).all()
-        
-        print(f"Found {len(meals)} meals in database")
-        
-        result = []
-        for meal in meals:
-            print(f"Processing meal ID {meal.id}: {meal.name}")
-            
-            # Get foods for this meal
-            foods = db.query(NutritionFood).filter(
-                NutritionFood.meal_id == meal.id
-            ).all()
-            
-            print(f"  - Found {len(foods)} foods for this meal")
-            
-            food_list = []
-            for food in foods:
-                food_list.append({
-                    "name": food.name,
-                    "calories": food.calories,
-                    "protein": food.protein,
-                    "carbs": food.carbs,
-                    "fat": food.fat,
-                    "serving_size": food.serving_size,
-                    "quantity": food.quantity
-                })
-            
-            # Add the meal with all its foods to the result list - OUTSIDE the food loop
-            result.append({
-                "id": meal.id,
-                "name": meal.name,
-                "date": meal.date,
-                "time": meal.time,
-                "foods": food_list
-            })
-        
-        print(f"Returning {len(result)} meals with foods")
-        return result
-        
+        days = load_meal_days(db, current_user.id, start_date, end_date)
     except Exception as e:
         print(f"Error fetching meals: {str(e)}")
         import traceback
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error fetching meals: {str(e)}")
 
+    if date:
+        return days[0]["meals"]
+    return days
+
 @router.post("/meals", status_code=201)
 def create_meal(
     meal: MealCreate,
@@ -146,6 +250,9 @@ def create_meal(
     current_user: User = Depends(get_current_user)
 ):
     """Create a new meal with foods"""
+    # Meals are stored as DATE/TIME, so malformed values are rejected up front
+    parse_meal_date(meal.date, "date")
+    parse_meal_time(meal.time)
     try:
         print(f"\n==== MEAL CREATION DEBUG ====")
         print(f"Creating meal: {meal.name} for user_id: {current_user.id}, date: {meal.date}")
@@ -178,8 +285,11 @@ def create_meal(
             )
             db.add(db_food)
         
+        refresh_daily_totals(db, current_user.id, [meal.date])
+        
         # Commit all changes
         db.commit()
+        chat_context_cache.invalidate(current_user.id)
         print(f"Successfully saved meal ID {db_meal.id} with {len(meal.foods)} foods")
         
         # Verify the meal was saved
@@ -206,6 +316,7 @@ def delete_meals_by_date(
     current_user: User = Depends(get_current_user)
 ):
     """Delete all meals for a specific date"""
+    parse_meal_date(date, "date")
     try:
         print(f"\n==== DELETE MEALS BY DATE ====")
         print(f"Deleting all meals for date: {date}, user_id: {current_user.id}")
@@ -227,7 +338,9 @@ def delete_meals_by_date(
         for meal in meals:
             db.delete(meal)
         
+        refresh_daily_totals(db, current_user.id, [date])
         db.commit()
+        chat_context_cache.invalidate(current_user.id)
         print(f"Successfully deleted {meal_count} meals for date {date}")
         
         return {"message": f"Successfully deleted {meal_count} meals", "deleted_count": meal_count}
@@ -253,8 +366,11 @@ def delete_meal(
     if not meal:
         raise HTTPException(status_code=404, detail="Meal not found")
     
+    meal_date = meal.date
     db.delete(meal)
+    refresh_daily_totals(db, current_user.id, [meal_date])
     db.commit()
+    chat_context_cache.invalidate(current_user.id)
     return {"message": "Meal deleted successfully"}
 
 @router.get("/goals")
@@ -310,6 +426,7 @@ def update_nutrition_goals(
         db.add(new_goals)
     
     db.commit()
+    chat_context_cache.invalidate(current_user.id)
     return {"message": "Nutrition goals updated successfully"}
 
 @router.get("/history", response_model=List[NutritionHistoryResponse])
@@ -337,51 +454,19 @@ def get_nutrition_history(
         
         print(f"Date range: {start_date_str} to {today_str}")
         
-        # Get all meals in the date range - using string comparison since date is stored as string
-        meals = db.query(NutritionMeal).filter(
-            NutritionMeal.user_id == current_user.id,
-            NutritionMeal.date >= start_date_str,
-            NutritionMeal.date <= today_str
-        ).all()
-        
-        print(f"Found {len(meals)} meals in date range")
-        
-        # If no meals, return empty list
-        if not meals:
-            return []
-        
-        # Group meals by date and calculate totals
-        date_totals = {}
-        for meal in meals:
-            try:
-                date = meal.date
-                if date not in date_totals:
-                    date_totals[date] = {"calories": 0, "protein": 0, "carbs": 0, "fat": 0}
-                
-                # Get all foods for this meal
-                foods = db.query(NutritionFood).filter(NutritionFood.meal_id == meal.id).all()
-                
-                # Add up nutrition values
-                for food in foods:
-                    quantity = food.quantity if food.quantity is not None else 1.0
-                    date_totals[date]["calories"] += (food.calories or 0) * quantity
-                    date_totals[date]["protein"] += (food.protein or 0) * quantity
-                    date_totals[date]["carbs"] += (food.carbs or 0) * quantity
-                    date_totals[date]["fat"] += (food.fat or 0) * quantity
-            except Exception as meal_err:
-                print(f"Error processing meal {meal.id}: {str(meal_err)}")
-                # Continue with other meals
+        # Daily totals from the rollup, or from one grouped query over meals and foods
+        daily_totals = get_daily_totals(db, current_user.id, start_date_str, today_str)
         
-        # Convert to list of response objects
-        result = []
-        for date, totals in date_totals.items():
-            result.append({
-                "date": date,
-                "calories": int(round(totals["calories"])),
-                "protein": int(round(totals["protein"])),
-                "carbs": int(round(totals["carbs"])),
-                "fat": int(round(totals["fat"]))
-            })
+        result = [
+            {
+                "date": day["date"],
+                "calories": int(round(day["calories"])),
+                "protein": int(round(day["protein"])),
+                "carbs": int(round(day["carbs"])),
+                "fat": int(round(day["fat"]))
+            }
+            for day in daily_totals
+        ]
         
         print(f"Returning {len(result)} nutrition history records")
         return result
@@ -391,68 +476,41 @@ def get_nutrition_history(
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error retrieving nutrition history: {str(e)}")
 
+def food_search_result(food: CommonFood) -> dict:
+    return {
+        "name": food.name,
+        "calories": food.calories,
+        "protein": food.protein,
+        "carbs": food.carbs,
+        "fat": food.fat,
+        "serving_size": food.serving_size,
+        "source": "database"
+    }
+
 @router.get("/search")
 def search_foods(
     query: str = None,
+    limit: Optional[int] = Query(None, ge=1, le=50, description="Page size (10 for searches, 30 when browsing)"),
+    offset: int = Query(0, ge=0, le=1000),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Search for foods in common foods database"""
+    """Search for foods in common foods database, most relevant first"""
     try:
-        print(f"\n==== FOOD SEARCH DEBUG ====")
-        
         # Check if query is empty or None - return all foods in that case
         if not query or query.strip() == "":
-            print("Empty search query - returning all available foods")
-            
-            # Get all common foods, limit to a reasonable number
-            common_foods = db.query(CommonFood).limit(30).all()
-            print(f"Returning all {len(common_foods)} foods from database")
-            
-            results = []
-            for food in common_foods:
-                results.append({
-                    "name": food.name,
-                    "calories": food.calories,
-                    "protein": food.protein,
-                    "carbs": food.carbs,
-                    "fat": food.fat,
-                    "serving_size": food.serving_size,
-                    "source": "database"
-                })
-            
-            return results
-            
-        # If query is provided, search as normal
-        print(f"Searching for: '{query}' by user: {current_user.id} ({current_user.username})")
-        
-        # Check if we have common foods in the database
-        common_foods_count = db.query(CommonFood).count()
-        print(f"Common foods in database: {common_foods_count}")
-        
-        # Search in common foods
-        common_foods = db.query(CommonFood).filter(
-            CommonFood.name.ilike(f"%{query}%")
-        ).limit(10).all()
-        
-        print(f"Found {len(common_foods)} matching common foods")
-    
-        results = []
-    
-        # Add common foods to results
-        for food in common_foods:
-            results.append({
-                "name": food.name,
-                "calories": food.calories,
-                "protein": food.protein,
-                "carbs": food.carbs,
-                "fat": food.fat,
-                "serving_size": food.serving_size,
-                "source": "database"
-            })
-            
-        # If no results found, add some default foods for testing
-        if len(results) == 0 and common_foods_count == 0:
+            common_foods = db.query(CommonFood)\
+                .order_by(CommonFood.name, CommonFood.id)\
+                .offset(offset)\
+                .limit(limit or 30)\
+                .all()
+            return [food_search_result(food) for food in common_foods]
+
+        common_foods = search_common_foods(db, query, limit=limit or 10, offset=offset)
+        results = [food_search_result(food) for food in common_foods]
+
+        # If the food table is empty, add some default foods for testing
+        if len(results) == 0 and offset == 0 and db.query(CommonFood.id).first() is None:
             print("No results found, adding test foods")
             test_foods = [
                 {
@@ -485,7 +543,6 @@ def search_foods(
             ]
             results = test_foods
             
-        print(f"Returning {len(results)} results")
         return results
         
     except Exception as e:
@@ -515,11 +572,14 @@ def create_food(
             fat=food.fat,
             serving_size=food.serving_size,
             food_group="User Custom",
+            restriction_flags=restriction_flags(food.name, "User Custom"),
             created_at=datetime.now(timezone.utc)
         )
         db.add(db_food)
         db.commit()
         db.refresh(db_food)
+        food_search_index.add(db_food.id, db_food.name)
+        food_catalog_cache.invalidate()
         
         print(f"Created custom food with ID: {db_food.id}")
         
@@ -543,10 +603,18 @@ def create_food(
 @router.post("/generate-meal-plan", response_model=MealPlanResponse)
 def generate_meal_plan(
     preferences: MealPlanPreferences,
+    fresh: bool = Query(False, description="Always build a new plan instead of reusing a cached one"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Generate a meal plan based on user preferences and workout history"""
+    """
+    Generate a meal plan based on user preferences and workout history.
+
+    Plans are cached by the final targets (after workout adjustments), restrictions,
+    optimizer and food catalog version; fresh=true builds a new one and replaces it.
+    """
+    if preferences.optimizer not in ("greedy", "lp"):
+        raise HTTPException(status_code=400, detail="optimizer must be 'greedy' or 'lp'")
     try:
         print(f"\n==== MEAL PLAN GENERATION ====")
         print(f"Generating meal plan for user_id: {current_user.id} with preferences: {preferences.dict()}")
@@ -556,12 +624,12 @@ def generate_meal_plan(
             SavedWorkoutProgram.user_id == current_user.id
         ).all()
         
-        # Also check for recent workouts as an alternative
-        recent_workouts = db.query(Workout).filter(
-            Workout.user_id == current_user.id,
-            Workout.is_template == False,
-            func.cast(Workout.date, String) >= (datetime.now(timezone.utc) - timedelta(days=7)).strftime('%Y-%m-%d')
-        ).all()
+        # Also check for recent workouts as an alternative. The workout-based adjustment
+        # below looks at a shorter window of the same workouts, so load their
+        # exercises and sets up front when it's requested.
+        recent_workouts = get_recent_workouts(
+            db, current_user.id, 7, load_details=preferences.adjust_for_workouts
+        )
         
         if not active_programs and not recent_workouts:
             raise HTTPException(
@@ -622,18 +690,12 @@ def generate_meal_plan(
         
         # Adjust nutrition based on workout data if requested
         if preferences.adjust_for_workouts:
-            # Get recent workouts (last 3 days)
-            three_days_ago = (datetime.now(timezone.utc) - timedelta(days=3)).strftime('%Y-%m-%d')
-            today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+            # Get recent workouts (last 3 days), a subset of the week loaded above
+            three_days_ago = recent_activity_cutoff(3)
             
-            print(f"Checking workouts from {three_days_ago} to {today}")
+            print(f"Checking workouts since {three_days_ago.strftime('%Y-%m-%d')}")
             
-            # Query recent workouts
-            recent_workouts = db.query(Workout).filter(
-                Workout.user_id == current_user.id,
-                Workout.is_template == False,
-                func.cast(Workout.date, String) >= three_days_ago
-            ).order_by(desc(Workout.date)).all()
+            recent_workouts = [workout for workout in recent_workouts if workout.date >= three_days_ago]
             
             print(f"Found {len(recent_workouts)} recent workouts")
             
@@ -731,112 +793,33 @@ def generate_meal_plan(
                 
                 print(f"Adjusted macros: {preferences.carbs}g carbs, {preferences.fat}g fat")
         
-        # Get all available foods from the database
-        available_foods = db.query(CommonFood).all()
-        print(f"Found {len(available_foods)} foods in database")
+        # Get all available foods from the shared catalog
+        catalog = food_catalog_cache.get(db)
+        print(f"Using food catalog version {catalog.version} with {len(catalog)} foods")
         
         # If no foods in database, return error
-        if len(available_foods) == 0:
+        if len(catalog) == 0:
             raise HTTPException(status_code=404, detail="No foods found in database to generate meal plan")
         
         # Process dietary restrictions
         restrictions_list = [r.strip().lower() for r in preferences.restrictions.split(',') if r.strip()] if preferences.restrictions else []
         print(f"Dietary restrictions: {restrictions_list}")
         
-        # Define non-vegetarian food groups and keywords for better filtering
-        non_vegetarian_groups = ["meat", "poultry", "fish", "seafood"]
-        non_vegetarian_keywords = ["chicken", "beef", "pork", "turkey", "fish", "salmon", "tuna", 
-                                  "shrimp", "meat", "sausage", "bacon", "ham", "steak", "cod", 
-                                  "tilapia", "lamb", "duck", "veal", "anchovy", "sardine"]
-        
-        dairy_keywords = ["milk", "cheese", "yogurt", "butter", "cream", "dairy"]
-        gluten_keywords = ["wheat", "bread", "pasta", "cereal", "flour", "bun", "cracker", "gluten", 
-                          "barley", "rye", "oats", "malt"]
-        
-        # Filter foods based on restrictions
-        filtered_foods = []
-        for food in available_foods:
-            skip = False
-            food_name_lower = food.name.lower()
-            food_group_lower = food.food_group.lower() if food.food_group else ""
-            
-            for restriction in restrictions_list:
-                # Vegetarian filtering
-                if restriction in ["vegetarian", "vegan"]:
-                    # Check food group
-                    if any(ng in food_group_lower for ng in non_vegetarian_groups):
-                        skip = True
-                        break
-                    # Check food name
-                    if any(kw in food_name_lower for kw in non_vegetarian_keywords):
-                        skip = True
-                        break
-                
-                # Additional vegan filtering (no dairy, eggs, honey)
-                if restriction == "vegan":
-                    if "egg" in food_name_lower or "honey" in food_name_lower:
-                        skip = True
-                        break
-                    if any(dk in food_name_lower for dk in dairy_keywords):
-                        skip = True
-                        break
-                
-                # Dairy-free filtering
-                if restriction == "dairy-free":
-                    if any(dk in food_name_lower for dk in dairy_keywords):
-                        skip = True
-                        break
-                
-                # Gluten-free filtering
-                if restriction == "gluten-free":
-                    if any(gk in food_name_lower for gk in gluten_keywords):
-                        skip = True
-                        break
-            
-            if not skip:
-                filtered_foods.append(food)
+        # Filter foods based on restrictions using the precomputed masks
+        allowed = catalog.allowed_mask(restrictions_list)
+        allowed_indices = np.flatnonzero(allowed)
         
-        print(f"After filtering for restrictions, {len(filtered_foods)} foods remain available")
+        print(f"After filtering for restrictions, {len(allowed_indices)} foods remain available")
         
         # Check if we have enough foods to generate a meal plan
-        if len(filtered_foods) < 5:
+        if len(allowed_indices) < 5:
             raise HTTPException(
                 status_code=400, 
-                detail=f"Not enough food options available with your dietary restrictions. Only {len(filtered_foods)} foods found."
+                detail=f"Not enough food options available with your dietary restrictions. Only {len(allowed_indices)} foods found."
             )
         
-        # Set default meal names and times based on number of meals
-        meal_templates = {
-            3: [
-                {"name": "Breakfast", "time": "08:00", "calorie_percent": 0.25},
-                {"name": "Lunch", "time": "13:00", "calorie_percent": 0.40},
-                {"name": "Dinner", "time": "19:00", "calorie_percent": 0.35},
-            ],
-            4: [
-                {"name": "Breakfast", "time": "08:00", "calorie_percent": 0.25},
-                {"name": "Morning Snack", "time": "11:00", "calorie_percent": 0.10},
-                {"name": "Lunch", "time": "13:00", "calorie_percent": 0.35},
-                {"name": "Dinner", "time": "19:00", "calorie_percent": 0.30},
-            ],
-            5: [
-                {"name": "Breakfast", "time": "07:30", "calorie_percent": 0.20},
-                {"name": "Morning Snack", "time": "10:30", "calorie_percent": 0.10},
-                {"name": "Lunch", "time": "13:00", "calorie_percent": 0.30},
-                {"name": "Afternoon Snack", "time": "16:00", "calorie_percent": 0.10},
-                {"name": "Dinner", "time": "19:00", "calorie_percent": 0.30},
-            ],
-            6: [
-                {"name": "Breakfast", "time": "07:00", "calorie_percent": 0.20},
-                {"name": "Morning Snack", "time": "10:00", "calorie_percent": 0.10},
-                {"name": "Lunch", "time": "13:00", "calorie_percent": 0.25},
-                {"name": "Afternoon Snack", "time": "16:00", "calorie_percent": 0.10},
-                {"name": "Dinner", "time": "19:00", "calorie_percent": 0.25},
-                {"name": "Evening Snack", "time": "21:30", "calorie_percent": 0.10},
-            ]
-        }
-        
         # Use 3 meals as default if invalid meal count
-        meal_count = preferences.meals if preferences.meals in meal_templates else 3
+        meal_count = preferences.meals if preferences.meals in MEAL_TEMPLATES else 3
         
         # Create the meal plan structure with EXACTLY the user's target macros
         meal_plan = {
@@ -850,237 +833,44 @@ def generate_meal_plan(
             "meals": []
         }
         
-        # Track the actual nutrition totals
-        actual_total = {
-            "calories": 0,
-            "protein": 0,
-            "carbs": 0,
-            "fat": 0
-        }
-        
-        # Function to score how well a food matches our remaining nutritional needs
-        def score_food_match(food, target_calories, target_protein, target_carbs, target_fat):
-            # Base quantity on calories
-            quantity = min(3.0, max(0.5, target_calories / max(food.calories, 1)))
-            
-            # Calculate the actual nutrition with this quantity
-            actual_cals = food.calories * quantity
-            actual_protein = food.protein * quantity
-            actual_carbs = food.carbs * quantity
-            actual_fat = food.fat * quantity
-            
-            # Calculate how well this food matches our targets (lower is better)
-            cal_score = abs(actual_cals - target_calories) / max(target_calories, 1)
-            protein_score = abs(actual_protein - target_protein) / max(target_protein, 1)  
-            carbs_score = abs(actual_carbs - target_carbs) / max(target_carbs, 1)
-            fat_score = abs(actual_fat - target_fat) / max(target_fat, 1)
-            
-            # Weight the scores - prioritize calories and protein
-            # Heavily penalize going over the calorie target
-            if actual_cals > target_calories * 1.1:  # 10% over target
-                cal_score *= 3  # Triple the penalty
-            
-            total_score = (cal_score * 0.4) + (protein_score * 0.3) + (carbs_score * 0.15) + (fat_score * 0.15)
-            return total_score, quantity
-        
-        # Number of iterations to try improving the meal plan
-        max_iterations = 3  # Increased from 2 for better optimization
-        
-        # Generate a meal plan iteratively, improving it each time
-        for iteration in range(max_iterations):
-            print(f"Meal plan generation iteration {iteration+1}/{max_iterations}")
-            
-            # Reset the meals and actual totals for each iteration
-            if iteration > 0:
-                meal_plan["meals"] = []
-                actual_total = {
-                    "calories": 0,
-                    "protein": 0,
-                    "carbs": 0,
-                    "fat": 0
-                }
-            
-            # Calculate targets for each meal
-            for meal_template in meal_templates[meal_count]:
-                meal_name = meal_template["name"]
-                meal_time = meal_template["time"]
-                calorie_percent = meal_template["calorie_percent"]
-                
-                # Calculate this meal's target based on the overall preferences
-                # For the first meal(s), just use the percentage
-                # For the last meal, adjust to exactly hit the remaining target
-                is_last_meal = meal_name == meal_templates[meal_count][-1]["name"]
-                
-                if is_last_meal:
-                    # For the last meal, use the remaining nutrition needed to hit the target
-                    meal_calories = max(0, preferences.calories - actual_total["calories"])
-                    meal_protein = max(0, preferences.protein - actual_total["protein"])
-                    meal_carbs = max(0, preferences.carbs - actual_total["carbs"])
-                    meal_fat = max(0, preferences.fat - actual_total["fat"])
-                else:
-                    # For earlier meals, use the specified percentage
-                    meal_calories = preferences.calories * calorie_percent
-                    meal_protein = preferences.protein * calorie_percent
-                    meal_carbs = preferences.carbs * calorie_percent
-                    meal_fat = preferences.fat * calorie_percent
-                
-                print(f"Generating {meal_name} with targets: {meal_calories:.1f} cal, {meal_protein:.1f}g protein, "
-                      f"{meal_carbs:.1f}g carbs, {meal_fat:.1f}g fat")
-            
-                meal = {
-                    "name": meal_name,
-                    "time": meal_time,
-                    "foods": []
-                }
-                
-                # Determine how many food items to include in this meal
-                food_count = 2  # Default
-                if "snack" in meal_name.lower():
-                    food_count = random.randint(1, 2)
-                elif "breakfast" in meal_name.lower():
-                    food_count = random.randint(2, 3)
-                elif "lunch" in meal_name.lower() or "dinner" in meal_name.lower():
-                    food_count = random.randint(2, 4)
-                
-                # Check if this is the last meal and we're already over calorie budget
-                if is_last_meal and actual_total["calories"] >= preferences.calories * 0.95:
-                    # We're already at or above target calories, so reduce the number of foods
-                    food_count = max(1, food_count - 2)
-                    print(f"Reducing food count for {meal_name} to {food_count} to avoid exceeding calorie target")
-                
-                # Track nutrition for this meal
-                meal_total = {
-                    "calories": 0,
-                    "protein": 0,
-                    "carbs": 0,
-                    "fat": 0
-                }
-                
-                # Randomly select a diverse set of foods for this meal
-                remaining_foods = filtered_foods.copy()  # Copy to avoid modifying original
-                
-                # Check if we're approaching calorie limit
-                exceeding_calories = actual_total["calories"] >= preferences.calories * 0.9
-                
-                for i in range(food_count):
-                    # Stop adding foods if we're already over calorie target
-                    if actual_total["calories"] >= preferences.calories:
-                        print(f"Stopping food addition for {meal_name} - already reached calorie target")
-                        break
-                        
-                    # Calculate what's still needed for this meal
-                    remaining_calories = meal_calories - meal_total["calories"]
-                    remaining_protein = meal_protein - meal_total["protein"]
-                    remaining_carbs = meal_carbs - meal_total["carbs"]
-                    remaining_fat = meal_fat - meal_total["fat"]
-                    
-                    # Adjust calorie target down further if we're close to daily target
-                    if exceeding_calories:
-                        remaining_calories = min(remaining_calories, preferences.calories - actual_total["calories"])
-                        
-                    # Adjust targets based on number of foods left to add
-                    foods_left = food_count - i
-                    target_calories = remaining_calories / foods_left
-                    target_protein = remaining_protein / foods_left
-                    target_carbs = remaining_carbs / foods_left
-                    target_fat = remaining_fat / foods_left
-                    
-                    # Find the best matching food
-                    best_score = float('inf')
-                    best_food = None
-                    best_quantity = 1.0
-                    
-                    # Try to find a good food match
-                    for food in remaining_foods:
-                        # Skip high-calorie foods when we're close to our target
-                        if exceeding_calories and food.calories > target_calories * 1.5:
-                            continue
-                            
-                        score, quantity = score_food_match(food, target_calories, target_protein, target_carbs, target_fat)
-                        if score < best_score:
-                            best_score = score
-                            best_food = food
-                            best_quantity = quantity
-                    
-                    # If we couldn't find a good match, use any available food
-                    if best_food is None and filtered_foods:
-                        # Pick lower calorie options if we're close to target
-                        if exceeding_calories:
-                            # Sort by calories and pick from the lowest third
-                            sorted_foods = sorted(filtered_foods, key=lambda f: f.calories)
-                            best_food = sorted_foods[min(len(sorted_foods) // 3, random.randint(0, len(sorted_foods) - 1))]
-                        else:
-                            best_food = random.choice(filtered_foods)
-                        
-                        best_quantity = min(3.0, max(0.5, target_calories / max(best_food.calories, 1)))
-                    
-                    # Add the selected food to the meal
-                    if best_food:
-                        # Remove from available foods to avoid duplicates in the same meal
-                        if best_food in remaining_foods:
-                            remaining_foods.remove(best_food)
-                        
-                        # For the last food in the meal, try to exactly hit the remaining targets
-                        if i == food_count - 1:
-                            # Fine-tune the quantity to better hit the target
-                            # but keep it within reasonable bounds
-                            best_quantity = min(3.0, max(0.5, remaining_calories / max(best_food.calories, 1)))
-                        
-                        # Additional check to avoid going way over daily calories
-                        estimated_calories = best_food.calories * best_quantity
-                        if actual_total["calories"] + estimated_calories > preferences.calories * 1.1:
-                            # Reduce quantity to stay within calorie target
-                            max_allowed_calories = max(0, preferences.calories - actual_total["calories"])
-                            best_quantity = min(best_quantity, max_allowed_calories / max(best_food.calories, 1))
-                            best_quantity = max(0.5, best_quantity)  # Don't go below 0.5 serving
-                                
-                        # Round the quantity to a reasonable number
-                        best_quantity = round(best_quantity * 2) / 2  # Round to nearest 0.5
-                        
-                        # Calculate the food's actual nutrition
-                        food_calories = round(best_food.calories * best_quantity, 1)
-                        food_protein = round(best_food.protein * best_quantity, 1)
-                        food_carbs = round(best_food.carbs * best_quantity, 1)
-                        food_fat = round(best_food.fat * best_quantity, 1)
-                        
-                        # Add to meal totals
-                        meal_total["calories"] += food_calories
-                        meal_total["protein"] += food_protein
-                        meal_total["carbs"] += food_carbs
-                        meal_total["fat"] += food_fat
-                        
-                        # Add to overall totals
-                        actual_total["calories"] += food_calories
-                        actual_total["protein"] += food_protein
-                        actual_total["carbs"] += food_carbs
-                        actual_total["fat"] += food_fat
-                        
-                        # Add food to the meal
-                        meal["foods"].append({
-                            "name": best_food.name,
-                            "calories": food_calories,
-                            "protein": food_protein,
-                            "carbs": food_carbs,
-                            "fat": food_fat,
-                            "serving_size": best_food.serving_size,
-                            "quantity": best_quantity
-                        })
-                
-                meal_plan["meals"].append(meal)
-                print(f"Added {meal_name} with {len(meal['foods'])} foods: {meal_total['calories']:.1f} cal, "
-                      f"{meal_total['protein']:.1f}g protein, {meal_total['carbs']:.1f}g carbs, {meal_total['fat']:.1f}g fat")
-                      
-                # Check if we've already hit our calorie target
-                if actual_total["calories"] >= preferences.calories:
-                    print(f"Reached calorie target after adding {meal_name}. Stopping meal generation.")
-                    break
+        # Users with the same targets share cached plans; a stable per-user variant
+        # keeps them from all getting the same one
+        variant = plan_variant(current_user.id, settings.MEAL_PLAN_CACHE_VARIANTS)
+        cache_key = meal_plan_key(
+            preferences.calories, preferences.protein, preferences.carbs, preferences.fat, meal_count,
+            [r for r in restrictions_list if r in SUPPORTED_RESTRICTIONS], preferences.optimizer,
+            preferences.seed, variant, meal_plan["date"], catalog.version
+        )
+        if fresh:
+            meal_plan_cache.record_bypass()
+        else:
+            cached_plan = meal_plan_cache.get(cache_key)
+            if cached_plan is not None:
+                meal_plan["meals"], meal_plan["totalNutrition"], meal_plan["optimizer"] = cached_plan
+                meal_plan["cached"] = True
+                print(f"Serving cached meal plan (variant {variant}, catalog version {catalog.version})")
+                return meal_plan
+        
+        plan = None
+        if preferences.optimizer == "lp":
+            # Same variant, targets and day give the same plan unless a seed is passed
+            seed = preferences.seed if preferences.seed is not None else variant * 1000003 + datetime.now().date().toordinal()
+            started = time.perf_counter()
+            plan = build_optimized_meal_plan(
+                catalog, allowed, preferences, meal_count, seed, settings.MEAL_PLAN_TIME_BUDGET_SECONDS
+            )
+            print(f"Meal plan optimizer {'finished' if plan else 'gave up'} in {time.perf_counter() - started:.3f}s (seed {seed})")
         
-        # Round values in the actual total
-        for key in actual_total:
-            actual_total[key] = round(actual_total[key])
+        if plan is None:
+            plan = build_greedy_meal_plan(catalog, allowed, preferences, meal_count)
+            meal_plan["optimizer"] = "greedy"
+        else:
+            meal_plan["optimizer"] = "lp"
+        meal_plan["meals"], actual_total = plan
         
         # Set the actual nutrition totals in the meal plan
         meal_plan["totalNutrition"] = actual_total
+        meal_plan_cache.put(cache_key, meal_plan["meals"], actual_total, meal_plan["optimizer"])
         
         # Log the results
         print(f"Final meal plan: {len(meal_plan['meals'])} meals with totals: {actual_total}")
@@ -1092,92 +882,146 @@ def generate_meal_plan(
         
         return meal_plan
                 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error generating meal plan: {str(e)}")
         import traceback
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error generating meal plan: {str(e)}")
 
-def generate_nutrition_response_with_huggingface(prompt: str) -> str:
+async def generate_nutrition_response_with_huggingface(prompt: str, model: str = AI_MODEL) -> str:
     """
     Generate nutrition advice using Hugging Face's API with the specified model.
+
+    Goes through the shared inference client, so the call doesn't block the event
+    loop; raises InferenceError when it fails and InferenceUnavailable while the
+    circuit breaker is open.
     """
-    if not HUGGINGFACE_API_TOKEN:
-        print("ERROR: Hugging Face API token not configured")
-        raise HTTPException(status_code=500, detail="Hugging Face API token not configured")
+    print(f"Calling Hugging Face API for model: {model}")
+    result = await inference_client.generate(prompt, model)
+    print(f"Received response from Hugging Face API ({len(result)} characters)")
+    return result
+
+def build_chat_context(db: Session, user: User) -> str:
+    """
+    The profile and fitness data the nutrition chat answers from, in one query.
+
+    The week's meal totals, the nutrition goal and the counts are scalar subqueries;
+    program categories and the latest workout names are joined into strings by the
+    database (instead of one query per recent meal for its foods).
+    """
+    week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    quantity = func.coalesce(NutritionFood.quantity, 1)
+
+    def meal_total(field):
+        return db.query(func.sum(field * quantity)).join(
+            NutritionMeal, NutritionFood.meal_id == NutritionMeal.id
+        ).filter(
+            NutritionMeal.user_id == user.id,
+            NutritionMeal.date >= week_ago
+        ).scalar_subquery()
+
+    def goal(field):
+        return db.query(field).filter(NutritionGoal.user_id == user.id).scalar_subquery()
+
+    recent_workouts = (
+        Workout.user_id == user.id,
+        Workout.is_template == False,
+        *date_range_filters(Workout.date, recent_activity_cutoff(7).date())
+    )
+    latest_workouts = db.query(Workout.name).filter(
+        *recent_workouts, Workout.name != ""
+    ).order_by(desc(Workout.date)).limit(5).subquery()
+    categories = db.query(SavedWorkoutProgram.category).filter(
+        SavedWorkoutProgram.user_id == user.id,
+        SavedWorkoutProgram.category != ""
+    ).order_by(SavedWorkoutProgram.id).subquery()
+
+    row = db.query(
+        goal(NutritionGoal.calories), goal(NutritionGoal.protein),
+        goal(NutritionGoal.carbs), goal(NutritionGoal.fat),
+        *(meal_total(getattr(NutritionFood, field)) for field in MACRO_FIELDS),
+        db.query(func.count(NutritionMeal.id)).filter(
+            NutritionMeal.user_id == user.id,
+            NutritionMeal.date >= week_ago
+        ).scalar_subquery(),
+        db.query(func.count(SavedWorkoutProgram.id)).filter(
+            SavedWorkoutProgram.user_id == user.id
+        ).scalar_subquery(),
+        db.query(func.aggregate_strings(categories.c.category, ", ")).scalar_subquery(),
+        db.query(func.count(Workout.id)).filter(*recent_workouts).scalar_subquery(),
+        db.query(func.aggregate_strings(latest_workouts.c.name, ", ")).scalar_subquery()
+    ).one()
+    (goal_calories, goal_protein, goal_carbs, goal_fat, total_cals, total_protein, total_carbs, total_fat,
+     meal_count, program_count, program_types, workout_count, workout_names) = row
+
+    context = "User profile and fitness data:\n"
     
-    api_url = f"https://api-inference.huggingface.co/models/{AI_MODEL}"
+    # Add nutrition goals if available
+    if goal_calories is not None:
+        context += f"Nutrition goals: {goal_calories} calories, {goal_protein}g protein, "
+        context += f"{goal_carbs}g carbs, {goal_fat}g fat\n"
+    else:
+        context += "No nutrition goals set\n"
     
-    headers = {
-        "Authorization": f"Bearer {HUGGINGFACE_API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    # Add recent meal summary
+    if meal_count:
+        avg_cals = (total_cals or 0) / meal_count
+        avg_protein = (total_protein or 0) / meal_count
+        avg_carbs = (total_carbs or 0) / meal_count
+        avg_fat = (total_fat or 0) / meal_count
+        
+        context += f"Average daily nutrition (past week): {avg_cals:.0f} calories, "
+        context += f"{avg_protein:.0f}g protein, {avg_carbs:.0f}g carbs, {avg_fat:.0f}g fat\n"
+    else:
+        context += "No recent meal data\n"
     
-    payload = {
-        "inputs": prompt,
-        "parameters": {
-            "max_new_tokens": 1024,
-            "temperature": 0.7,
-            "top_p": 0.9,
-            "do_sample": True
-        }
-    }
+    # Add workout program info
+    if program_count:
+        context += f"Active workout programs: {program_types or ''}\n"
+    else:
+        context += "No active workout programs\n"
     
-    try:
-        print(f"Calling Hugging Face API for model: {AI_MODEL}")
-        response = requests.post(api_url, headers=headers, json=payload, timeout=30)
-        
-        # Check for specific error conditions
-        if response.status_code == 401:
-            print("ERROR: Unauthorized request to Hugging Face API. Check your API token.")
-            raise HTTPException(status_code=500, detail="Authentication error with Hugging Face API")
-        
-        if response.status_code == 503:
-            print("ERROR: Hugging Face model is currently loading or unavailable")
-            # This is often a temporary condition when the model is warming up
-            raise HTTPException(status_code=500, detail="Model is loading or unavailable. Please try again in a few moments.")
-            
-        # Force the response to raise an HTTPError for bad status codes
-        response.raise_for_status()
-        
-        # Parse response based on the format returned by the model
-        result = response.json()
-        print(f"Received response from Hugging Face API: {result}")
-        
-        if isinstance(result, list) and len(result) > 0:
-            if "generated_text" in result[0]:
-                return result[0]["generated_text"]
-            elif "error" in result[0]:
-                print(f"ERROR: API error from Hugging Face: {result[0]['error']}")
-                raise HTTPException(status_code=500, detail=f"Error from Hugging Face API: {result[0]['error']}")
-            else:
-                return str(result[0])
-        elif isinstance(result, dict):
-            if "generated_text" in result:
-                return result["generated_text"]
-            elif "error" in result:
-                print(f"ERROR: API error from Hugging Face: {result['error']}")
-                raise HTTPException(status_code=500, detail=f"Error from Hugging Face API: {result['error']}")
-            else:
-                return str(result)
-        else:
-            return str(result)
-            
-    except requests.exceptions.Timeout:
-        print("ERROR: Timeout when calling Hugging Face API")
-        raise HTTPException(status_code=500, detail="Request to Hugging Face API timed out. The model may be under heavy load.")
-        
-    except requests.exceptions.ConnectionError:
-        print("ERROR: Connection error when calling Hugging Face API")
-        raise HTTPException(status_code=500, detail="Connection error when calling Hugging Face API. Please check your internet connection.")
-        
-    except requests.exceptions.RequestException as e:
-        print(f"ERROR: Exception when calling Hugging Face API: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error calling Hugging Face API: {str(e)}")
-        
-    except Exception as e:
-        print(f"ERROR: Unexpected exception: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    # Add recent workout info
+    if workout_count:
+        context += f"Recent workouts: {workout_names or ''}\n"
+        context += f"Workout frequency: {workout_count} workouts in the past week\n"
+    else:
+        context += "No recent workouts\n"
+    
+    # Add user profile info if available
+    if user.height or user.weight:
+        profile_info = "User profile: "
+        if user.height:
+            profile_info += f"Height: {user.height}cm, "
+        if user.weight:
+            profile_info += f"Weight: {user.weight}kg, "
+        if user.gender:
+            profile_info += f"Gender: {user.gender}, "
+        if user.age:
+            profile_info += f"Age: {user.age}, "
+        
+        context += profile_info.rstrip(", ") + "\n"
+    return context
+
+def get_chat_context(db: Session, user: User) -> str:
+    """The user's chat context from the per-user cache, built and cached on a miss"""
+    context = chat_context_cache.get(user.id)
+    if context is None:
+        context = build_chat_context(db, user)
+        chat_context_cache.put(user.id, context)
+    return context
+
+def build_chat_prompt(context: str, question: str) -> str:
+    return f"""You are a professional nutrition coach and dietitian. Answer the user's nutrition question based on their profile and fitness data.
+
+{context}
+
+User question: {question}
+
+Provide a helpful, accurate and personalized response based on the user's data and scientific nutritional principles. If the user is asking about specific meal plans, consider their workout goals and current nutrition.
+"""
 
 @router.post("/chat", response_model=NutritionChatResponse)
 async def nutrition_chat(
@@ -1192,116 +1036,12 @@ async def nutrition_chat(
         print(f"\n==== NUTRITION CHAT REQUEST ====")
         print(f"User {current_user.id} ({current_user.username}) asked: {request.question}")
         
-        # Gather context about the user's workouts and nutrition
-        
-        # 1. Get recent meals and nutrition stats
-        today = datetime.now().strftime("%Y-%m-%d")
-        week_ago = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-        
-        recent_meals = db.query(NutritionMeal).filter(
-            NutritionMeal.user_id == current_user.id,
-            NutritionMeal.date >= week_ago
-        ).all()
-        
-        nutrition_goal = db.query(NutritionGoal).filter(
-            NutritionGoal.user_id == current_user.id
-        ).first()
-        
-        # 2. Get active workout programs
-        active_programs = db.query(SavedWorkoutProgram).filter(
-            SavedWorkoutProgram.user_id == current_user.id
-        ).all()
-        
-        # 3. Get recent workouts
-        recent_workouts = db.query(Workout).filter(
-            Workout.user_id == current_user.id,
-            Workout.is_template == False,
-            func.cast(Workout.date, String) >= week_ago
-        ).all()
-        
-        # Build context for the AI
-        context = "User profile and fitness data:\n"
-        
-        # Add nutrition goals if available
-        if nutrition_goal:
-            context += f"Nutrition goals: {nutrition_goal.calories} calories, {nutrition_goal.protein}g protein, "
-            context += f"{nutrition_goal.carbs}g carbs, {nutrition_goal.fat}g fat\n"
-        else:
-            context += "No nutrition goals set\n"
-        
-        # Add recent meal summary
-        if recent_meals:
-            total_cals = 0
-            total_protein = 0
-            total_carbs = 0
-            total_fat = 0
-            meal_count = 0
-            
-            for meal in recent_meals:
-                foods = db.query(NutritionFood).filter(NutritionFood.meal_id == meal.id).all()
-                for food in foods:
-                    total_cals += food.calories * (food.quantity or 1)
-                    total_protein += food.protein * (food.quantity or 1)
-                    total_carbs += food.carbs * (food.quantity or 1)
-                    total_fat += food.fat * (food.quantity or 1)
-                meal_count += 1
-            
-            if meal_count > 0:
-                avg_cals = total_cals / meal_count
-                avg_protein = total_protein / meal_count
-                avg_carbs = total_carbs / meal_count
-                avg_fat = total_fat / meal_count
-                
-                context += f"Average daily nutrition (past week): {avg_cals:.0f} calories, "
-                context += f"{avg_protein:.0f}g protein, {avg_carbs:.0f}g carbs, {avg_fat:.0f}g fat\n"
-        else:
-            context += "No recent meal data\n"
-        
-        # Add workout program info
-        program_types = []
-        if active_programs:
-            for program in active_programs:
-                if program.category:
-                    program_types.append(program.category)
-            
-            context += f"Active workout programs: {', '.join(program_types)}\n"
-        else:
-            context += "No active workout programs\n"
-        
-        # Add recent workout info
-        if recent_workouts:
-            workout_names = [w.name for w in recent_workouts if w.name]
-            context += f"Recent workouts: {', '.join(workout_names[:5])}\n"
-            context += f"Workout frequency: {len(recent_workouts)} workouts in the past week\n"
-        else:
-            context += "No recent workouts\n"
-        
-        # Add user profile info if available
-        if current_user.height or current_user.weight:
-            profile_info = "User profile: "
-            if current_user.height:
-                profile_info += f"Height: {current_user.height}cm, "
-            if current_user.weight:
-                profile_info += f"Weight: {current_user.weight}kg, "
-            if current_user.gender:
-                profile_info += f"Gender: {current_user.gender}, "
-            if current_user.age:
-                profile_info += f"Age: {current_user.age}, "
-            
-            context += profile_info.rstrip(", ") + "\n"
-        
-        # Format the complete prompt
-        prompt = f"""You are a professional nutrition coach and dietitian. Answer the user's nutrition question based on their profile and fitness data.
-
-{context}
-
-User question: {request.question}
-
-Provide a helpful, accurate and personalized response based on the user's data and scientific nutritional principles. If the user is asking about specific meal plans, consider their workout goals and current nutrition.
-"""
+        # Context about the user's workouts and nutrition, reused for a few minutes
+        context = get_chat_context(db, current_user)
+        prompt = build_chat_prompt(context, request.question)
         
         print("Generating nutrition advice with AI...")
-        response_text = generate_nutrition_response_with_huggingface(prompt)
+        response_text = await generate_nutrition_response_with_huggingface(prompt)
         
         # Clean up the response if needed
         if "User question:" in response_text:
@@ -1313,8 +1053,76 @@ Provide a helpful, accurate and personalized response based on the user's data a
         
         return {"answer": response_text}
         
+    except InferenceUnavailable:
+        raise
     except Exception as e:
         print(f"Error in nutrition chat: {str(e)}")
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error generating nutrition advice: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error generating nutrition advice: {str(e)}") 
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    """One Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@router.post("/chat/stream")
+async def nutrition_chat_stream(
+    request: NutritionChatRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Like /chat, but the answer is streamed as Server-Sent Events while it is generated.
+
+    Each `data: {"token": ...}` event carries the next piece of the answer; a final
+    `done` event carries the whole answer. Failures before the first token are
+    returned as regular error responses, later ones as an `error` event.
+    """
+    print(f"\n==== NUTRITION CHAT STREAM REQUEST ====")
+    print(f"User {current_user.id} ({current_user.username}) asked: {request.question}")
+    try:
+        context = get_chat_context(db, current_user)
+    except Exception as e:
+        print(f"Error in nutrition chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating nutrition advice: {str(e)}")
+    prompt = build_chat_prompt(context, request.question)
+    user_id = current_user.id
+
+    # Wait for the first token before answering, so errors up to that point still
+    # get a proper status code
+    tokens = inference_client.stream(prompt, AI_MODEL)
+    try:
+        first_token = await tokens.__anext__()
+    except StopAsyncIteration:
+        first_token = ""
+    except InferenceError:
+        raise
+    except Exception as e:
+        print(f"Error in nutrition chat: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating nutrition advice: {str(e)}")
+
+    async def events():
+        answer = [first_token]
+        try:
+            if first_token:
+                yield sse_event({"token": first_token})
+            async for token in tokens:
+                answer.append(token)
+                yield sse_event({"token": token})
+        except InferenceError as e:
+            print(f"Error in nutrition chat stream: {e.detail}")
+            yield sse_event({"detail": e.detail}, event="error")
+            return
+        finally:
+            await tokens.aclose()
+        answer = "".join(answer).strip()
+        print(f"AI response streamed to user {user_id}. Length: {len(answer)}")
+        yield sse_event({"answer": answer}, event="done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep nginx from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
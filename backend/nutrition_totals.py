@@ -0,0 +1,145 @@
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import User, NutritionMeal, NutritionFood, NutritionDailyTotals
+
+# Number of users aggregated per round of queries during a full rebuild
+REBUILD_BATCH_SIZE = 500
+
+MACROS = ("calories", "protein", "carbs", "fat")
+
+
+def _aggregate_meals(db: Session, *criteria) -> Dict[tuple, dict]:
+    """
+    Sum the macros of the meals matching the criteria per (user_id, date) in one query.
+
+    Days that have meals without any foods are included with zero totals.
+    """
+    quantity = func.coalesce(NutritionFood.quantity, 1.0)
+    rows = db.query(
+        NutritionMeal.user_id,
+        NutritionMeal.date,
+        func.sum(func.coalesce(NutritionFood.calories, 0) * quantity),
+        func.sum(func.coalesce(NutritionFood.protein, 0) * quantity),
+        func.sum(func.coalesce(NutritionFood.carbs, 0) * quantity),
+        func.sum(func.coalesce(NutritionFood.fat, 0) * quantity),
+        func.count(func.distinct(NutritionMeal.id))
+    ).outerjoin(
+        NutritionFood, NutritionFood.meal_id == NutritionMeal.id
+    ).filter(
+        *criteria
+    ).group_by(NutritionMeal.user_id, NutritionMeal.date).all()
+
+    totals = {}
+    for user_id, date, calories, protein, carbs, fat, meal_count in rows:
+        totals[(user_id, date)] = {
+            "date": date,
+            "calories": float(calories or 0),
+            "protein": float(protein or 0),
+            "carbs": float(carbs or 0),
+            "fat": float(fat or 0),
+            "meal_count": meal_count,
+        }
+    return totals
+
+
+def _write_totals(row: NutritionDailyTotals, totals: dict):
+    for macro in MACROS:
+        setattr(row, macro, totals[macro])
+    row.meal_count = totals["meal_count"]
+    row.updated_at = datetime.now(timezone.utc)
+
+
+def get_daily_totals(db: Session, user_id: int, start_date: str, end_date: str) -> List[dict]:
+    """
+    Per-day macro totals of a user's meals between two YYYY-MM-DD dates (inclusive), oldest first.
+
+    Reads the nutrition_daily_totals rollup when it is enabled, otherwise runs one
+    grouped query over meals and their foods.
+    """
+    if settings.NUTRITION_DAILY_ROLLUP:
+        rows = db.query(NutritionDailyTotals).filter(
+            NutritionDailyTotals.user_id == user_id,
+            NutritionDailyTotals.date >= start_date,
+            NutritionDailyTotals.date <= end_date
+        ).order_by(NutritionDailyTotals.date).all()
+        return [
+            {"date": row.date, "calories": row.calories, "protein": row.protein,
+             "carbs": row.carbs, "fat": row.fat, "meal_count": row.meal_count}
+            for row in rows
+        ]
+
+    totals = _aggregate_meals(
+        db,
+        NutritionMeal.user_id == user_id,
+        NutritionMeal.date >= start_date,
+        NutritionMeal.date <= end_date
+    )
+    return sorted(totals.values(), key=lambda day: day["date"])
+
+
+def refresh_daily_totals(db: Session, user_id: int, dates: Iterable[str]):
+    """
+    Recompute the rollup rows of the given days from their meals (flushes, does not commit).
+
+    Call it after adding or deleting meals, inside the same transaction, so the rollup
+    commits or rolls back together with the meal change. Only the touched days are
+    aggregated, which keeps this to a couple of small indexed queries.
+    """
+    if not settings.NUTRITION_DAILY_ROLLUP:
+        return
+    # Same canonical form the DATE column reads back as, e.g. '2025-3-1' -> '2025-03-01'
+    dates = sorted({datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d") for date in dates})
+    if not dates:
+        return
+    db.flush()
+    totals = _aggregate_meals(db, NutritionMeal.user_id == user_id, NutritionMeal.date.in_(dates))
+    existing = {
+        row.date: row
+        for row in db.query(NutritionDailyTotals).filter(
+            NutritionDailyTotals.user_id == user_id,
+            NutritionDailyTotals.date.in_(dates)
+        ).with_for_update().all()
+    }
+
+    for date in dates:
+        day = totals.get((user_id, date))
+        row = existing.get(date)
+        if day is None:
+            # No meals left on this day
+            if row is not None:
+                db.delete(row)
+            continue
+        if row is None:
+            row = NutritionDailyTotals(user_id=user_id, date=date)
+            db.add(row)
+        _write_totals(row, day)
+    db.flush()
+
+
+def rebuild_all_daily_totals(db: Session, user_id: Optional[int] = None, batch_size: int = REBUILD_BATCH_SIZE) -> dict:
+    """Rebuild the rollup of every user (or one user) from their meals, in batches of users"""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = [uid for (uid,) in db.query(User.id).order_by(User.id).all()]
+    rows_written = 0
+
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        totals = _aggregate_meals(db, NutritionMeal.user_id.in_(batch))
+        db.query(NutritionDailyTotals).filter(
+            NutritionDailyTotals.user_id.in_(batch)
+        ).delete(synchronize_session=False)
+        for (uid, date), day in totals.items():
+            row = NutritionDailyTotals(user_id=uid, date=date)
+            _write_totals(row, day)
+            db.add(row)
+        rows_written += len(totals)
+        db.commit()
+
+    return {"users": len(user_ids), "days": rows_written}
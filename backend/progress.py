@@ -0,0 +1,255 @@
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import func, or_, and_, case, cast, Float
+from sqlalchemy.orm import Session
+
+from models import Workout, Exercise, Set
+
+# Lifts tracked on the progress screen when the client doesn't ask for others
+DEFAULT_MAIN_LIFTS = ['Bench Press', 'Squat', 'Deadlift']
+
+# Rows fetched per round trip when streaming large result sets from the database
+STREAM_BATCH_SIZE = 500
+
+# Response header carrying the keyset cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def lift_key(lift: str) -> str:
+    """Convert a lift name to the camelCase key the frontend expects ('Bench Press' -> 'benchPress')"""
+    words = lift.split()
+    if not words:
+        return lift
+    return words[0].lower() + "".join(word.capitalize() for word in words[1:])
+
+
+def parse_lifts(lifts: Optional[str]) -> List[str]:
+    """Parse a comma separated lift list, falling back to the default main lifts"""
+    if not lifts:
+        return list(DEFAULT_MAIN_LIFTS)
+    parsed = [lift.strip() for lift in lifts.split(",") if lift.strip()]
+    return parsed or list(DEFAULT_MAIN_LIFTS)
+
+
+def date_range_filters(column, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Build index-friendly range predicates for a DateTime column (both bounds inclusive by day)"""
+    filters = []
+    if date_from:
+        filters.append(column >= datetime.combine(date_from, time.min))
+    if date_to:
+        filters.append(column < datetime.combine(date_to + timedelta(days=1), time.min))
+    return filters
+
+
+def get_strength_progress_data(
+    db: Session,
+    user_id: int,
+    lifts: Optional[List[str]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    forward_fill: bool = True
+) -> List[dict]:
+    """
+    Compute the per-workout max weight for each tracked lift with a single grouped query.
+
+    For every workout the first exercise (lowest id) whose name contains the lift is used,
+    and its heaviest set becomes the value for that lift. Workouts without any tracked lift
+    are skipped. With forward_fill, lifts missing from a workout carry the most recent
+    earlier value (0 if there is none), including values recorded before date_from.
+    """
+    lifts = lifts or list(DEFAULT_MAIN_LIFTS)
+    lift_keys = [(lift, lift_key(lift), lift.lower()) for lift in lifts]
+
+    # One row per (workout, matching exercise) with the exercise's heaviest set.
+    # Sets are outer joined so an exercise without weighted sets still "claims" the lift,
+    # exactly like looking up the first matching exercise and then its sets.
+    rows = db.query(
+        Workout.id,
+        Workout.date,
+        Exercise.id,
+        Exercise.name,
+        func.max(Set.weight)
+    ).join(
+        Exercise, Exercise.workout_id == Workout.id
+    ).outerjoin(
+        Set, and_(Set.exercise_id == Exercise.id, Set.weight.isnot(None))
+    ).filter(
+        Workout.user_id == user_id,
+        Workout.is_template == False,  # Exclude templates
+        or_(*[Exercise.name.ilike(f"%{lift}%") for lift in lifts]),
+        *date_range_filters(Workout.date, None, date_to)
+    ).group_by(
+        Workout.id, Workout.date, Exercise.id, Exercise.name
+    ).order_by(
+        Workout.date, Workout.id, Exercise.id
+    ).all()
+
+    window_start = datetime.combine(date_from, time.min) if date_from else None
+
+    strength_data = []
+    last_values = {}
+    current_workout_id = None
+    current_date = None
+    claimed = {}
+
+    def flush_workout():
+        # Only add to results if at least one lift was recorded
+        recorded = {key: weight for key, weight in claimed.items() if weight is not None}
+        if not recorded:
+            return
+        # Recorded lifts first, then the filled-in ones, to keep the key order stable
+        entry = {'date': current_date.isoformat() if current_date else None}
+        for _, key, _ in lift_keys:
+            if key in recorded:
+                entry[key] = recorded[key]
+        if forward_fill:
+            for _, key, _ in lift_keys:
+                if key not in recorded:
+                    entry[key] = last_values.get(key, 0)
+        last_values.update(recorded)
+        if window_start is None or (current_date is not None and current_date >= window_start):
+            strength_data.append(entry)
+
+    for workout_id, workout_date, _, exercise_name, max_weight in rows:
+        if workout_id != current_workout_id:
+            if current_workout_id is not None:
+                flush_workout()
+            current_workout_id = workout_id
+            current_date = workout_date
+            claimed = {}
+
+        name_lower = (exercise_name or "").lower()
+        for _, key, lift_lower in lift_keys:
+            # Rows come ordered by exercise id, so the first match per lift wins
+            if key not in claimed and lift_lower in name_lower:
+                claimed[key] = max_weight
+
+    if current_workout_id is not None:
+        flush_workout()
+
+    return strength_data
+
+
+def encode_cursor(values: list) -> str:
+    """Encode keyset values (datetimes are stored as ISO strings) into an opaque cursor"""
+    serializable = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(serializable).encode()).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by encode_cursor; the first value is always a datetime"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("unexpected cursor length")
+        values[0] = datetime.fromisoformat(values[0])
+        return values
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+
+
+def keyset_after(columns: list, values: list, descending: bool = False):
+    """
+    Build a 'row comparison greater than' predicate that works on every backend.
+
+    With descending the comparison is flipped, for pages ordered newest first.
+    """
+    column, value = columns[0], values[0]
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return or_(beyond, and_(column == value, keyset_after(columns[1:], values[1:], descending)))
+
+
+def set_next_cursor(response, next_cursor: Optional[str]):
+    """Expose the next page cursor to the client through a response header"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        response.headers["Access-Control-Expose-Headers"] = NEXT_CURSOR_HEADER
+
+
+def get_cardio_progress_data(
+    db: Session,
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    exercise: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Return one entry per cardio set with a duration or distance, oldest workout first.
+
+    Everything, including the pace in minutes per km, is computed by one joined query
+    whose rows are streamed from the database. When a limit is given the result is
+    keyset paginated on (workout date, workout id, exercise id, set id) and the cursor
+    of the next page is returned alongside the entries; workouts without a date can't
+    be placed on that timeline and are left out of paginated results.
+    """
+    duration = func.coalesce(Set.duration, 0)
+    distance = func.coalesce(Set.distance, 0)
+    # Pace in minutes per km
+    pace = case(
+        (and_(duration != 0, distance > 0),
+         (cast(duration, Float) / 60.0) / (cast(distance, Float) / 1000.0)),
+        else_=0
+    )
+
+    query = db.query(
+        Workout.date,
+        Workout.id,
+        Exercise.id,
+        Set.id,
+        Exercise.name,
+        duration,
+        distance,
+        func.coalesce(Set.intensity, 'Medium'),
+        pace
+    ).join(
+        Exercise, Exercise.workout_id == Workout.id
+    ).join(
+        Set, Set.exercise_id == Exercise.id
+    ).filter(
+        Workout.user_id == user_id,
+        Workout.is_template == False,  # Exclude templates
+        Exercise.is_cardio == True,
+        or_(duration != 0, distance != 0),
+        *date_range_filters(Workout.date, date_from, date_to)
+    )
+
+    if exercise:
+        query = query.filter(func.lower(Exercise.name) == exercise.strip().lower())
+
+    keyset_columns = [Workout.date, Workout.id, Exercise.id, Set.id]
+    if limit is not None:
+        query = query.filter(Workout.date.isnot(None))
+        if cursor:
+            query = query.filter(keyset_after(keyset_columns, decode_cursor(cursor, len(keyset_columns))))
+    query = query.order_by(*keyset_columns)
+    if limit is not None:
+        # Fetch one extra row to know whether another page exists
+        query = query.limit(limit + 1)
+
+    rows = query.yield_per(STREAM_BATCH_SIZE)
+
+    cardio_data = []
+    next_cursor = None
+    for workout_date, workout_id, exercise_id, set_id, name, set_duration, set_distance, intensity, set_pace in rows:
+        if limit is not None and len(cardio_data) == limit:
+            next_cursor = encode_cursor(last_key)
+            break
+        cardio_data.append({
+            'date': workout_date.isoformat() if workout_date else None,
+            'exercise': name,
+            'duration': set_duration,
+            'distance': set_distance,
+            'intensity': intensity,
+            'pace': set_pace
+        })
+        last_key = [workout_date, workout_id, exercise_id, set_id]
+
+    return cardio_data, next_cursor
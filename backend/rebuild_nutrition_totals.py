@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Rebuild the nutrition_daily_totals rollup from the logged meals.
+
+Needed after running with NUTRITION_DAILY_ROLLUP turned off, since meal changes
+made in the meantime weren't folded into the rollup.
+
+Usage:
+    python rebuild_nutrition_totals.py            # rebuild every user's daily totals
+    python rebuild_nutrition_totals.py --user 42  # rebuild a single user
+"""
+
+import argparse
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from nutrition_totals import rebuild_all_daily_totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the per-day nutrition totals rollup")
+    parser.add_argument("--user", type=int, help="only rebuild this user id")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        result = rebuild_all_daily_totals(db, user_id=args.user)
+        print(f"Users rebuilt: {result['users']}")
+        print(f"Daily totals written: {result['days']}")
+        return 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding nutrition totals: {str(e)}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
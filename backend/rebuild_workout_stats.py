@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Rebuild the user_workout_stats rollup from the workout history.
+
+Usage:
+    python rebuild_workout_stats.py            # backfill / rebuild every user's rollup
+    python rebuild_workout_stats.py --check    # only report users whose rollup drifted
+    python rebuild_workout_stats.py --user 42  # rebuild a single user
+"""
+
+import argparse
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from workout_stats import rebuild_all_workout_stats, rebuild_user_workout_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the per-user workout statistics rollup")
+    parser.add_argument("--check", action="store_true", help="report drift without writing anything")
+    parser.add_argument("--user", type=int, help="only rebuild this user id")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.user is not None:
+            rebuild_user_workout_stats(db, args.user)
+            db.commit()
+            print(f"Rebuilt workout stats for user {args.user}")
+            return 0
+
+        result = rebuild_all_workout_stats(db, check_only=args.check)
+        print(f"Users scanned: {result['users']}")
+        if not args.check:
+            print(f"Rollups rebuilt: {result['rebuilt']}")
+        print(f"Users with drifted stats: {len(result['drifted'])}")
+        if result["drifted"]:
+            print(f"Drifted user ids: {', '.join(str(user_id) for user_id in result['drifted'])}")
+        # A drift check exits non-zero so it can gate deploys or cron alerts
+        return 1 if args.check and result["drifted"] else 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding workout stats: {str(e)}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Recompute every user's achievement progress from their workout history.
+
+Users are processed in id order, a batch at a time: each batch reads every metric
+with one grouped query, then writes only the rows whose progress changed in bulk.
+After each committed batch the position is saved to the checkpoint file, so an
+interrupted run can continue with --resume. The checkpoint is removed once the
+run completes.
+
+Usage:
+    python recompute_achievements.py                    # recompute every user
+    python recompute_achievements.py --resume           # continue an interrupted run
+    python recompute_achievements.py --check            # only report what would change
+    python recompute_achievements.py --user 42          # recompute a single user
+    python recompute_achievements.py --batch-size 2000 --checkpoint /tmp/achievements.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import SessionLocal
+from models import User
+from achievements import RECOMPUTE_BATCH_SIZE, evaluate_achievements, recompute_all_achievements
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".recompute_achievements.json")
+
+
+def load_checkpoint(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    # Write then rename so a crash mid-write never leaves a truncated checkpoint
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute achievement progress for all users")
+    parser.add_argument("--batch-size", type=int, default=RECOMPUTE_BATCH_SIZE, help="users per batch")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="file the run position is saved to")
+    parser.add_argument("--resume", action="store_true", help="continue after the user id in the checkpoint")
+    parser.add_argument("--check", action="store_true", help="report what would change without writing anything")
+    parser.add_argument("--user", type=int, help="only recompute this user id")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.user is not None:
+            user = db.query(User).filter(User.id == args.user).first()
+            if not user:
+                print(f"User {args.user} not found")
+                return 1
+            result = evaluate_achievements(db, user)
+            db.commit()
+            print(f"Recomputed achievements for user {args.user}: {result['newly_achieved']} newly achieved")
+            return 0
+
+        checkpoint = load_checkpoint(args.checkpoint) if args.resume else {}
+        after_user_id = checkpoint.get("last_user_id", 0)
+        previous_users = checkpoint.get("users", 0)
+        if after_user_id:
+            print(f"Resuming after user {after_user_id} ({previous_users} users already done)")
+
+        started = time.perf_counter()
+
+        def report(last_user_id, totals):
+            elapsed = time.perf_counter() - started
+            rate = totals["users"] / elapsed if elapsed else 0.0
+            print(f"Processed {previous_users + totals['users']} users (up to id {last_user_id}), "
+                  f"{rate:.0f} users/s")
+            if not args.check:
+                save_checkpoint(args.checkpoint, {"last_user_id": last_user_id,
+                                                  "users": previous_users + totals["users"]})
+
+        totals = recompute_all_achievements(
+            db, batch_size=args.batch_size, after_user_id=after_user_id,
+            check_only=args.check, on_batch=report
+        )
+        elapsed = time.perf_counter() - started
+        if not args.check and os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+
+        print(f"Users processed: {totals['users']} in {elapsed:.1f}s "
+              f"({totals['users'] / elapsed if elapsed else 0.0:.0f} users/s)")
+        updated, inserted = ("to update", "to insert") if args.check else ("updated", "inserted")
+        print(f"Achievement rows {updated}: {totals['updated']}, {inserted}: {totals['inserted']}")
+        print(f"Newly achieved: {totals['newly_achieved']}")
+        # Like the workout stats drift check, a check with pending changes exits non-zero
+        return 1 if args.check and (totals["updated"] or totals["inserted"]) else 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error recomputing achievements: {str(e)}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
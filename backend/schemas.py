@@ -104,6 +104,21 @@ class WorkoutResponse(WorkoutBase):
         from_attributes = True
 
 
+class ExerciseSummaryResponse(ExerciseBase):
+    id: Optional[int] = None
+
+    class Config:
+        from_attributes = True
+
+
+class WorkoutSummaryResponse(WorkoutBase):
+    id: int
+    exercises: List[ExerciseSummaryResponse] = []
+
+    class Config:
+        from_attributes = True
+
+
 class ProfileUpdateRequest(BaseModel):
     username: Optional[str] = Field(
         None,
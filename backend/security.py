@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
 from passlib.context import CryptContext
+import asyncio
 import jwt as pyjwt
 import secrets
+import threading
 from fastapi import HTTPException
 from config import settings
 
@@ -10,12 +13,81 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 
 
+class PasswordHashingPool:
+    """
+    Bounded thread pool for bcrypt work.
+
+    bcrypt releases the GIL while hashing, so a few dedicated threads keep logins
+    from stalling the event loop (and the request threadpool) without letting a
+    burst of logins queue up unbounded CPU work. Once workers + queue_limit jobs
+    are in flight, new ones are rejected with a 503 instead of waiting.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="The server is busy, please try again in a moment",
+                    headers={"Retry-After": "1"}
+                )
+            self._in_flight += 1
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+    def run(self, fn, *args):
+        """Run a job from synchronous code, blocking the calling thread until it's done"""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """Run a job without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+password_hashing_pool = PasswordHashingPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_LIMIT)
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hashing_pool.run(pwd_context.hash, password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hashing_pool.run(pwd_context.verify, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hashing_pool.run_async(pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hashing_pool.run_async(pwd_context.verify, plain_password, hashed_password)
 
 
 def generate_verification_token():
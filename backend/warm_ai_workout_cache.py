@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Pre-generate AI workout plans for the common request combinations.
+
+Every combination of the given goals, experience levels, days per week, equipment
+and durations (without injuries or extra preferences) is looked up in the AI
+workout plan cache; the ones without a fresh entry are generated with the primary
+model and stored, so the first users asking for them don't wait on the model.
+
+Usage:
+    python warm_ai_workout_cache.py                      # the default combinations
+    python warm_ai_workout_cache.py --days 3 4 --dry-run # only count what's missing
+    python warm_ai_workout_cache.py --goals strength --equipment full_gym --limit 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+
+from database import SessionLocal
+from ai_workout import (AI_MODEL, FALLBACK_PLAN_NAME, WorkoutGenerationRequest, format_workout_prompt,
+                        generate_workout_with_huggingface, parse_ai_response, save_generated_plan)
+from ai_workout_cache import get_cached_plan, normalize_request_fields, plan_cache_key
+from inference_client import InferenceError, inference_client
+
+DEFAULT_GOALS = ["strength", "hypertrophy", "endurance", "weight_loss", "general_fitness"]
+DEFAULT_EXPERIENCE = ["beginner", "intermediate", "advanced"]
+DEFAULT_DAYS = ["3", "4", "5"]
+DEFAULT_EQUIPMENT = ["none", "basic", "full_gym"]
+DEFAULT_DURATIONS = ["45", "60"]
+
+# Generations started at once; the inference client caps what actually runs in parallel
+BATCH_SIZE = 8
+
+
+async def warm(db, combinations, dry_run: bool) -> dict:
+    missing = []
+    for goal, experience, days, equipment, duration in combinations:
+        fields = normalize_request_fields({
+            "fitnessGoal": goal, "experienceLevel": experience, "daysPerWeek": days,
+            "equipment": equipment, "workoutDuration": duration,
+        })
+        prompt = format_workout_prompt(WorkoutGenerationRequest(**fields))
+        key = plan_cache_key(AI_MODEL, prompt)
+        if get_cached_plan(db, [key]) is None:
+            missing.append((key, fields, prompt))
+
+    result = {"combinations": len(combinations), "missing": len(missing), "generated": 0, "failed": 0}
+    if dry_run:
+        return result
+
+    async def generate(prompt):
+        try:
+            return await generate_workout_with_huggingface(prompt)
+        except InferenceError as e:
+            print(f"Generation failed: {e.detail}")
+            return None
+
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        responses = await asyncio.gather(*(generate(prompt) for _, _, prompt in batch))
+        # Parse and store one at a time; the session isn't shared between tasks
+        for (key, fields, _), response in zip(batch, responses):
+            if response is None:
+                result["failed"] += 1
+                continue
+            try:
+                workout_plan = parse_ai_response(response)
+            except HTTPException as e:
+                workout_plan = None
+                print(f"Generation failed: {e.detail}")
+            if workout_plan is None or workout_plan.name == FALLBACK_PLAN_NAME:
+                print(f"Could not parse the plan generated for {fields}")
+                result["failed"] += 1
+                continue
+            save_generated_plan(db, key, AI_MODEL, fields, workout_plan)
+            result["generated"] += 1
+        print(f"Warmed {min(start + BATCH_SIZE, len(missing))}/{len(missing)}")
+    await inference_client.aclose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate AI workout plans for common requests")
+    parser.add_argument("--goals", nargs="+", default=DEFAULT_GOALS)
+    parser.add_argument("--experience", nargs="+", default=DEFAULT_EXPERIENCE)
+    parser.add_argument("--days", nargs="+", default=DEFAULT_DAYS)
+    parser.add_argument("--equipment", nargs="+", default=DEFAULT_EQUIPMENT)
+    parser.add_argument("--durations", nargs="+", default=DEFAULT_DURATIONS)
+    parser.add_argument("--limit", type=int, help="generate at most this many combinations")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many are missing")
+    args = parser.parse_args()
+
+    combinations = list(itertools.product(args.goals, args.experience, args.days, args.equipment, args.durations))
+    if args.limit is not None:
+        combinations = combinations[:args.limit]
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        result = asyncio.run(warm(db, combinations, args.dry_run))
+        print(f"Combinations: {result['combinations']}")
+        print(f"Missing from the cache: {result['missing']}")
+        if not args.dry_run:
+            print(f"Generated: {result['generated']}, failed: {result['failed']} "
+                  f"in {time.perf_counter() - started:.1f}s")
+        return 0 if result["failed"] == 0 else 1
+    except Exception as e:
+        db.rollback()
+        print(f"Error warming the AI workout plan cache: {str(e)}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
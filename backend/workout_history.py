@@ -0,0 +1,114 @@
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
+import json
+
+from sqlalchemy.orm import Session, selectinload
+
+from database import SessionLocal
+from models import Workout, Exercise
+from progress import date_range_filters, encode_cursor, decode_cursor, keyset_after
+from schemas import WorkoutResponse, WorkoutSummaryResponse
+
+# Workouts loaded per page when streaming the full history as NDJSON
+STREAM_PAGE_SIZE = 200
+
+
+def _workouts_query(db: Session, user_id: int, since: Optional[date], until: Optional[date], summary: bool):
+    loader = selectinload(Workout.exercises)
+    if not summary:
+        loader = loader.selectinload(Exercise.sets)
+
+    return db.query(Workout).options(loader).filter(
+        Workout.user_id == user_id,
+        Workout.is_template == False,  # Exclude templates
+        *date_range_filters(Workout.date, since, until)
+    )
+
+
+def get_workouts_page(
+    db: Session,
+    user_id: int,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    summary: bool = False,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[List[Workout], Optional[str]]:
+    """
+    Return the user's logged workouts, newest first, and the cursor of the next page.
+
+    Exercises (and, unless summary is set, their sets) are loaded with one extra
+    query per relationship instead of a joined row per set, in logged order through
+    the relationships' order_by, whatever index the planner uses. When a limit is given
+    the result is keyset paginated on (date, id); workouts without a date can't be
+    placed on that timeline and are left out of paginated results.
+    """
+    query = _workouts_query(db, user_id, since, until, summary)
+    keyset_columns = [Workout.date, Workout.id]
+    if limit is not None:
+        query = query.filter(Workout.date.isnot(None))
+        if cursor:
+            query = query.filter(
+                keyset_after(keyset_columns, decode_cursor(cursor, len(keyset_columns)), descending=True)
+            )
+    query = query.order_by(Workout.date.desc(), Workout.id.desc())
+    if limit is None:
+        return query.all(), None
+
+    # Fetch one extra row to know whether another page exists
+    workouts = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(workouts) > limit:
+        workouts = workouts[:limit]
+        next_cursor = encode_cursor([workouts[-1].date, workouts[-1].id])
+    return workouts, next_cursor
+
+
+def serialize_workouts(workouts: List[Workout], summary: bool = False) -> list:
+    schema = WorkoutSummaryResponse if summary else WorkoutResponse
+    return [schema.model_validate(workout) for workout in workouts]
+
+
+def stream_workouts_ndjson(
+    user_id: int,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    summary: bool = False
+) -> Iterator[str]:
+    """
+    Yield the user's workouts as newline-delimited JSON, one workout per line.
+
+    The history is walked page by page with the keyset cursor, so memory use stays
+    flat however many workouts the user has. Workouts without a date, which the
+    keyset pages leave out, follow at the end, newest id first, so the stream holds
+    the same workouts as the unpaginated response. The generator opens its own
+    session because it keeps running after the request handler has returned.
+    """
+    db = SessionLocal()
+    try:
+        cursor = None
+        while True:
+            workouts, cursor = get_workouts_page(
+                db, user_id, since, until, summary, limit=STREAM_PAGE_SIZE, cursor=cursor
+            )
+            for workout in serialize_workouts(workouts, summary):
+                yield json.dumps(workout.model_dump(mode="json")) + "\n"
+            # Drop the finished page from the identity map before loading the next
+            db.expunge_all()
+            if not cursor:
+                break
+
+        before_id = None
+        while True:
+            query = _workouts_query(db, user_id, since, until, summary).filter(Workout.date.is_(None))
+            if before_id is not None:
+                query = query.filter(Workout.id < before_id)
+            workouts = query.order_by(Workout.id.desc()).limit(STREAM_PAGE_SIZE).all()
+            for workout in serialize_workouts(workouts, summary):
+                yield json.dumps(workout.model_dump(mode="json")) + "\n"
+            db.expunge_all()
+            if len(workouts) < STREAM_PAGE_SIZE:
+                break
+            before_id = workouts[-1].id
+    finally:
+        db.close()
@@ -0,0 +1,250 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, case, and_
+from sqlalchemy.orm import Session
+
+from models import User, Workout, Exercise, Set, UserWorkoutStats
+
+# Number of users aggregated per round of queries during a full rebuild
+REBUILD_BATCH_SIZE = 500
+
+
+def _empty_contribution() -> dict:
+    return {
+        "total_workouts": 0,
+        "last_workout_date": None,
+        "cardio_duration": 0.0,
+        "workout_duration": 0.0,
+        "exercise_counts": {},
+    }
+
+
+def _aggregate_workouts(db: Session, *criteria) -> Dict[int, dict]:
+    """
+    Aggregate the stats of the workouts matching the criteria, grouped by user.
+
+    Routine templates count like logged workouts, as /workout-stats always counted
+    every workout of the user.
+
+    Runs three grouped queries regardless of how many workouts or users match, so the
+    same code serves single-workout deltas and full rebuilds.
+    """
+    contributions: Dict[int, dict] = {}
+
+    def contribution_for(user_id):
+        if user_id not in contributions:
+            contributions[user_id] = _empty_contribution()
+        return contributions[user_id]
+
+    # Count, last date and start/end duration (minutes) of the workouts themselves
+    duration_seconds = case(
+        (and_(Workout.start_time.isnot(None), Workout.end_time.isnot(None)),
+         func.extract('epoch', Workout.end_time) - func.extract('epoch', Workout.start_time)),
+        else_=None
+    )
+    workout_rows = db.query(
+        Workout.user_id,
+        func.count(Workout.id),
+        func.max(Workout.date),
+        func.sum(duration_seconds)
+    ).filter(
+        *criteria
+    ).group_by(Workout.user_id).all()
+
+    for user_id, total, last_date, seconds in workout_rows:
+        contribution = contribution_for(user_id)
+        contribution["total_workouts"] = total
+        contribution["last_workout_date"] = last_date
+        contribution["workout_duration"] = float(seconds) / 60 if seconds else 0.0
+
+    # Durations logged on cardio sets
+    cardio_rows = db.query(
+        Workout.user_id,
+        func.sum(func.coalesce(Set.duration, 0))
+    ).select_from(Workout).join(
+        Exercise, Exercise.workout_id == Workout.id
+    ).join(
+        Set, Set.exercise_id == Exercise.id
+    ).filter(
+        Exercise.is_cardio == True,
+        *criteria
+    ).group_by(Workout.user_id).all()
+
+    for user_id, cardio_duration in cardio_rows:
+        contribution_for(user_id)["cardio_duration"] = float(cardio_duration) if cardio_duration else 0.0
+
+    # How often each exercise name was logged, used to pick the favorite exercise
+    exercise_rows = db.query(
+        Workout.user_id,
+        Exercise.name,
+        func.count(Exercise.id)
+    ).select_from(Workout).join(
+        Exercise, Exercise.workout_id == Workout.id
+    ).filter(
+        *criteria
+    ).group_by(Workout.user_id, Exercise.name).all()
+
+    for user_id, name, count in exercise_rows:
+        contribution_for(user_id)["exercise_counts"][name] = count
+
+    return contributions
+
+
+def _favorite_exercise(exercise_counts: dict) -> Optional[str]:
+    """Most logged exercise name, ties broken alphabetically so the result is stable"""
+    if not exercise_counts:
+        return None
+    return min(exercise_counts.items(), key=lambda item: (-item[1], item[0]))[0]
+
+
+def _write_stats(stats: UserWorkoutStats, contribution: dict):
+    stats.total_workouts = contribution["total_workouts"]
+    stats.last_workout_date = contribution["last_workout_date"]
+    stats.cardio_duration = contribution["cardio_duration"]
+    stats.workout_duration = contribution["workout_duration"]
+    stats.exercise_counts = dict(contribution["exercise_counts"])
+    stats.favorite_exercise = _favorite_exercise(stats.exercise_counts)
+    stats.updated_at = datetime.now(timezone.utc)
+
+
+def _stats_as_contribution(stats: UserWorkoutStats) -> dict:
+    return {
+        "total_workouts": stats.total_workouts or 0,
+        "last_workout_date": stats.last_workout_date,
+        "cardio_duration": stats.cardio_duration or 0.0,
+        "workout_duration": stats.workout_duration or 0.0,
+        "exercise_counts": dict(stats.exercise_counts or {}),
+    }
+
+
+def rebuild_user_workout_stats(db: Session, user_id: int) -> UserWorkoutStats:
+    """Recompute a user's rollup from their full workout history (does not commit)"""
+    contribution = _aggregate_workouts(db, Workout.user_id == user_id).get(user_id, _empty_contribution())
+    stats = db.query(UserWorkoutStats).filter(UserWorkoutStats.user_id == user_id).with_for_update().first()
+    if not stats:
+        stats = UserWorkoutStats(user_id=user_id)
+        db.add(stats)
+    _write_stats(stats, contribution)
+    db.flush()
+    return stats
+
+
+def get_user_workout_stats(db: Session, user_id: int) -> UserWorkoutStats:
+    """Read the user's rollup row, building and saving it on first access"""
+    stats = db.query(UserWorkoutStats).filter(UserWorkoutStats.user_id == user_id).first()
+    if not stats:
+        stats = rebuild_user_workout_stats(db, user_id)
+        db.commit()
+    return stats
+
+
+def collect_workout_contribution(db: Session, user_id: int, workout_ids: List[int]) -> dict:
+    """
+    Aggregate what the given workouts contribute to the user's rollup.
+
+    Call this before deleting workouts and pass the result to apply_workout_stats_delta.
+    """
+    if not workout_ids:
+        return _empty_contribution()
+    return _aggregate_workouts(
+        db, Workout.user_id == user_id, Workout.id.in_(workout_ids)
+    ).get(user_id, _empty_contribution())
+
+
+def apply_workout_stats_delta(db: Session, user_id: int, contribution: dict, removed: bool = False):
+    """
+    Add (or subtract, when removed) a contribution to the user's rollup row.
+
+    Runs inside the caller's transaction so the rollup commits or rolls back together
+    with the workout change. If the user has no rollup yet it is built from the current
+    history instead, which already reflects the change.
+    """
+    stats = db.query(UserWorkoutStats).filter(UserWorkoutStats.user_id == user_id).with_for_update().first()
+    if not stats:
+        rebuild_user_workout_stats(db, user_id)
+        return
+
+    sign = -1 if removed else 1
+    current = _stats_as_contribution(stats)
+    current["total_workouts"] = max(0, current["total_workouts"] + sign * contribution["total_workouts"])
+    current["cardio_duration"] += sign * contribution["cardio_duration"]
+    current["workout_duration"] += sign * contribution["workout_duration"]
+
+    counts = current["exercise_counts"]
+    for name, count in contribution["exercise_counts"].items():
+        remaining = counts.get(name, 0) + sign * count
+        if remaining > 0:
+            counts[name] = remaining
+        else:
+            counts.pop(name, None)
+
+    contribution_date = contribution["last_workout_date"]
+    if not removed:
+        if contribution_date and (current["last_workout_date"] is None or contribution_date > current["last_workout_date"]):
+            current["last_workout_date"] = contribution_date
+    elif current["total_workouts"] == 0:
+        current["last_workout_date"] = None
+    elif contribution_date and current["last_workout_date"] and contribution_date >= current["last_workout_date"]:
+        # The latest workout went away; look up the new latest one (indexed, single row)
+        current["last_workout_date"] = db.query(func.max(Workout.date)).filter(
+            Workout.user_id == user_id
+        ).scalar()
+
+    _write_stats(stats, current)
+    db.flush()
+
+
+def record_workouts_created(db: Session, user_id: int, workout_ids: List[int]):
+    """Fold newly added workouts into the user's rollup (flushes pending rows first)"""
+    db.flush()
+    apply_workout_stats_delta(db, user_id, collect_workout_contribution(db, user_id, workout_ids))
+
+
+def rebuild_all_workout_stats(db: Session, check_only: bool = False, batch_size: int = REBUILD_BATCH_SIZE) -> dict:
+    """
+    Rebuild every user's rollup from scratch in batches of users.
+
+    With check_only nothing is written and the result only reports the users whose
+    stored rollup drifted from their actual workout history.
+    """
+    user_ids = [user_id for (user_id,) in db.query(User.id).order_by(User.id).all()]
+    rebuilt = 0
+    drifted = []
+
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        contributions = _aggregate_workouts(db, Workout.user_id.in_(batch))
+        existing = {
+            stats.user_id: stats
+            for stats in db.query(UserWorkoutStats).filter(UserWorkoutStats.user_id.in_(batch)).all()
+        }
+
+        for user_id in batch:
+            contribution = contributions.get(user_id, _empty_contribution())
+            stats = existing.get(user_id)
+            if stats is not None and _has_drifted(stats, contribution):
+                drifted.append(user_id)
+            if check_only:
+                continue
+            if stats is None:
+                stats = UserWorkoutStats(user_id=user_id)
+                db.add(stats)
+            _write_stats(stats, contribution)
+            rebuilt += 1
+
+        if not check_only:
+            db.commit()
+
+    return {"users": len(user_ids), "rebuilt": rebuilt, "drifted": drifted}
+
+
+def _has_drifted(stats: UserWorkoutStats, contribution: dict) -> bool:
+    stored = _stats_as_contribution(stats)
+    return (
+        stored["total_workouts"] != contribution["total_workouts"]
+        or stored["last_workout_date"] != contribution["last_workout_date"]
+        or abs(stored["cardio_duration"] - contribution["cardio_duration"]) > 0.01
+        or abs(stored["workout_duration"] - contribution["workout_duration"]) > 0.01
+        or stored["exercise_counts"] != contribution["exercise_counts"]
+    )
@@ -0,0 +1,116 @@
+from typing import List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import Workout, Exercise, Set
+from schemas import WorkoutCreate
+
+
+def _apply_column_defaults(model, row: dict) -> dict:
+    """
+    Replace None with the column default, as the ORM does for explicit None values.
+
+    Scalar defaults are filled in directly. Callable defaults (like Workout.date) are
+    left to Core by dropping the key, which is only done for single-row inserts.
+    """
+    for key in list(row):
+        if row[key] is not None:
+            continue
+        default = model.__table__.c[key].default
+        if default is None:
+            continue
+        if default.is_scalar:
+            row[key] = default.arg
+        else:
+            del row[key]
+    return row
+
+
+def _set_row(set_data, exercise_id: int, index: int) -> dict:
+    """Column values for one set; every row must carry the same keys for executemany"""
+    superset_with = getattr(set_data, 'superset_with', None)
+    return _apply_column_defaults(Set, {
+        "weight": set_data.weight,
+        "reps": set_data.reps,
+        "distance": set_data.distance,
+        "duration": set_data.duration,
+        "intensity": set_data.intensity,
+        "notes": set_data.notes,
+        "exercise_id": exercise_id,
+        "order": getattr(set_data, 'order', index),  # Use provided order or index as default
+        # Set types
+        "is_warmup": getattr(set_data, 'is_warmup', False),
+        "is_drop_set": getattr(set_data, 'is_drop_set', False),
+        "is_superset": getattr(set_data, 'is_superset', False),
+        "is_amrap": getattr(set_data, 'is_amrap', False),
+        "is_restpause": getattr(set_data, 'is_restpause', False),
+        "is_pyramid": getattr(set_data, 'is_pyramid', False),
+        "is_giant": getattr(set_data, 'is_giant', False),
+        # Additional set properties
+        "drop_number": getattr(set_data, 'drop_number', None),
+        "original_weight": getattr(set_data, 'original_weight', None),
+        "superset_with": str(superset_with) if superset_with is not None else None,
+        "rest_pauses": getattr(set_data, 'rest_pauses', None),
+        "pyramid_type": getattr(set_data, 'pyramid_type', None),
+        "pyramid_step": getattr(set_data, 'pyramid_step', None),
+        "giant_with": getattr(set_data, 'giant_with', None),
+    })
+
+
+def validate_workout_sets(workout: WorkoutCreate):
+    """Reject the workout before anything is written if an exercise has no sets"""
+    for exercise_data in workout.exercises or []:
+        if not exercise_data.sets or len(exercise_data.sets) == 0:
+            raise ValueError(f"Exercise '{exercise_data.name}' must contain at least one set")
+
+
+def bulk_insert_workout(db: Session, user_id: int, workout: WorkoutCreate) -> int:
+    """
+    Insert a workout with its exercises and sets in three statements and return its id.
+
+    The workout row comes back through RETURNING, all exercises are inserted as one
+    batched INSERT ... RETURNING (ids come back in parameter order), and all sets go
+    in as a single executemany. Nothing is committed here.
+    """
+    validate_workout_sets(workout)
+
+    workout_id = db.execute(
+        insert(Workout).returning(Workout.id),
+        _apply_column_defaults(Workout, {
+            "name": workout.name,
+            "date": workout.date,
+            "start_time": workout.start_time,
+            "end_time": workout.end_time,
+            "bodyweight": workout.bodyweight,
+            "weight_unit": workout.weight_unit,
+            "notes": workout.notes,
+            "user_id": user_id,
+        })
+    ).scalar_one()
+
+    exercises = workout.exercises or []
+    if not exercises:
+        return workout_id
+
+    exercise_ids: List[int] = db.execute(
+        insert(Exercise).returning(Exercise.id, sort_by_parameter_order=True),
+        [
+            _apply_column_defaults(Exercise, {
+                "name": exercise_data.name,
+                "category": exercise_data.category or "Uncategorized",
+                "is_cardio": exercise_data.is_cardio,
+                "workout_id": workout_id,
+            })
+            for exercise_data in exercises
+        ]
+    ).scalars().all()
+
+    set_rows = [
+        _set_row(set_data, exercise_id, i)
+        for exercise_data, exercise_id in zip(exercises, exercise_ids)
+        for i, set_data in enumerate(exercise_data.sets)
+    ]
+    db.execute(insert(Set), set_rows)
+
+    return workout_id